@@ -2,11 +2,15 @@ from django.contrib import admin
 from django.contrib.auth.admin import UserAdmin
 from django.utils.html import format_html
 from django.http import HttpResponse
+from django.utils import timezone
 import csv
+from .approvers import approve_profiles, sync_leader
+from .cache import bump_version
 from .models import (
     User, Profile, OrganizationUnit, Message,
     VideoPost, PayrollRecord, GalleryImage,
-    Announcement, State, LGA, Ward
+    Announcement, State, LGA, Ward, OutboundEmail, MemberStatusChange,
+    PayrollRun, SalaryTemplate, LedgerEntry, UnitBalance,
 )
 
 
@@ -118,11 +122,16 @@ class ProfileAdmin(admin.ModelAdmin):
     actions = ['approve_profiles', 'deactivate_profiles']
 
     def approve_profiles(self, request, queryset):
-        queryset.update(is_active=True)
+        # Activates the User accounts too and sends the activation memos
+        approved = approve_profiles(request.user, queryset.values_list('pk', flat=True), check_jurisdiction=False)
+        self.message_user(request, f"Approved {approved} profile(s).")
     approve_profiles.short_description = "✅ Approve selected profiles"
 
     def deactivate_profiles(self, request, queryset):
+        leaders = list(queryset.filter(user__is_staff=True).values_list('user_id', flat=True))
         queryset.update(is_active=False)
+        for user_id in leaders:
+            sync_leader(user_id)
     deactivate_profiles.short_description = "🚫 Deactivate selected profiles"
 
 @admin.register(PayrollRecord)
@@ -130,17 +139,93 @@ class PayrollAdmin(admin.ModelAdmin):
     list_display = ('member', 'amount', 'month', 'year', 'status', 'payment_date')
     list_filter = ('status', 'month', 'year')
     search_fields = ('member__username', 'reference')
-    readonly_fields = ('payment_date', 'reference')
+    readonly_fields = ('payment_date', 'reference', 'run', 'last_error')
+    raw_id_fields = ('member',)
+
+@admin.register(SalaryTemplate)
+class SalaryTemplateAdmin(admin.ModelAdmin):
+    list_display = ('member', 'unit', 'amount', 'is_active', 'updated_at')
+    list_editable = ('amount', 'is_active')
+    list_filter = ('is_active', 'unit__level')
+    search_fields = ('member__username', 'unit__name')
+    list_select_related = ('member', 'unit')
+    raw_id_fields = ('member', 'unit')
+
+@admin.register(PayrollRun)
+class PayrollRunAdmin(admin.ModelAdmin):
+    """Runs are created from the payroll page or `schedule_payroll_runs`; counters are kept by the worker."""
+    list_display = ('unit', 'month', 'year', 'status', 'record_count', 'sent_count', 'failed_count',
+                    'skipped_count', 'total_amount', 'created_by', 'created_at')
+    list_filter = ('status', 'year', 'month')
+    search_fields = ('unit__name',)
+    list_select_related = ('unit', 'created_by')
+    readonly_fields = [field.name for field in PayrollRun._meta.fields]
+
+    def has_add_permission(self, request):
+        return False
 
 @admin.register(Announcement)
 class AnnouncementAdmin(admin.ModelAdmin):
-    list_display = ('content', 'is_active', 'created_at')
+    list_display = ('content', 'unit', 'is_active', 'is_archived', 'expires_at', 'created_at')
     list_editable = ('is_active',)
+    list_filter = ('is_active', 'is_archived', 'unit__level')
+    actions = ['archive_announcements']
+
+    def archive_announcements(self, request, queryset):
+        queryset.update(is_archived=True, is_active=False)
+        bump_version('announcements')
+    archive_announcements.short_description = "🗄️ Archive selected announcements"
 
 @admin.register(Message)
 class MessageAdmin(admin.ModelAdmin):
     list_display = ('sender', 'recipient', 'subject', 'timestamp')
     readonly_fields = ('timestamp',)
 
+@admin.register(OutboundEmail)
+class OutboundEmailAdmin(admin.ModelAdmin):
+    list_display = ('subject', 'to', 'status', 'attempts', 'next_attempt_at', 'sent_at')
+    list_filter = ('status',)
+    search_fields = ('subject', 'to')
+    readonly_fields = ('created_at', 'sent_at', 'last_error')
+    actions = ['retry_now']
+
+    def retry_now(self, request, queryset):
+        queryset.exclude(status='sent').update(status='queued', next_attempt_at=timezone.now(), attempts=0)
+    retry_now.short_description = "🔁 Retry selected emails now"
+
+@admin.register(MemberStatusChange)
+class MemberStatusChangeAdmin(admin.ModelAdmin):
+    """Read-only: the audit trail is append-only."""
+    list_display = ('created_at', 'actor', 'target_username', 'was_active', 'is_active', 'reason')
+    list_filter = ('is_active',)
+    search_fields = ('target_username', 'actor__username', 'reason')
+    list_select_related = ('actor',)
+
+    def has_add_permission(self, request): return False
+    def has_change_permission(self, request, obj=None): return False
+    def has_delete_permission(self, request, obj=None): return False
+
+@admin.register(LedgerEntry)
+class LedgerEntryAdmin(admin.ModelAdmin):
+    """Read-only: the ledger is append-only; corrections are posted as reversals."""
+    list_display = ('created_at', 'kind', 'reference', 'member', 'unit', 'amount', 'authorized_by')
+    list_filter = ('kind', 'unit__level')
+    search_fields = ('reference', 'member__username', 'unit__name')
+    list_select_related = ('member', 'unit', 'authorized_by')
+
+    def has_add_permission(self, request): return False
+    def has_change_permission(self, request, obj=None): return False
+    def has_delete_permission(self, request, obj=None): return False
+
+@admin.register(UnitBalance)
+class UnitBalanceAdmin(admin.ModelAdmin):
+    """Kept by accounts/ledger.py; `manage.py rebuild_ledger` recomputes it."""
+    list_display = ('unit', 'total_spent', 'entry_count', 'updated_at')
+    search_fields = ('unit__name',)
+    list_select_related = ('unit',)
+    readonly_fields = ('unit', 'total_spent', 'entry_count', 'updated_at')
+
+    def has_add_permission(self, request): return False
+
 admin.site.register(VideoPost)
 admin.site.register(GalleryImage)
\ No newline at end of file
@@ -0,0 +1,110 @@
+from heapq import merge
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Min, Q
+from django.utils import timezone
+
+from .cache import get_versions
+from .models import Announcement, OrganizationUnit
+
+
+def feed_limit():
+    return getattr(settings, 'ANNOUNCEMENT_FEED_LIMIT', 20)
+
+
+def unit_lineage_ids(unit):
+    """
+    Ids of `unit` and every unit above it: the explicit parent chain plus the
+    same-category National / State / LG offices covering its location
+    (registration does not always set `parent`).
+    """
+    key = f"units:lineage:{unit.pk}:{get_versions('units')['units']}"
+    ids = cache.get(key)
+    if ids is not None:
+        return ids
+
+    ids = {unit.pk}
+    parent_id = unit.parent_id
+    while parent_id and parent_id not in ids:
+        ids.add(parent_id)
+        parent_id = OrganizationUnit.objects.filter(pk=parent_id).values_list('parent_id', flat=True).first()
+
+    above = Q(level='NATIONAL')
+    if unit.level in ('LG', 'WARD') and unit.state_id:
+        above |= Q(level='STATE', state_id=unit.state_id)
+    if unit.level == 'WARD' and unit.lga_id:
+        above |= Q(level='LG', lga_id=unit.lga_id)
+    if unit.level != 'NATIONAL':
+        ids.update(
+            OrganizationUnit.objects.filter(above, category=unit.category).values_list('id', flat=True)
+        )
+
+    ids = sorted(ids)
+    cache.set(key, ids, None)
+    return ids
+
+
+def _cached_feed(key, queryset):
+    """
+    Newest live announcements of `queryset`, capped and cached. The entry
+    expires together with its first announcement to expire, so expired
+    items never linger past their deadline.
+    """
+    feed = cache.get(key)
+    if feed is None:
+        now = timezone.now()
+        feed = list(queryset.live(now).order_by('-created_at')[:feed_limit()])
+        expiries = [a.expires_at for a in feed if a.expires_at]
+        cache.set(key, feed, _seconds_until(min(expiries) if expiries else None, now))
+    return feed
+
+
+def cache_timeout():
+    """
+    Seconds a page showing every live announcement may be cached: until the
+    next one expires, at most PAGE_CACHE_TIMEOUT. The next expiry is itself
+    cached until it passes or an announcement changes.
+    """
+    now = timezone.now()
+    key = f"announcements:next-expiry:{get_versions('announcements')['announcements']}"
+    cached = cache.get(key)
+    if cached is None or (cached[0] and cached[0] <= now):
+        expiry = Announcement.objects.live(now).aggregate(next=Min('expires_at'))['next']
+        cached = (expiry,)
+        cache.set(key, cached, _seconds_until(expiry, now))
+    return _seconds_until(cached[0], now)
+
+
+def _seconds_until(expiry, now):
+    timeout = settings.PAGE_CACHE_TIMEOUT
+    if expiry:
+        timeout = max(1, min(timeout, int((expiry - now).total_seconds()) + 1))
+    return timeout
+
+
+def national_feed():
+    version = get_versions('announcements')['announcements']
+    return _cached_feed(
+        f"announcements:feed:national:{version}",
+        Announcement.objects.filter(unit__isnull=True),
+    )
+
+
+def unit_feed(unit):
+    """
+    National announcements plus those of `unit` and its ancestors, newest
+    first, capped to ANNOUNCEMENT_FEED_LIMIT. Both halves are bounded index
+    range scans cached separately, so the national half is shared by all units.
+    """
+    if unit is None:
+        return national_feed()
+
+    version = get_versions('announcements')['announcements']
+    own = _cached_feed(
+        f"announcements:feed:unit:{unit.pk}:{version}",
+        Announcement.objects.filter(unit_id__in=unit_lineage_ids(unit)),
+    )
+    now = timezone.now()
+    combined = merge(national_feed(), own, key=lambda a: a.created_at, reverse=True)
+    return [a for a in combined if a.is_live(now)][:feed_limit()]
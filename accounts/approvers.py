@@ -0,0 +1,257 @@
+"""
+Approver routing table (UnitApprover).
+
+Precomputes, for every OrganizationUnit, which leaders may approve its
+members, following the approve_member jurisdiction rules: staff of the unit
+itself, plus staff of the LG, State and National offices covering it. The
+table is kept current by signals (accounts/signals.py) and can be rebuilt
+from scratch with `manage.py rebuild_approvers`.
+
+The bulk approval and suspension actions below use the table to check
+jurisdiction for a whole batch of members in a single query. Suspension
+reaches one level less far than approval: State offices may approve Ward
+members but only suspend or reactivate State and LG ones.
+"""
+from django.db import transaction
+from django.db.models import Exists, OuterRef, Q
+from django.utils import timezone
+
+from .models import MemberStatusChange, Message, OrganizationUnit, Profile, UnitApprover, User
+
+LEVEL_DISTANCE = {'LG': 1, 'STATE': 2, 'NATIONAL': 3}
+
+PENDING_QUEUE_LIMIT = 50
+
+
+def _leader_profiles():
+    return Profile.objects.filter(
+        is_active=True, user__is_active=True, user__is_staff=True
+    ).select_related('unit')
+
+
+def coverage(leader_unit, unit):
+    """Distance from `leader_unit` down to `unit`, or None if out of jurisdiction."""
+    if leader_unit.pk == unit.pk:
+        return 0
+    level = leader_unit.level
+    if level == 'NATIONAL':
+        return LEVEL_DISTANCE[level]
+    if level == 'STATE' and leader_unit.state_id and unit.state_id == leader_unit.state_id:
+        return LEVEL_DISTANCE[level]
+    if level == 'LG' and leader_unit.lga_id and unit.lga_id == leader_unit.lga_id:
+        return LEVEL_DISTANCE[level]
+    return None
+
+
+def _units_covered(leader_unit):
+    units = OrganizationUnit.objects.only('id', 'category', 'state_id', 'lga_id')
+    if leader_unit.level == 'NATIONAL':
+        return units
+    if leader_unit.level == 'STATE' and leader_unit.state_id:
+        return units.filter(Q(pk=leader_unit.pk) | Q(state_id=leader_unit.state_id))
+    if leader_unit.level == 'LG' and leader_unit.lga_id:
+        return units.filter(Q(pk=leader_unit.pk) | Q(lga_id=leader_unit.lga_id))
+    return [leader_unit]
+
+
+def _add(rows, unit, leader_id, distance, same_category):
+    key = (unit.pk, leader_id)
+    current = rows.get(key)
+    if current is None or (distance, not same_category) < (current.distance, not current.same_category):
+        rows[key] = UnitApprover(unit_id=unit.pk, leader_id=leader_id, distance=distance, same_category=same_category)
+
+
+def _replace(existing, rows, batch_size=5000):
+    if not rows:
+        existing.delete()
+        return
+    with transaction.atomic():
+        existing.delete()
+        UnitApprover.objects.bulk_create(rows.values(), batch_size=batch_size)
+
+
+def sync_leader(user_id):
+    """Recomputes every unit the user may approve (after staff, status or unit changes)."""
+    rows = {}
+    for profile in _leader_profiles().filter(user_id=user_id):
+        for unit in _units_covered(profile.unit):
+            distance = coverage(profile.unit, unit)
+            if distance is not None:
+                _add(rows, unit, user_id, distance, unit.category == profile.unit.category)
+    _replace(UnitApprover.objects.filter(leader_id=user_id), rows)
+
+
+def sync_unit(unit):
+    """Recomputes the approvers of one unit (after it is created or moved)."""
+    above = Q(unit=unit) | Q(unit__level='NATIONAL')
+    if unit.state_id:
+        above |= Q(unit__level='STATE', unit__state_id=unit.state_id)
+    if unit.lga_id:
+        above |= Q(unit__level='LG', unit__lga_id=unit.lga_id)
+
+    rows = {}
+    for profile in _leader_profiles().filter(above):
+        distance = coverage(profile.unit, unit)
+        if distance is not None:
+            _add(rows, unit, profile.user_id, distance, unit.category == profile.unit.category)
+    _replace(UnitApprover.objects.filter(unit=unit), rows)
+
+
+def rebuild(batch_size=5000):
+    """Rebuilds the whole table in memory with two reads and bulk inserts."""
+    units = list(OrganizationUnit.objects.only('id', 'category', 'level', 'state_id', 'lga_id'))
+    by_state, by_lga = {}, {}
+    for unit in units:
+        if unit.state_id:
+            by_state.setdefault(unit.state_id, []).append(unit)
+        if unit.lga_id:
+            by_lga.setdefault(unit.lga_id, []).append(unit)
+
+    rows = {}
+    for profile in _leader_profiles():
+        leader_unit = profile.unit
+        if leader_unit.level == 'NATIONAL':
+            candidates = units
+        elif leader_unit.level == 'STATE':
+            candidates = by_state.get(leader_unit.state_id, [])
+        elif leader_unit.level == 'LG':
+            candidates = by_lga.get(leader_unit.lga_id, [])
+        else:
+            candidates = []
+        for unit in [leader_unit, *candidates]:
+            distance = coverage(leader_unit, unit)
+            if distance is not None:
+                _add(rows, unit, profile.user_id, distance, unit.category == leader_unit.category)
+
+    _replace(UnitApprover.objects.all(), rows, batch_size)
+    return len(rows)
+
+
+def can_approve(user, unit):
+    if user.is_superuser:
+        return True
+    return UnitApprover.objects.filter(unit=unit, leader=user).exists()
+
+
+def status_approvers(user):
+    """The routing rows through which `user` may suspend or reactivate members."""
+    return UnitApprover.objects.filter(leader=user).exclude(distance=LEVEL_DISTANCE['STATE'], unit__level='WARD')
+
+
+def can_manage_status(user, unit):
+    if user.is_superuser:
+        return True
+    return status_approvers(user).filter(unit=unit).exists()
+
+
+def notification_recipients(unit, exclude_user=None):
+    """
+    The closest approvers of `unit`: its own leaders if it has any, otherwise
+    the nearest office above it, preferring leaders of the same category.
+    """
+    approvers = UnitApprover.objects.filter(unit=unit).select_related('leader').order_by('-same_category', 'distance')
+    if exclude_user is not None:
+        approvers = approvers.exclude(leader=exclude_user)
+
+    recipients, best = [], None
+    for approver in approvers:
+        rank = (approver.same_category, approver.distance)
+        if best is None:
+            best = rank
+        elif rank != best:
+            break
+        recipients.append(approver.leader)
+    return recipients
+
+
+def pending_approvals(user):
+    """Inactive profiles in every unit `user` may approve, newest first."""
+    return Profile.objects.filter(
+        unit__approvers__leader=user, is_active=False
+    ).exclude(user=user).select_related('user', 'unit').order_by('-id')
+
+
+def approve_profiles(approver, profile_ids, check_jurisdiction=True):
+    """
+    Activates the pending profiles among `profile_ids` that `approver` may
+    approve, together with their user accounts, and sends each member an
+    activation memo. Jurisdiction is checked for the whole batch in one query
+    and the writes are two bulk UPDATEs plus one bulk INSERT, so clearing a
+    large backlog costs the same handful of queries as approving one member.
+    Returns the number of profiles approved.
+    """
+    pending = Profile.objects.filter(pk__in=profile_ids, is_active=False)
+    if check_jurisdiction and not approver.is_superuser:
+        pending = pending.filter(unit__approvers__leader=approver)
+    approved = list(pending.values_list('pk', 'user_id', 'user__is_staff'))
+    if not approved:
+        return 0
+
+    office = approver.primary_profile
+    signed = f"the {office.unit.level} office of {office.unit.name}" if office else "the National Admin"
+    body = f"Assalamu Alaikum. Your registration has been approved by {signed}."
+
+    with transaction.atomic():
+        Profile.objects.filter(pk__in=[pk for pk, _, _ in approved]).update(is_active=True)
+        User.objects.filter(pk__in=[user_id for _, user_id, _ in approved]).update(is_active=True)
+        Message.objects.bulk_create([
+            Message(sender=approver, recipient_id=user_id, subject="Account Activated", body=body)
+            for _, user_id, _ in approved
+        ])
+
+    # Bulk updates skip the signals: newly active leaders join the routing table here
+    for user_id in {user_id for _, user_id, is_staff in approved if is_staff}:
+        sync_leader(user_id)
+    return len(approved)
+
+
+def set_member_status(actor, active, reason='', user_ids=None, unit=None):
+    """
+    Suspends (`active=False`) or reactivates the profiles of every member
+    among `user_ids`, or every member of `unit`, that `actor` has
+    jurisdiction over. Profiles in other units are left alone, and a
+    suspended member keeps their login while another of their profiles is
+    still active. Members already in the requested state and the actor
+    themself are skipped. Each change is written to the MemberStatusChange
+    audit table in one bulk INSERT. Returns the number of members changed.
+    """
+    scope = Profile.objects.exclude(user=actor)
+    if user_ids is not None:
+        scope = scope.filter(user_id__in=user_ids)
+    if unit is not None:
+        scope = scope.filter(unit=unit)
+    if not actor.is_superuser:
+        scope = scope.filter(Exists(status_approvers(actor).filter(unit=OuterRef('unit'))))
+    if active:
+        scope = scope.exclude(is_active=True, user__is_active=True)
+    else:
+        scope = scope.exclude(is_active=False)
+
+    profile_ids, targets = [], {}
+    for profile_id, user_id, username, was_active, is_staff in scope.values_list(
+        'pk', 'user_id', 'user__username', 'user__is_active', 'user__is_staff'
+    ):
+        profile_ids.append(profile_id)
+        targets[user_id] = (username, was_active, is_staff)
+    if not targets:
+        return 0
+
+    now = timezone.now()
+    with transaction.atomic():
+        Profile.objects.filter(pk__in=profile_ids).update(is_active=active)
+        users = User.objects.filter(pk__in=targets)
+        if not active:
+            users = users.exclude(Exists(Profile.objects.filter(user=OuterRef('pk'), is_active=True)))
+        users.update(is_active=active)
+        MemberStatusChange.objects.bulk_create([
+            MemberStatusChange(
+                actor=actor, target_id=user_id, target_username=username,
+                was_active=was_active, is_active=active, reason=reason[:255], created_at=now,
+            )
+            for user_id, (username, was_active, _) in targets.items()
+        ])
+
+    for user_id, (_, _, is_staff) in targets.items():
+        if is_staff:
+            sync_leader(user_id)
+    return len(targets)
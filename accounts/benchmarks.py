@@ -0,0 +1,151 @@
+"""
+Benchmark harness for the hot views.
+
+Seeds a synthetic dataset (see accounts/synthetic.py), drives each view
+through the Django test client and records wall time, query count and
+peak Python memory. Results are compared against a JSON baseline so a
+regression fails loudly; run it with `manage.py benchmark_views`.
+"""
+import hashlib
+import hmac
+import json
+import time
+import tracemalloc
+from unittest import mock
+
+from django.conf import settings
+from django.db import connection
+from django.test import Client, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from .models import Profile
+from .synthetic import generate_dataset
+
+SCALES = {
+    'tiny': dict(max_states=1, wards_per_lga=1, members_per_unit=2, donations=50, videos=4, likes_per_video=5),
+    'small': dict(max_states=3, wards_per_lga=2, members_per_unit=5, donations=1000, videos=10, likes_per_video=50),
+    'medium': dict(max_states=10, wards_per_lga=5, members_per_unit=10, donations=20000, videos=20, likes_per_video=200),
+    'large': dict(max_states=None, wards_per_lga=10, members_per_unit=20, donations=200000, videos=40, likes_per_video=1000),
+}
+
+WEBHOOK_SECRET = 'benchmark-secret'
+
+# Absolute slack so sub-millisecond views don't flap on noisy machines
+WALL_SLACK_MS = 5.0
+MEMORY_SLACK_KB = 64.0
+
+
+def seed(scale, seed=42):
+    return generate_dataset(seed=seed, **SCALES[scale])
+
+
+def _webhook_request():
+    from donations.models import Donation
+
+    reference = Donation.objects.filter(status='pending').values_list('reference', flat=True).first()
+    body = json.dumps({'event': 'charge.success', 'data': {'reference': reference}}).encode()
+    signature = hmac.new(WEBHOOK_SECRET.encode(), body, hashlib.sha512).hexdigest()
+    return body, signature
+
+
+def scenarios():
+    """(name, user role, method, url, request kwargs)"""
+    body, signature = _webhook_request()
+    return [
+        ('landing_page', None, 'get', reverse('landing'), {}),
+        ('dashboard', 'leader', 'get', reverse('dashboard'), {}),
+        ('members_list', 'leader', 'get', reverse('members_list'), {}),
+        ('member_search', 'leader', 'get', reverse('member_search'), {'data': {'category': 'FAG'}}),
+        ('leader_directory', 'leader', 'get', reverse('leader_directory'), {'data': {'category': 'FAG'}}),
+        ('inbox', 'member', 'get', reverse('inbox'), {}),
+        ('export_members_excel', 'leader', 'get', reverse('export_members_excel'), {}),
+        ('bulk_payroll_page', 'leader', 'get', reverse('bulk_payroll'), {}),
+        ('paystack_webhook', None, 'post', reverse('paystack_webhook'), {
+            'data': body, 'content_type': 'application/json',
+            'HTTP_X_PAYSTACK_SIGNATURE': signature,
+        }),
+    ]
+
+
+def _actors():
+    leader = Profile.objects.filter(
+        unit__level='NATIONAL', unit__category='FAG', user__is_staff=True
+    ).select_related('user').first().user
+    member = Profile.objects.filter(
+        unit__level='WARD', user__is_staff=False, is_active=True
+    ).select_related('user').first().user
+    return {'leader': leader, 'member': member}
+
+
+def measure(client, method, url, kwargs):
+    # CaptureQueriesContext counts through a bounded deque; start each
+    # measurement empty so long runs can't saturate it and report zero.
+    connection.queries_log.clear()
+    tracemalloc.start()
+    started = time.perf_counter()
+    with CaptureQueriesContext(connection) as queries:
+        response = getattr(client, method)(url, **kwargs)
+        if response.streaming:
+            b''.join(response.streaming_content)
+    wall_ms = (time.perf_counter() - started) * 1000
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return response.status_code, {
+        'wall_ms': round(wall_ms, 2),
+        'queries': len(queries),
+        'peak_kb': round(peak / 1024, 1),
+    }
+
+
+@override_settings(PAYSTACK_SECRET_KEY=WEBHOOK_SECRET)
+def run_benchmarks(repeat=3):
+    """
+    Runs every scenario `repeat` times (after one warm-up request) and keeps
+    the best wall time and the worst query count / peak memory.
+    """
+    actors = _actors()
+    results = {}
+    # The payroll page asks Paystack for the balance; keep it offline
+    with mock.patch('accounts.views.get_paystack_balance', return_value=0):
+        for name, role, method, url, kwargs in scenarios():
+            client = Client()
+            if role:
+                client.force_login(actors[role])
+            measure(client, method, url, kwargs)
+
+            runs = []
+            for _ in range(repeat):
+                status, metrics = measure(client, method, url, kwargs)
+                if status >= 400:
+                    raise AssertionError(f"{name} returned HTTP {status}")
+                runs.append(metrics)
+            results[name] = {
+                'wall_ms': min(r['wall_ms'] for r in runs),
+                'queries': max(r['queries'] for r in runs),
+                'peak_kb': max(r['peak_kb'] for r in runs),
+            }
+    return results
+
+
+def compare(results, baseline, tolerance=0.25):
+    """
+    Returns a list of human-readable regressions. Query counts must not grow
+    at all; wall time and memory may grow by `tolerance` (plus a small slack).
+    """
+    regressions = []
+    for name, current in results.items():
+        previous = baseline.get(name)
+        if previous is None:
+            continue
+        if current['queries'] > previous['queries']:
+            regressions.append(f"{name}: {current['queries']} queries (baseline {previous['queries']})")
+        if current['wall_ms'] > previous['wall_ms'] * (1 + tolerance) + WALL_SLACK_MS:
+            regressions.append(f"{name}: {current['wall_ms']}ms (baseline {previous['wall_ms']}ms)")
+        if current['peak_kb'] > previous['peak_kb'] * (1 + tolerance) + MEMORY_SLACK_KB:
+            regressions.append(f"{name}: {current['peak_kb']}KB peak (baseline {previous['peak_kb']}KB)")
+    return regressions
+
+
+def baseline_path():
+    return getattr(settings, 'BENCHMARK_BASELINE', settings.BASE_DIR / 'benchmarks' / 'baseline.json')
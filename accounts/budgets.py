@@ -0,0 +1,83 @@
+"""
+Per-view query budgets, keyed by URL name.
+
+Each entry is the most queries one request to that view may run, counted
+across the whole request (session and user lookups included), and must hold
+no matter how many rows the page lists. QueryBudgetMiddleware enforces them:
+QUERY_BUDGET_MODE='raise' in tests, 'warn' to log overruns in production.
+"""
+
+
+class QueryBudgetExceeded(Exception):
+    pass
+
+
+QUERY_BUDGETS = {
+    # accounts
+    'landing': 6,
+    'dashboard': 12,
+    'approve_member': 12,
+    'bulk_approve_members': 12,
+    'login': 16,  # axes records every attempt
+    'logout': 4,
+    'register': 16,  # creates user, unit, profile and their approver rows
+    'member_search': 6,
+    'send_message': 10,
+    'update_username': 6,
+    'payroll_history': 7,
+    'upload_video': 6,
+    'leader_directory': 6,
+    'bulk_payroll': 8,  # includes the unit's recent payroll runs
+    # One template upsert and one record INSERT however many members are paid;
+    # the transfers are sent by `manage.py disburse_payroll`
+    'process_payroll': 14,
+    'verify_payment': 2,
+    'export_payroll_csv': 3,
+    'member_detail': 5,
+    'export_members_excel': 7,
+    'message_view': 6,
+    'edit_profile': 10,
+    'submit_report': 6,
+    'disciplinary_admin': 8,
+    'bulk_message_send': 8,
+    'members_list': 8,
+    'toggle_member_status': 10,
+    'bulk_member_status': 12,
+    # One statement per related table; a heavy account adds one per extra chunk
+    'delete_member_permanent': 30,
+    'bulk_delete_members': 30,
+    'verify_account_ajax': 2,
+    'video_detail': 4,
+    'inbox': 6,
+    'sent_messages': 4,
+    'mark_read_ajax': 4,
+    'delete_message': 6,
+    'leader_reply': 6,
+    'ajax_load_lgas': 4,
+    'ajax_load_wards': 4,
+    'ajax_geography': 4,
+    'password_reset': 6,
+    'password_reset_done': 2,
+    'password_reset_confirm': 6,
+    'password_reset_complete': 2,
+
+    # donations
+    'donation': 4,
+    'process_card_payment': 4,
+    'bank_transfer_details': 4,
+    'payment_success': 2,
+    'payment_pending': 2,
+    'payment_status': 1,
+    'payment_status_wait': 7,  # one status read per DONATION_STATUS_TTL while waiting
+    # A single INSERT in BEGIN/COMMIT (donations/events.py does the rest),
+    # plus the gateway registry read on a cold process
+    'paystack_webhook': 4,
+    'confirm_bank_transfer': 6,
+
+    # project
+    'outbound_metrics': 2,  # none with the scrape token
+}
+
+
+def budget_for(url_name):
+    return QUERY_BUDGETS.get(url_name)
@@ -0,0 +1,95 @@
+import time
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import cache
+from django.http import HttpResponse
+from django.middleware.csrf import get_token
+from django.utils.translation import get_language
+
+# Rendered in place of the CSRF token when a page is cached for everyone;
+# swapped for the visitor's own token every time the page is served.
+CSRF_PLACEHOLDER = 'CSRFTOKENPLACEHOLDER0000000000000000000000000000000000000000000'
+
+
+def _version_key(namespace):
+    return f"version:{namespace}"
+
+
+def get_versions(*namespaces):
+    """
+    Current version of each cache namespace, e.g. {'videos': 1718...}.
+    Versions are timestamps, so an evicted counter can never resurrect
+    an old fragment by starting again from the same number.
+    """
+    keys = {_version_key(ns): ns for ns in namespaces}
+    found = cache.get_many(keys)
+    versions = {}
+    for key, ns in keys.items():
+        version = found.get(key)
+        if version is None:
+            version = time.time_ns()
+            cache.add(key, version, None)
+            version = cache.get(key, version)
+        versions[ns] = version
+    return versions
+
+
+def bump_version(namespace):
+    """Invalidates every fragment and page keyed on `namespace`."""
+    cache.set(_version_key(namespace), time.time_ns(), None)
+
+
+def _is_page_cacheable(request):
+    return (
+        request.method in ('GET', 'HEAD')
+        and not request.GET
+        and not request.user.is_authenticated
+        # Pending flash messages or guest likes make the page visitor-specific
+        and not request.COOKIES.get('messages')
+        and not request.session.get('_messages')
+        and not request.session.get('guest_liked_videos')
+    )
+
+
+def _with_csrf_token(request, content):
+    if CSRF_PLACEHOLDER.encode() in content:
+        content = content.replace(CSRF_PLACEHOLDER.encode(), get_token(request).encode())
+    return content
+
+
+def cache_anonymous_page(*namespaces, timeout=None):
+    """
+    Full-page cache for anonymous visitors, one entry per language.
+    The key embeds the versions of `namespaces`, so bumping any of them
+    (see accounts.signals) retires the cached page immediately.
+
+    The decorated view must render `csrf_token` from its context, which
+    is set to CSRF_PLACEHOLDER while the shared copy is produced.
+    `timeout` may be a callable, evaluated each time a copy is stored.
+    """
+    def decorator(view_func):
+        @wraps(view_func)
+        def _wrapped(request, *args, **kwargs):
+            if not _is_page_cacheable(request):
+                return view_func(request, *args, **kwargs)
+
+            versions = get_versions(*namespaces)
+            version_tag = '-'.join(str(versions[ns]) for ns in namespaces)
+            key = f"page:{request.path}:{get_language()}:{version_tag}"
+
+            content = cache.get(key)
+            if content is None:
+                request.shared_page_cache = True
+                response = view_func(request, *args, **kwargs)
+                if response.status_code != 200 or response.streaming:
+                    return response
+                content = response.content
+                seconds = timeout() if callable(timeout) else timeout
+                cache.set(key, content, seconds or settings.PAGE_CACHE_TIMEOUT)
+
+            response = HttpResponse(_with_csrf_token(request, content))
+            response['Content-Language'] = get_language()
+            return response
+        return _wrapped
+    return decorator
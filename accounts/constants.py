@@ -26,4 +26,8 @@ BANK_CHOICES = [
     ('057', 'Zenith Bank'),
     ('50211', 'Kuda Bank'),
     ('999992', 'OPay (Paycom)'),
-]
\ No newline at end of file
+]
+
+# PayrollRecord.month / PayrollRun.month values
+MONTHS = ['January', 'February', 'March', 'April', 'May', 'June', 'July',
+          'August', 'September', 'October', 'November', 'December']
\ No newline at end of file
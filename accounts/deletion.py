@@ -0,0 +1,121 @@
+"""
+Chunked hard deletion of member accounts.
+
+`User.delete()` makes Django's collector load every dependent Message,
+PayrollRecord, Disbursement, report and like into memory before cascading,
+and SQLite's single writer stays locked for the whole operation. purge_users()
+walks the same relations from model metadata instead and removes dependents
+bottom-up with raw `DELETE ... WHERE id IN (SELECT ... LIMIT n)` statements.
+Each statement is its own short transaction, so other requests can write
+between chunks. Signals are not sent: approver rows go with the cascade,
+and like counts are not part of any cached fragment.
+"""
+from collections import Counter
+
+from django.db import connection, models
+from django.db.models import Exists, OuterRef
+
+from .models import Profile, User
+
+DEFAULT_CHUNK_SIZE = 500
+
+
+def _qn(name):
+    return connection.ops.quote_name(name)
+
+
+def _select(model, column, where):
+    return f"SELECT {_qn(column)} FROM {_qn(model._meta.db_table)} WHERE {where}"
+
+
+class _Purge:
+    def __init__(self, params, chunk_size, progress):
+        self.params = list(params)
+        self.chunk_size = chunk_size
+        self.progress = progress
+        self.deleted = Counter()
+
+    def _chunked(self, model, statement, where):
+        """Runs `statement` against chunks of the rows matching `where` until none are left."""
+        pk = _qn(model._meta.pk.column)
+        sql = f"{statement} WHERE {pk} IN ({_select(model, model._meta.pk.column, where)} LIMIT %s)"
+        total = 0
+        while True:
+            with connection.cursor() as cursor:
+                cursor.execute(sql, self.params + [self.chunk_size])
+                count = cursor.rowcount
+            total += count
+            if count and self.progress:
+                self.progress(model._meta.label, total)
+            if count < self.chunk_size:
+                return total
+
+    def _through(self, through, column, parent_where):
+        where = f"{_qn(column)} IN ({parent_where})"
+        self.deleted[through._meta.label] += self._chunked(
+            through, f"DELETE FROM {_qn(through._meta.db_table)}", where
+        )
+
+    def purge(self, model, where, path=()):
+        if model in path:
+            raise ValueError(f"Cannot purge the cyclic cascade through {model._meta.label}")
+        pks = _select(model, model._meta.pk.column, where)
+
+        for rel in model._meta.related_objects:
+            child, field = rel.related_model, rel.field
+            if rel.many_to_many:
+                if rel.through._meta.auto_created:
+                    self._through(rel.through, field.m2m_reverse_name(), pks)
+                continue
+            child_where = f"{_qn(field.column)} IN ({_select(model, field.target_field.column, where)})"
+            if rel.on_delete is models.CASCADE:
+                self.purge(child, child_where, path + (model,))
+            elif rel.on_delete is models.SET_NULL:
+                self._chunked(child, f"UPDATE {_qn(child._meta.db_table)} SET {_qn(field.column)} = NULL", child_where)
+            elif rel.on_delete is not models.DO_NOTHING:
+                raise ValueError(f"{child._meta.label}.{field.name} does not allow chunked deletion")
+
+        for field in model._meta.many_to_many:
+            if field.remote_field.through._meta.auto_created:
+                self._through(field.remote_field.through, field.m2m_column_name(), pks)
+
+        self.deleted[model._meta.label] += self._chunked(model, f"DELETE FROM {_qn(model._meta.db_table)}", where)
+
+
+def purge_users(user_ids, chunk_size=DEFAULT_CHUNK_SIZE, progress=None):
+    """
+    Permanently deletes the users in `user_ids` and everything that cascades
+    from them, `chunk_size` rows per statement. `progress(label, rows_so_far)`
+    is called after each chunk. Returns a Counter of rows deleted per model.
+    """
+    user_ids = [int(pk) for pk in user_ids]
+    if not user_ids:
+        return Counter()
+
+    placeholders = ', '.join(['%s'] * len(user_ids))
+    job = _Purge(user_ids, chunk_size, progress)
+    job.purge(User, f"{_qn(User._meta.pk.column)} IN ({placeholders})")
+    return job.deleted
+
+
+def deletable_members(actor):
+    """
+    Users `actor` may permanently delete: National leaders anyone but the
+    National chairmen, State leaders the LG and Ward members of their State.
+    """
+    users = User.objects.exclude(pk=actor.pk)
+    if actor.is_superuser:
+        return users
+    office = actor.primary_profile
+    if not actor.is_staff or office is None or office.unit is None:
+        return users.none()
+
+    if office.unit.level == 'NATIONAL':
+        return users.exclude(Exists(Profile.objects.filter(
+            user=OuterRef('pk'), unit__level='NATIONAL', position__icontains='chairman'
+        )))
+    if office.unit.level == 'STATE':
+        return users.filter(Exists(Profile.objects.filter(
+            user=OuterRef('pk'), unit__state_id=office.unit.state_id, unit__level__in=['LG', 'WARD']
+        )))
+    return users.none()
@@ -8,6 +8,7 @@ from django import forms
 from .models import User, Profile, State, LGA, Ward, OrganizationUnit
 from django.contrib.auth import get_user_model
 from .constants import BANK_CHOICES
+from .geography import get_bundle as get_geography_bundle
 
 
 class ApprovedOnlyLoginForm(AuthenticationForm):
@@ -50,14 +51,18 @@ class RegistrationForm(forms.ModelForm):
     )
 
     # 3. Location Hierarchy
-    state = forms.ModelChoiceField(
-        queryset=State.objects.all(),
+    # Choices come from the memoized geography bundle, so rendering and
+    # validating the form costs no geography queries.
+    state = forms.TypedChoiceField(
+        coerce=int,
         required=False,
+        empty_value=None,
         widget=forms.Select(attrs={'class': 'form-select'})
     )
-    lga = forms.ModelChoiceField(
-        queryset=LGA.objects.all(),
+    lga = forms.TypedChoiceField(
+        coerce=int,
         required=False,
+        empty_value=None,
         widget=forms.Select(attrs={'class': 'form-select'})
     )
     # Ensure Ward is a CharField (Text Input) and also not required
@@ -96,19 +101,16 @@ class RegistrationForm(forms.ModelForm):
 
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
+        self.geography = get_geography_bundle()
+        self.fields['state'].choices = [('', 'Select State')] + self.geography.state_choices()
 
         # Logic to maintain dropdown selections if the form fails validation
+        lga_choices = []
         if 'state' in self.data:
             try:
-                state_id = int(self.data.get('state'))
-                self.fields['lga'].queryset = LGA.objects.filter(state_id=state_id).order_by('name')
-            except (ValueError, TypeError): pass
-
-        if 'lga' in self.data:
-            try:
-                lga_id = int(self.data.get('lga'))
-                self.fields['ward'].queryset = Ward.objects.filter(lga_id=lga_id).order_by('name')
+                lga_choices = self.geography.lga_choices(int(self.data.get('state')))
             except (ValueError, TypeError): pass
+        self.fields['lga'].choices = [('', 'Select LGA')] + lga_choices
 
     def clean(self):
         cleaned_data = super().clean()
@@ -117,6 +119,14 @@ class RegistrationForm(forms.ModelForm):
 
         if password and confirm_password and password != confirm_password:
             self.add_error('confirm_password', "Passwords do not match!")
+
+        # Hand the view model instances built from the bundle (no lookups)
+        state_id = cleaned_data.get('state')
+        lga_id = cleaned_data.get('lga')
+        if lga_id is not None and self.geography.lgas[lga_id][0] != state_id:
+            self.add_error('lga', "This LGA is not in the selected State.")
+        cleaned_data['state'] = State(pk=state_id, name=self.geography.states[state_id]) if state_id else None
+        cleaned_data['lga'] = LGA(pk=lga_id, state_id=state_id, name=self.geography.lgas[lga_id][1]) if lga_id and 'lga' not in self.errors else None
         return cleaned_data
 
 class MessageForm(forms.ModelForm):
@@ -0,0 +1,80 @@
+import gzip
+import hashlib
+import json
+import threading
+
+from .cache import bump_version, get_versions
+from .models import LGA, State, Ward
+
+
+class GeographyBundle:
+    """
+    Immutable snapshot of the whole State -> LGA -> Ward tree, built once
+    per process and per geography version.
+    """
+
+    def __init__(self, version, states, lgas, wards):
+        self.version = version
+
+        self.states = {s['id']: s['name'] for s in states}
+        self.lgas = {l['id']: (l['state_id'], l['name']) for l in lgas}
+        self.lgas_by_state = {}
+        for l in lgas:
+            self.lgas_by_state.setdefault(l['state_id'], []).append({'id': l['id'], 'name': l['name']})
+        self.wards_by_lga = {}
+        for w in wards:
+            self.wards_by_lga.setdefault(w['lga_id'], []).append({'id': w['id'], 'name': w['name']})
+
+        tree = {
+            'version': str(version),
+            'states': [
+                {
+                    'id': s['id'],
+                    'name': s['name'],
+                    'lgas': [
+                        dict(l, wards=self.wards_by_lga.get(l['id'], []))
+                        for l in self.lgas_by_state.get(s['id'], [])
+                    ],
+                }
+                for s in states
+            ],
+        }
+        self.json = json.dumps(tree, separators=(',', ':'), ensure_ascii=False).encode('utf-8')
+        self.gzip = gzip.compress(self.json, compresslevel=9, mtime=0)
+        self.etag = '"%s"' % hashlib.sha1(self.json).hexdigest()
+
+    def state_choices(self):
+        return [(state_id, name) for state_id, name in self.states.items()]
+
+    def lga_choices(self, state_id):
+        return [(l['id'], l['name']) for l in self.lgas_by_state.get(state_id, [])]
+
+
+_bundle = None
+_lock = threading.Lock()
+
+
+def get_bundle():
+    """
+    Returns the memoized bundle, rebuilding it (3 queries) only when the
+    shared 'geography' version has been bumped by an import or admin edit.
+    """
+    global _bundle
+    version = get_versions('geography')['geography']
+    bundle = _bundle
+    if bundle is not None and bundle.version == version:
+        return bundle
+
+    with _lock:
+        if _bundle is None or _bundle.version != version:
+            _bundle = GeographyBundle(
+                version,
+                list(State.objects.order_by('name').values('id', 'name')),
+                list(LGA.objects.order_by('name').values('id', 'state_id', 'name')),
+                list(Ward.objects.order_by('name').values('id', 'lga_id', 'name')),
+            )
+        return _bundle
+
+
+def invalidate():
+    bump_version('geography')
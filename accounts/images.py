@@ -0,0 +1,132 @@
+import hashlib
+from io import BytesIO
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from PIL import Image, ImageOps
+
+FORMATS = {
+    'webp': ('WEBP', 'webp', {'quality': 80, 'method': 4}),
+    'jpeg': ('JPEG', 'jpg', {'quality': 82, 'optimize': True, 'progressive': True}),
+}
+
+DERIVATIVE_DIR = 'derivatives'
+
+EXIF_ORIENTATION = 0x0112
+
+
+class UndecodableImage(ValueError):
+    pass
+
+
+def get_preset_widths(preset):
+    """Widths (in px) pre-rendered for <img srcset>; see settings.IMAGE_DERIVATIVE_PRESETS."""
+    return settings.IMAGE_DERIVATIVE_PRESETS[preset]
+
+
+def source_hash(field_file):
+    """SHA-1 of the original upload, memoized per stored file name and size."""
+    storage = field_file.storage
+    key = f"img:hash:{field_file.name}:{storage.size(field_file.name)}"
+    digest = cache.get(key)
+    if digest is None:
+        sha = hashlib.sha1()
+        with storage.open(field_file.name, 'rb') as fh:
+            for chunk in iter(lambda: fh.read(64 * 1024), b''):
+                sha.update(chunk)
+        digest = sha.hexdigest()
+        cache.set(key, digest, None)
+    return digest
+
+
+def derivative_name(digest, width, fmt):
+    ext = FORMATS[fmt][1]
+    return f"{DERIVATIVE_DIR}/{digest[:2]}/{digest}_{width}.{ext}"
+
+
+def _render(image, width, fmt):
+    pil_format, _, options = FORMATS[fmt]
+    img = image.copy()
+    if img.width > width:
+        img.thumbnail((width, max(img.height * width // img.width, 1)), Image.LANCZOS)
+    buf = BytesIO()
+    img.save(buf, pil_format, **options)
+    return buf.getvalue()
+
+
+def _load(field_file):
+    with field_file.storage.open(field_file.name, 'rb') as fh:
+        try:
+            image = Image.open(fh)
+            image = ImageOps.exif_transpose(image)
+            return image.convert('RGB')
+        except (OSError, ValueError, Image.DecompressionBombError) as exc:
+            raise UndecodableImage(field_file.name) from exc
+
+
+def _display_width(field_file):
+    """Width after EXIF rotation, read from the header without decoding pixels."""
+    with field_file.storage.open(field_file.name, 'rb') as fh:
+        try:
+            header = Image.open(fh)
+            width, height = header.size
+            if header.getexif().get(EXIF_ORIENTATION) in (5, 6, 7, 8):
+                return height
+            return width
+        except (OSError, ValueError, Image.DecompressionBombError) as exc:
+            raise UndecodableImage(field_file.name) from exc
+
+
+def build_derivatives(field_file, preset):
+    """
+    Renders every (width, format) derivative of `field_file` for the preset
+    that is not already in storage. Returns {fmt: [(width, url), ...]}
+    sorted by width, ready for a srcset attribute.
+
+    Raises UndecodableImage when Pillow cannot read the file; the failure is
+    remembered per source hash so the same bytes are not decoded again.
+    """
+    digest = source_hash(field_file)
+    cache_key = f"img:derivatives:{digest}:{preset}"
+    result = cache.get(cache_key)
+    if result is not None:
+        return result
+    failed_key = f"img:undecodable:{digest}"
+    if cache.get(failed_key):
+        raise UndecodableImage(field_file.name)
+
+    storage = default_storage
+    image = None
+    result = {fmt: [] for fmt in FORMATS}
+    try:
+        src_width = _display_width(field_file)
+
+        # Small originals are never upscaled, so several presets may collapse
+        # onto the same intrinsic width; keep one file per distinct width.
+        widths = sorted({min(w, src_width) for w in get_preset_widths(preset)})
+        for width in widths:
+            for fmt in FORMATS:
+                name = derivative_name(digest, width, fmt)
+                if not storage.exists(name):
+                    if image is None:
+                        image = _load(field_file)
+                    storage.save(name, ContentFile(_render(image, width, fmt)))
+                result[fmt].append((width, storage.url(name)))
+    except UndecodableImage:
+        cache.set(failed_key, True, None)
+        raise
+
+    cache.set(cache_key, result, None)
+    return result
+
+
+def ensure_derivatives(field_file, preset):
+    """Best-effort generation used on upload; never breaks the save."""
+    if not field_file:
+        return None
+    try:
+        return build_derivatives(field_file, preset)
+    except (OSError, ValueError, Image.DecompressionBombError):
+        return None
@@ -0,0 +1,240 @@
+"""
+Unified spending ledger.
+
+Money leaves a unit through two tables: Disbursement (one row per Paystack
+transfer) and PayrollRecord (one row per member and month, written by
+payroll runs or by hand). LedgerEntry records what actually settled from
+either, once per transfer reference: a run payment has both a record and a
+disbursement under the same reference and is posted once, as `payroll`.
+
+- A payment is posted when it succeeds (Disbursement SUCCESS, PayrollRecord
+  success), attributed to the run's unit, else the authorising leader's
+  unit, else the member's unit.
+- A posted payment that is later failed or reversed gets a negative
+  `reversal` entry; entries themselves are never changed.
+
+Every post also adds to UnitBalance (the unit's running total) and
+UnitMonthlySpend with a `total = total + n` UPDATE each, in the same
+transaction, so a unit's spend is a primary-key read and monthly totals a
+range read. Settlement paths call sync_references() (transfer webhooks, see
+donations/events.py) or the post_save signals (admin and one-off saves).
+`manage.py rebuild_ledger` posts anything missing and recomputes the
+snapshots from the entries; migration 0031 ran it once for the payments
+settled before the ledger existed.
+
+A reference settles at most once: after its reversal, a later success under
+the same reference (a redelivered or out-of-order webhook, an admin edit) is
+not posted again. Paying a member again needs a new transfer reference.
+"""
+from collections import defaultdict
+from dataclasses import dataclass
+from decimal import Decimal
+from functools import reduce
+from operator import or_
+
+from django.db import transaction
+from django.db.models import Case, Count, F, Q, Sum, Value, When
+from django.db.models.functions import ExtractMonth, ExtractYear
+from django.utils import timezone
+
+from .models import Disbursement, LedgerEntry, PayrollRecord, Profile, UnitBalance, UnitMonthlySpend
+
+REVERSAL_SUFFIX = ':reversal'
+
+PAID, UNDONE = 'paid', 'undone'
+
+DISBURSEMENT_STATES = {'SUCCESS': PAID, 'FAILED': UNDONE, 'REVERSED': UNDONE}
+RECORD_STATES = {'success': PAID, 'failed': UNDONE}
+
+DISBURSEMENT_FIELDS = ('pk', 'transaction_reference', 'recipient_id', 'authorized_by_id', 'amount', 'status', 'timestamp')
+RECORD_FIELDS = ('reference', 'member_id', 'amount', 'status', 'payment_date', 'created_at',
+                 'run__unit_id', 'run__created_by_id')
+
+
+@dataclass
+class Payment:
+    reference: str
+    state: str  # PAID, UNDONE, or None while in flight
+    kind: str
+    amount: Decimal
+    member_id: int = None
+    authorized_by_id: int = None
+    unit_id: int = None
+    paid_at: object = None
+
+
+def disbursement_reference(row):
+    """Ledger reference of a Disbursement row; rows from before transfer references get one from their id."""
+    return row['transaction_reference'] or f"DSB-{row['pk']}"
+
+
+def _primary_units(user_ids):
+    """{user_id: unit_id} of each user's first profile, in one query."""
+    units = {}
+    rows = Profile.objects.filter(user_id__in=user_ids).order_by('user_id', 'pk').values_list('user_id', 'unit_id')
+    for user_id, unit_id in rows:
+        units.setdefault(user_id, unit_id)
+    return units
+
+
+def _payments(disbursements, records):
+    """Merges Disbursement and PayrollRecord value rows into one Payment per reference."""
+    payments = {}
+    for row in records:
+        payments[row['reference']] = Payment(
+            reference=row['reference'], state=RECORD_STATES.get(row['status']), kind='payroll',
+            amount=row['amount'], member_id=row['member_id'], authorized_by_id=row['run__created_by_id'],
+            unit_id=row['run__unit_id'], paid_at=row['payment_date'] or row['created_at'],
+        )
+    for row in disbursements:
+        reference = disbursement_reference(row)
+        payment = payments.get(reference)
+        if payment is None:
+            payments[reference] = Payment(
+                reference=reference, state=None, kind='disbursement', amount=row['amount'],
+                member_id=row['recipient_id'], paid_at=row['timestamp'],
+            )
+            payment = payments[reference]
+        # The transfer is the source of truth for whether the money moved
+        payment.state = DISBURSEMENT_STATES.get(row['status'])
+        payment.authorized_by_id = payment.authorized_by_id or row['authorized_by_id']
+
+    unresolved = [p for p in payments.values() if p.unit_id is None]
+    if unresolved:
+        units = _primary_units({p.authorized_by_id or p.member_id for p in unresolved})
+        for payment in unresolved:
+            payment.unit_id = units.get(payment.authorized_by_id) or units.get(payment.member_id)
+    return payments
+
+
+def _entries(payments):
+    """The entries `payments` still need, given what is already posted."""
+    candidates = [p for p in payments.values() if p.state]
+    if not candidates:
+        return []
+    references = [p.reference for p in candidates] + [p.reference + REVERSAL_SUFFIX for p in candidates]
+    posted = set(LedgerEntry.objects.filter(reference__in=references).values_list('reference', flat=True))
+
+    now = timezone.now()
+    entries = []
+    for p in candidates:
+        common = dict(unit_id=p.unit_id, member_id=p.member_id, authorized_by_id=p.authorized_by_id)
+        if p.state == PAID and p.reference not in posted:
+            entries.append(LedgerEntry(kind=p.kind, amount=p.amount, reference=p.reference,
+                                       created_at=p.paid_at or now, **common))
+        elif p.state == UNDONE and p.reference in posted and p.reference + REVERSAL_SUFFIX not in posted:
+            entries.append(LedgerEntry(kind='reversal', amount=-p.amount, reference=p.reference + REVERSAL_SUFFIX,
+                                       created_at=now, **common))
+    return entries
+
+
+def _upsert(model, key_fields, total, rows, updated_at=False):
+    """
+    Adds rows of (*key, amount, entry_count) to `model`'s `total` and
+    entry_count, creating the rows that do not exist yet: missing rows are
+    inserted empty, then one UPDATE adds every row's share (the
+    donations/rollups.py pattern).
+    """
+    if not rows:
+        return
+    lines = [(dict(zip(key_fields, key)), amount, count) for *key, amount, count in rows]
+    model.objects.bulk_create([model(**key) for key, _, _ in lines], ignore_conflicts=True)
+    changes = {
+        total: F(total) + Case(
+            *(When(Q(**key), then=Value(amount)) for key, amount, _ in lines),
+            output_field=model._meta.get_field(total),
+        ),
+        'entry_count': F('entry_count') + Case(*(When(Q(**key), then=Value(count)) for key, _, count in lines)),
+    }
+    if updated_at:
+        changes['updated_at'] = timezone.now()
+    model.objects.filter(reduce(or_, (Q(**key) for key, _, _ in lines))).update(**changes)
+
+
+def post_entries(entries):
+    """
+    Appends `entries` and adds them to their units' balances and monthly
+    totals, all or nothing. A reference posted concurrently by another
+    process raises IntegrityError and rolls the whole post back.
+    """
+    if not entries:
+        return []
+    balances = defaultdict(lambda: [Decimal(0), 0])
+    months = defaultdict(lambda: [Decimal(0), 0])
+    for entry in entries:
+        if entry.unit_id is None:
+            continue
+        local = timezone.localtime(entry.created_at)
+        for bucket in (balances[entry.unit_id], months[entry.unit_id, local.year, local.month]):
+            bucket[0] += entry.amount
+            bucket[1] += 1
+
+    with transaction.atomic():
+        LedgerEntry.objects.bulk_create(entries)
+        _upsert(UnitBalance, ['unit_id'], 'total_spent',
+                [(unit_id, *total) for unit_id, total in balances.items()], updated_at=True)
+        _upsert(UnitMonthlySpend, ['unit_id', 'year', 'month'], 'total',
+                [(*key, *total) for key, total in months.items()])
+    return entries
+
+
+def sync_references(references):
+    """Posts whatever changed for the payments made under these transfer/payroll references."""
+    references = list(references)
+    if not references:
+        return []
+    disbursements = Disbursement.objects.filter(transaction_reference__in=references).values(*DISBURSEMENT_FIELDS)
+    records = PayrollRecord.objects.filter(reference__in=references).values(*RECORD_FIELDS)
+    return post_entries(_entries(_payments(disbursements, records)))
+
+
+def sync_disbursement(disbursement):
+    if disbursement.transaction_reference:
+        return sync_references([disbursement.transaction_reference])
+    row = {f: getattr(disbursement, f) for f in DISBURSEMENT_FIELDS}
+    return post_entries(_entries(_payments([row], [])))
+
+
+def backfill(batch_size=500):
+    """Posts every settled payment the ledger does not have yet. Returns the number of entries written."""
+    posted = 0
+    legacy = Disbursement.objects.filter(transaction_reference__isnull=True, status__in=DISBURSEMENT_STATES)
+    rows = list(legacy.order_by('pk').values(*DISBURSEMENT_FIELDS))
+    for start in range(0, len(rows), batch_size):
+        posted += len(post_entries(_entries(_payments(rows[start:start + batch_size], []))))
+
+    references = set(Disbursement.objects.filter(
+        transaction_reference__isnull=False, status__in=DISBURSEMENT_STATES,
+    ).values_list('transaction_reference', flat=True))
+    references.update(PayrollRecord.objects.filter(status__in=RECORD_STATES).values_list('reference', flat=True))
+    references = sorted(references)
+    for start in range(0, len(references), batch_size):
+        posted += len(sync_references(references[start:start + batch_size]))
+    return posted
+
+
+def rebuild_snapshots(batch_size=1000):
+    """Recomputes UnitBalance and UnitMonthlySpend from the entries. Returns (balances, months) written."""
+    entries = LedgerEntry.objects.filter(unit__isnull=False).order_by()
+    now = timezone.now()
+    balances = [
+        UnitBalance(unit_id=row['unit'], total_spent=row['total'], entry_count=row['n'], updated_at=now)
+        for row in entries.values('unit').annotate(total=Sum('amount'), n=Count('pk'))
+    ]
+    months = [
+        UnitMonthlySpend(unit_id=row['unit'], year=row['year'], month=row['month'], total=row['total'], entry_count=row['n'])
+        for row in entries.annotate(year=ExtractYear('created_at'), month=ExtractMonth('created_at'))
+        .values('unit', 'year', 'month').annotate(total=Sum('amount'), n=Count('pk'))
+    ]
+    with transaction.atomic():
+        UnitBalance.objects.all().delete()
+        UnitMonthlySpend.objects.all().delete()
+        UnitBalance.objects.bulk_create(balances, batch_size=batch_size)
+        UnitMonthlySpend.objects.bulk_create(months, batch_size=batch_size)
+    return len(balances), len(months)
+
+
+def unit_spent(unit):
+    """The unit's net spend to date."""
+    total = UnitBalance.objects.filter(unit=unit).values_list('total_spent', flat=True).first()
+    return total or Decimal(0)
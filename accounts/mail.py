@@ -0,0 +1,180 @@
+"""
+Database-backed email outbox.
+
+QueuedEmailBackend (the project's EMAIL_BACKEND) never talks to SMTP: it
+stores each message as an OutboundEmail row once the surrounding transaction
+commits, so a rolled-back registration sends nothing and the request never
+waits on Gmail. `manage.py send_queued_mail` then delivers due rows in
+batches over one reused EMAIL_DELIVERY_BACKEND connection, retrying
+failures with exponential backoff. Each batch is claimed (`sending`) with a
+conditional UPDATE first, so overlapping workers never send a row twice.
+"""
+import logging
+import random
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.mail import EmailMultiAlternatives, get_connection
+from django.core.mail.backends.base import BaseEmailBackend
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from .models import OutboundEmail
+
+logger = logging.getLogger('izalams.mail')
+
+MAX_RETRY_DELAY = timedelta(hours=6)
+
+# A worker that died mid-batch leaves rows in `sending`; others take them over after this
+CLAIM_TIMEOUT = timedelta(minutes=10)
+
+
+def delivery_backend():
+    return getattr(settings, 'EMAIL_DELIVERY_BACKEND', 'django.core.mail.backends.smtp.EmailBackend')
+
+
+def to_outbound(message):
+    """EmailMessage -> unsaved OutboundEmail row."""
+    body, html_body = message.body, ''
+    if message.content_subtype == 'html':
+        body, html_body = '', message.body
+    for content, mimetype in getattr(message, 'alternatives', []):
+        if mimetype == 'text/html':
+            html_body = content
+    return OutboundEmail(
+        subject=message.subject,
+        body=body,
+        html_body=html_body,
+        from_email=message.from_email or '',
+        to=list(message.to),
+        cc=list(message.cc),
+        bcc=list(message.bcc),
+        reply_to=list(message.reply_to),
+        headers=dict(message.extra_headers),
+    )
+
+
+def to_message(email, connection=None):
+    """OutboundEmail row -> EmailMultiAlternatives ready to send."""
+    message = EmailMultiAlternatives(
+        subject=email.subject,
+        body=email.body,
+        from_email=email.from_email or None,
+        to=email.to,
+        cc=email.cc,
+        bcc=email.bcc,
+        reply_to=email.reply_to,
+        headers=email.headers,
+        connection=connection,
+    )
+    if email.html_body:
+        message.attach_alternative(email.html_body, 'text/html')
+    return message
+
+
+class QueuedEmailBackend(BaseEmailBackend):
+    """
+    Enqueues messages on transaction commit instead of sending them.
+    Messages with attachments are not stored and go straight to the
+    delivery backend.
+    """
+
+    def send_messages(self, email_messages):
+        rows, direct = [], []
+        for message in email_messages:
+            if not message.recipients():
+                continue
+            (direct if message.attachments else rows).append(message)
+
+        if direct:
+            get_connection(delivery_backend(), fail_silently=self.fail_silently).send_messages(direct)
+
+        if rows:
+            rows = [to_outbound(m) for m in rows]
+            transaction.on_commit(lambda: OutboundEmail.objects.bulk_create(rows))
+        return len(rows) + len(direct)
+
+
+def retry_delay(attempts):
+    """Exponential backoff with +/-10% jitter, capped at MAX_RETRY_DELAY."""
+    base = getattr(settings, 'EMAIL_OUTBOX_RETRY_BASE', 60)
+    delay = min(timedelta(seconds=base * 2 ** (attempts - 1)), MAX_RETRY_DELAY)
+    return delay * random.uniform(0.9, 1.1)
+
+
+def _failed(email, exc, now, max_attempts):
+    email.attempts += 1
+    email.last_error = f"{type(exc).__name__}: {exc}"[:2000]
+    if email.attempts >= max_attempts:
+        email.status = 'failed'
+        logger.error("Giving up on email %s after %d attempts: %s", email.pk, email.attempts, email.last_error)
+    else:
+        email.status = 'queued'
+        email.next_attempt_at = now + retry_delay(email.attempts)
+
+
+def _claim(batch_size, now):
+    """
+    Marks up to `batch_size` due rows as `sending` with one conditional
+    UPDATE and returns the ones this worker won.
+    """
+    due = Q(status='queued', next_attempt_at__lte=now) | Q(status='sending', claimed_at__lt=now - CLAIM_TIMEOUT)
+    pks = list(
+        OutboundEmail.objects.filter(due).order_by('next_attempt_at').values_list('pk', flat=True)[:batch_size]
+    )
+    if not pks:
+        return []
+    OutboundEmail.objects.filter(due, pk__in=pks).update(status='sending', claimed_at=now)
+    return list(OutboundEmail.objects.filter(pk__in=pks, status='sending', claimed_at=now).order_by('next_attempt_at'))
+
+
+def deliver_queued(batch_size=100, max_attempts=None):
+    """
+    Sends one batch of due emails over a single connection.
+    Returns (sent, failed) for the batch; (0, 0) means nothing was due.
+    """
+    if max_attempts is None:
+        max_attempts = getattr(settings, 'EMAIL_OUTBOX_MAX_ATTEMPTS', 6)
+    now = timezone.now()
+    batch = _claim(batch_size, now)
+    if not batch:
+        return 0, 0
+
+    sent = failed = 0
+    connection = get_connection(delivery_backend(), fail_silently=False)
+    try:
+        connection.open()
+    except Exception as exc:
+        # Server unreachable: the whole batch backs off together
+        for email in batch:
+            _failed(email, exc, now, max_attempts)
+        failed = len(batch)
+    else:
+        try:
+            for email in batch:
+                try:
+                    if not connection.send_messages([to_message(email, connection)]):
+                        raise RuntimeError('Backend reported the message as not sent')
+                except Exception as exc:
+                    _failed(email, exc, now, max_attempts)
+                    failed += 1
+                    # A broken session would fail the rest of the batch too
+                    connection.close()
+                    try:
+                        connection.open()
+                    except Exception:
+                        pass
+                else:
+                    email.status = 'sent'
+                    email.sent_at = timezone.now()
+                    email.attempts += 1
+                    email.last_error = ''
+                    sent += 1
+        finally:
+            connection.close()
+
+    OutboundEmail.objects.bulk_update(
+        batch, ['status', 'attempts', 'next_attempt_at', 'last_error', 'sent_at']
+    )
+    return sent, failed
@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+from accounts.cache import bump_version
+from accounts.models import Announcement
+
+class Command(BaseCommand):
+    help = 'Archives announcements whose expiry date has passed (run daily from cron)'
+
+    def handle(self, *args, **kwargs):
+        archived = Announcement.objects.filter(
+            is_archived=False,
+            expires_at__lte=timezone.now()
+        ).update(is_archived=True, is_active=False)
+
+        if archived:
+            bump_version('announcements')
+        self.stdout.write(self.style.SUCCESS(f'Archived {archived} expired announcement(s).'))
@@ -0,0 +1,57 @@
+import json
+from pathlib import Path
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import setup_test_environment, teardown_test_environment
+from accounts import benchmarks
+
+class Command(BaseCommand):
+    help = (
+        'Seeds a throw-away test database, benchmarks the hot views (wall time, '
+        'query count, peak memory) and fails if they regress against the JSON baseline'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--scale', choices=sorted(benchmarks.SCALES), default='small')
+        parser.add_argument('--repeat', type=int, default=3)
+        parser.add_argument('--baseline', default=None, help='Baseline JSON file (default: benchmarks/baseline.json)')
+        parser.add_argument('--tolerance', type=float, default=0.25, help='Allowed relative growth of time/memory')
+        parser.add_argument('--update-baseline', action='store_true', help='Store these results as the new baseline')
+
+    def handle(self, *args, **options):
+        scale = options['scale']
+        path = Path(options['baseline'] or benchmarks.baseline_path())
+
+        # Never touch the real database: build a disposable test DB
+        setup_test_environment()
+        old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True)
+        try:
+            self.stdout.write(f"Seeding '{scale}' dataset...")
+            counts = benchmarks.seed(scale)
+            self.stdout.write(', '.join(f"{v} {k}" for k, v in counts.items()))
+            results = benchmarks.run_benchmarks(repeat=options['repeat'])
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+            teardown_test_environment()
+
+        self.stdout.write(f"\n{'view':<24}{'wall ms':>10}{'queries':>10}{'peak KB':>12}")
+        for name, m in results.items():
+            self.stdout.write(f"{name:<24}{m['wall_ms']:>10}{m['queries']:>10}{m['peak_kb']:>12}")
+
+        baseline = json.loads(path.read_text()) if path.exists() else {}
+
+        if options['update_baseline']:
+            baseline[scale] = results
+            path.parent.mkdir(parents=True, exist_ok=True)
+            path.write_text(json.dumps(baseline, indent=2, sort_keys=True) + '\n')
+            self.stdout.write(self.style.SUCCESS(f"\nBaseline for '{scale}' written to {path}"))
+            return
+
+        if scale not in baseline:
+            self.stdout.write(self.style.WARNING(f"\nNo '{scale}' baseline in {path}; run with --update-baseline"))
+            return
+
+        regressions = benchmarks.compare(results, baseline[scale], options['tolerance'])
+        if regressions:
+            raise CommandError('Performance regressions:\n  ' + '\n  '.join(regressions))
+        self.stdout.write(self.style.SUCCESS('\nNo regressions against the baseline.'))
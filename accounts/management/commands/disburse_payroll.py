@@ -0,0 +1,28 @@
+import time
+
+from django.core.management.base import BaseCommand
+from accounts.payroll import disburse_due
+
+class Command(BaseCommand):
+    help = 'Sends queued payroll run transfers through Paystack (run from cron, or with --loop as a worker)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=50, help='Transfers sent per batch')
+        parser.add_argument('--loop', action='store_true', help='Keep polling instead of exiting when nothing is queued')
+        parser.add_argument('--interval', type=float, default=30, help='Seconds between polls with --loop')
+
+    def handle(self, *args, **options):
+        total_sent = total_failed = 0
+        while True:
+            sent, failed = disburse_due(options['batch_size'])
+            total_sent += sent
+            total_failed += failed
+            if sent or failed:
+                if options['verbosity'] > 1:
+                    self.stdout.write(f'Batch: {sent} sent, {failed} failed')
+                continue
+            if not options['loop']:
+                break
+            time.sleep(options['interval'])
+
+        self.stdout.write(self.style.SUCCESS(f'Sent {total_sent} transfer(s), {total_failed} failed.'))
@@ -1,38 +1,165 @@
 import json
 import os
-from django.core.management.base import BaseCommand
-from accounts.models import State, LGA
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from accounts.models import State, LGA, Ward
+from accounts.geography import invalidate as invalidate_geography
 from django.conf import settings
 
+
+def iter_json_array(fp, chunk_size=64 * 1024):
+    """
+    Yields the elements of a top-level JSON array one at a time, reading
+    the file in chunks so large ward datasets never sit in memory whole.
+    """
+    decoder = json.JSONDecoder()
+    buf = ''
+    eof = False
+    started = False
+
+    while True:
+        buf = buf.lstrip()
+        if not started:
+            if not buf and not eof:
+                chunk = fp.read(chunk_size)
+                eof = not chunk
+                buf += chunk
+                continue
+            if not buf.startswith('['):
+                raise ValueError('Expected a JSON array at the top level')
+            buf = buf[1:]
+            started = True
+            continue
+
+        buf = buf.lstrip().lstrip(',').lstrip()
+        if buf.startswith(']'):
+            return
+        try:
+            item, end = decoder.raw_decode(buf)
+            if end == len(buf) and not eof:
+                # A number cut off by the chunk boundary still decodes; read on
+                raise json.JSONDecodeError('Element may continue', buf, end)
+        except json.JSONDecodeError:
+            if eof:
+                raise
+            chunk = fp.read(chunk_size)
+            eof = not chunk
+            buf += chunk
+            continue
+        yield item
+        buf = buf[end:]
+
+
 class Command(BaseCommand):
-    help = 'Imports States and LGAs from the nigeria_data.json fixture'
+    help = (
+        'Imports States, LGAs and Wards from the nigeria_data.json fixture and optional '
+        'ward-level datasets. Idempotent: rows are diffed in memory and written in bulk.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'files', nargs='*',
+            help='JSON files to import (defaults to accounts/fixtures/nigeria_data.json). '
+                 'Each is an array of {"name", "code", "lgas": [name | {"name", "wards": [...]}]} '
+                 'or of flat {"state", "lga", "ward"} records.'
+        )
+        parser.add_argument('--batch-size', type=int, default=1000)
+        parser.add_argument('--dry-run', action='store_true', help='Report the diff without writing')
 
-    def handle(self, *args, **kwargs):
+    def handle(self, *args, **options):
         # Path to your fixture file
-        fixture_path = os.path.join(settings.BASE_DIR, 'accounts', 'fixtures', 'nigeria_data.json')
+        files = options['files'] or [os.path.join(settings.BASE_DIR, 'accounts', 'fixtures', 'nigeria_data.json')]
 
-        try:
-            with open(fixture_path, 'r') as f:
-                data = json.load(f)
-
-            for entry in data:
-                # Create or get the State
-                state_obj, created = State.objects.get_or_create(
-                    name=entry['name']
-                )
-                if created:
-                    self.stdout.write(self.style.SUCCESS(f'Created State: {state_obj.name}'))
-
-                # Create LGAs for this state
-                for lga_name in entry['lgas']:
-                    lga_obj, created = LGA.objects.get_or_create(
-                        state=state_obj,
-                        name=lga_name
-                    )
-            
-            self.stdout.write(self.style.SUCCESS('Successfully imported all States and LGAs!'))
-
-        except FileNotFoundError:
-            self.stdout.write(self.style.ERROR(f'File not found at {fixture_path}'))
-        except Exception as e:
-            self.stdout.write(self.style.ERROR(f'An error occurred: {str(e)}'))
\ No newline at end of file
+        # 1. Stream every file into the desired set of rows
+        states, lgas, wards = {}, set(), set()
+        for path in files:
+            try:
+                with open(path, 'r', encoding='utf-8') as f:
+                    for entry in iter_json_array(f):
+                        self.collect(entry, states, lgas, wards)
+            except FileNotFoundError:
+                raise CommandError(f'File not found at {path}')
+            except ValueError as e:
+                raise CommandError(f'Could not parse {path}: {e}')
+
+        # 2. Diff against the database and write in one transaction
+        with transaction.atomic():
+            report = self.sync(states, lgas, wards, options['batch_size'])
+            if options['dry_run']:
+                transaction.set_rollback(True)
+
+        if options['verbosity']:
+            for label, (inserted, updated, unchanged) in report.items():
+                self.stdout.write(f'{label}: {inserted} inserted, {updated} updated, {unchanged} unchanged')
+
+        if options['dry_run']:
+            self.stdout.write(self.style.WARNING('Dry run: no changes were saved.'))
+        else:
+            # Cached dropdown data must pick up the new rows
+            invalidate_geography()
+            if options['verbosity']:
+                self.stdout.write(self.style.SUCCESS('Successfully imported geography data!'))
+
+    def collect(self, entry, states, lgas, wards):
+        if 'state' in entry:
+            # Flat record: {"state": ..., "lga": ..., "ward": ...}
+            state = entry['state'].strip()
+            states.setdefault(state, None)
+            if entry.get('lga'):
+                lga = entry['lga'].strip()
+                lgas.add((state, lga))
+                if entry.get('ward'):
+                    wards.add((state, lga, entry['ward'].strip()))
+            return
+
+        state = entry['name'].strip()
+        if entry.get('code') or state not in states:
+            states[state] = entry.get('code') or states.get(state)
+        for lga_entry in entry.get('lgas', []):
+            if isinstance(lga_entry, str):
+                lga_entry = {'name': lga_entry}
+            lga = lga_entry['name'].strip()
+            lgas.add((state, lga))
+            for ward in lga_entry.get('wards', []):
+                wards.add((state, lga, ward.strip()))
+
+    def sync(self, states, lgas, wards, batch_size):
+        report = {}
+
+        # States (name is unique; code may change)
+        existing = {s.name: s for s in State.objects.all()}
+        new_states = [State(name=name, code=code or '') for name, code in states.items() if name not in existing]
+        changed = []
+        for name, code in states.items():
+            obj = existing.get(name)
+            if obj and code is not None and obj.code != code:
+                obj.code = code
+                changed.append(obj)
+        State.objects.bulk_create(new_states, batch_size=batch_size)
+        State.objects.bulk_update(changed, ['code'], batch_size=batch_size)
+        report['States'] = (len(new_states), len(changed), len(states) - len(new_states) - len(changed))
+        state_ids = dict(State.objects.values_list('name', 'id'))
+
+        # LGAs, keyed by (state_id, name)
+        existing = set(LGA.objects.values_list('state_id', 'name'))
+        new_lgas = {(state_ids[s], name) for s, name in lgas} - existing
+        LGA.objects.bulk_create(
+            [LGA(state_id=state_id, name=name) for state_id, name in sorted(new_lgas)],
+            batch_size=batch_size
+        )
+        report['LGAs'] = (len(new_lgas), 0, len(lgas) - len(new_lgas))
+
+        # Wards, keyed by (lga_id, name)
+        if wards:
+            lga_ids = {}
+            for lga_id, state_id, name in LGA.objects.values_list('id', 'state_id', 'name'):
+                lga_ids.setdefault((state_id, name), lga_id)
+            existing = set(Ward.objects.values_list('lga_id', 'name'))
+            new_wards = {(lga_ids[(state_ids[s], l)], name) for s, l, name in wards} - existing
+            Ward.objects.bulk_create(
+                [Ward(lga_id=lga_id, name=name) for lga_id, name in sorted(new_wards)],
+                batch_size=batch_size
+            )
+            report['Wards'] = (len(new_wards), 0, len(wards) - len(new_wards))
+
+        return report
@@ -0,0 +1,28 @@
+from django.core.management.base import BaseCommand, CommandError
+from accounts.deletion import DEFAULT_CHUNK_SIZE, purge_users
+from accounts.models import User
+
+class Command(BaseCommand):
+    help = 'Permanently deletes member accounts and their data in small chunks'
+
+    def add_arguments(self, parser):
+        parser.add_argument('user_ids', nargs='*', type=int)
+        parser.add_argument('--suspended', action='store_true',
+                            help='Purge every inactive non-staff account instead of the listed ids')
+        parser.add_argument('--chunk-size', type=int, default=DEFAULT_CHUNK_SIZE)
+
+    def handle(self, *args, **options):
+        if options['suspended']:
+            user_ids = list(User.objects.filter(is_active=False, is_staff=False, is_superuser=False).values_list('pk', flat=True))
+        else:
+            user_ids = list(User.objects.filter(pk__in=options['user_ids']).values_list('pk', flat=True))
+        if not user_ids and not options['suspended']:
+            raise CommandError('No matching users. Pass user ids or --suspended.')
+
+        def progress(label, rows):
+            self.stdout.write(f'  {label}: {rows} row(s) deleted')
+
+        self.stdout.write(f'Purging {len(user_ids)} account(s)...')
+        deleted = purge_users(user_ids, chunk_size=options['chunk_size'], progress=progress)
+        summary = ', '.join(f'{label} {count}' for label, count in sorted(deleted.items()) if count)
+        self.stdout.write(self.style.SUCCESS(f'Done. {summary or "Nothing to delete."}'))
@@ -0,0 +1,12 @@
+from django.core.management.base import BaseCommand
+from accounts.approvers import rebuild
+
+class Command(BaseCommand):
+    help = 'Rebuilds the UnitApprover routing table from current profiles and units'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=5000)
+
+    def handle(self, *args, **options):
+        count = rebuild(batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt approver table: {count} unit/leader pair(s).'))
@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand
+from accounts.ledger import backfill, rebuild_snapshots
+
+class Command(BaseCommand):
+    help = 'Posts settled payments missing from the spending ledger and recomputes unit balances and monthly totals'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500)
+
+    def handle(self, *args, **options):
+        posted = backfill(batch_size=options['batch_size'])
+        balances, months = rebuild_snapshots()
+        self.stdout.write(self.style.SUCCESS(
+            f'Posted {posted} ledger entr{"y" if posted == 1 else "ies"}; '
+            f'rebuilt {balances} unit balance(s) and {months} monthly total(s).'
+        ))
@@ -0,0 +1,23 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from accounts.constants import MONTHS
+from accounts.payroll import schedule_runs
+
+class Command(BaseCommand):
+    help = "Creates this month's payroll run for every unit with a salary template (run monthly from cron)"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--month', help='Month name, e.g. January (default: this month)')
+        parser.add_argument('--year', type=int, help='Default: this year')
+
+    def handle(self, *args, **options):
+        today = timezone.localdate()
+        month = options['month'] or MONTHS[today.month - 1]
+        if month not in MONTHS:
+            raise CommandError(f'Unknown month {month!r}; use one of {", ".join(MONTHS)}.')
+        year = options['year'] or today.year
+
+        runs = schedule_runs(month, year)
+        for run in runs:
+            self.stdout.write(f'{run.unit}: {run.record_count} queued, {run.skipped_count} already paid')
+        self.stdout.write(self.style.SUCCESS(f'Created {len(runs)} payroll run(s) for {month} {year}.'))
@@ -0,0 +1,31 @@
+import time
+
+from django.core.management.base import BaseCommand
+from accounts.mail import deliver_queued
+
+class Command(BaseCommand):
+    help = 'Delivers queued emails from the outbox (run from cron, or with --loop as a worker)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=100, help='Emails sent per SMTP connection')
+        parser.add_argument('--max-attempts', type=int, default=None)
+        parser.add_argument('--loop', action='store_true', help='Keep polling instead of exiting when the queue is empty')
+        parser.add_argument('--interval', type=float, default=10, help='Seconds between polls with --loop')
+
+    def handle(self, *args, **options):
+        total_sent = total_failed = 0
+        while True:
+            sent, failed = deliver_queued(options['batch_size'], options['max_attempts'])
+            total_sent += sent
+            total_failed += failed
+            if sent or failed:
+                if options['verbosity'] > 1:
+                    self.stdout.write(f'Batch: {sent} sent, {failed} failed')
+                if sent:
+                    # Keep draining while the server is accepting mail
+                    continue
+            if not options['loop']:
+                break
+            time.sleep(options['interval'])
+
+        self.stdout.write(self.style.SUCCESS(f'Sent {total_sent} email(s), {total_failed} failed.'))
@@ -1,76 +1,67 @@
-import random
-from django.core.management.base import BaseCommand
-from django.db import transaction
+import time
+from django.core.management.base import BaseCommand, CommandError
 from django.contrib.auth import get_user_model
-from accounts.models import State, LGA, Ward, OrganizationUnit, Profile
+from accounts.cache import bump_version
+from accounts.constants import MONTHS
+from accounts.deletion import purge_users
+from accounts.models import OrganizationUnit
+from accounts.synthetic import generate_dataset
 
 User = get_user_model()
 
-class Command(BaseCommand):
-    help = "Deletes all users and creates fake hierarchical test data"
+PURGE_SLICE = 10000
 
-    def handle(self, *args, **kwargs):
-        self.stdout.write("Cleaning database...")
-        
-        # 1. Delete all existing Users (This also deletes Profiles via CASCADE)
-        # We keep the superuser to avoid locking ourselves out
-        User.objects.filter(is_superuser=False).delete()
-        
-        self.stdout.write("Creating Hierarchy and Fake Users...")
+class Command(BaseCommand):
+    help = (
+        "Deletes all users and builds a deterministic national hierarchy of fake data "
+        "(37 states, every LGA, N wards per LGA, M members per unit) for load testing"
+    )
 
-        with transaction.atomic():
-            # 2. Ensure at least one hierarchy exists
-            state, _ = State.objects.get_or_create(name="Kaduna")
-            lga, _ = LGA.objects.get_or_create(name="Kaduna North", state=state)
-            ward, _ = Ward.objects.get_or_create(name="Unguwan Shanu", lga=lga)
+    def add_arguments(self, parser):
+        parser.add_argument('--wards-per-lga', type=int, default=1)
+        parser.add_argument('--members-per-unit', type=int, default=10)
+        parser.add_argument('--messages-per-member', type=int, default=1)
+        parser.add_argument('--payroll-per-member', type=int, default=1)
+        parser.add_argument('--donations', type=int, default=0, help='Total donations to create')
+        parser.add_argument('--videos', type=int, default=0)
+        parser.add_argument('--likes-per-video', type=int, default=0)
+        parser.add_argument('--max-states', type=int, default=None, help='Limit the hierarchy to the first N states')
+        parser.add_argument('--seed', type=int, default=42)
+        parser.add_argument('--batch-size', type=int, default=5000)
+        parser.add_argument('--keep-existing', action='store_true', help='Do not delete existing users and units first')
 
-            # 3. Ensure an Organization Unit exists for this Ward
-            unit, _ = OrganizationUnit.objects.get_or_create(
-                name="Unguwan Shanu Unit",
-                category="FAG",
-                level="WARD",
-                ward=ward
-            )
+    def handle(self, *args, **options):
+        started = time.monotonic()
+        if not 0 <= options['payroll_per_member'] <= len(MONTHS):
+            raise CommandError(f"--payroll-per-member must be between 0 and {len(MONTHS)}")
 
-            # 4. Create a Test Leader
-            leader = User.objects.create_user(
-                username="leader_test",
-                first_name="Ibrahim",
-                last_name="Musa",
-                email="leader@test.com",
-                password="password123",
-                is_staff=True # Leaders need staff access for your dashboard logic
-            )
-            Profile.objects.create(
-                user=leader,
-                unit=unit,
-                position="Unit Commander",
-                is_active=True
-            )
+        if not options['keep_existing']:
+            self.stdout.write("Cleaning database...")
+            # We keep the superuser to avoid locking ourselves out
+            user_ids = list(User.objects.filter(is_superuser=False).values_list('pk', flat=True))
+            # Slices keep each statement's IN list under SQLite's variable limit
+            for start in range(0, len(user_ids), PURGE_SLICE):
+                purge_users(user_ids[start:start + PURGE_SLICE], chunk_size=options['batch_size'])
+            OrganizationUnit.objects.all().delete()
 
-            # 5. Create 10 Fake Members
-            education_choices = ['graduate', 'undergraduate', 'secondary']
-            courses = ['Islamic Studies', 'Computer Science', 'Arabic', 'Nursing']
+        counts = generate_dataset(
+            wards_per_lga=options['wards_per_lga'],
+            members_per_unit=options['members_per_unit'],
+            messages_per_member=options['messages_per_member'],
+            payroll_per_member=options['payroll_per_member'],
+            donations=options['donations'],
+            videos=options['videos'],
+            likes_per_video=options['likes_per_video'],
+            max_states=options['max_states'],
+            seed=options['seed'],
+            batch_size=options['batch_size'],
+            log=self.stdout.write,
+        )
 
-            for i in range(1, 11):
-                member = User.objects.create_user(
-                    username=f"member_{i}",
-                    first_name=f"User_{i}",
-                    last_name="Test",
-                    email=f"user{i}@test.com",
-                    password="password123",
-                    education_level=random.choice(education_choices),
-                    course_of_study=random.choice(courses),
-                    graduation_year=random.randint(2015, 2025),
-                    is_graduated=True
-                )
-                
-                # Create Profile (Pending Approval)
-                Profile.objects.create(
-                    user=member,
-                    unit=unit,
-                    position="Member",
-                    is_active=False # This makes them show up in the leader's "Pending" list
-                )
+        # Bulk inserts skip post_save, so retire cached unit lineages by hand
+        bump_version('units')
 
-        self.stdout.write(self.style.SUCCESS(f"Successfully created 1 Leader and 10 Pending Members for {unit.name}"))
\ No newline at end of file
+        summary = ', '.join(f"{value} {name}" for name, value in counts.items())
+        self.stdout.write(self.style.SUCCESS(
+            f"Created {summary} in {time.monotonic() - started:.1f}s"
+        ))
\ No newline at end of file
@@ -0,0 +1,199 @@
+"""
+Opt-in per-request SQL profiler (QUERY_PROFILER=True).
+
+Every query run while a request is handled is timed, fingerprinted (literals
+and IN-lists collapsed) and attributed to the first stack frame inside this
+project. Fingerprints repeated QUERY_PROFILER_N_PLUS_ONE times or more are
+flagged as N+1 suspects. Totals are exposed in a Server-Timing header, and
+slow or suspicious requests are appended to a size-capped JSONL log
+(QUERY_PROFILER_LOG, rotated to `.1`) for offline inspection.
+
+QueryBudgetMiddleware checks each request against its view's entry in
+accounts/budgets.py.
+"""
+import json
+import logging
+import os
+import re
+import sys
+import threading
+import time
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+from django.utils import timezone
+
+from .budgets import QueryBudgetExceeded, budget_for
+
+logger = logging.getLogger('izalams.queries')
+
+_STRING = re.compile(r"'(?:[^']|'')*'")
+_NUMBER = re.compile(r'\b\d+(?:\.\d+)?\b')
+_IN_LIST = re.compile(r'\bIN\s*\((?:\s*(?:%s|\?)\s*,?)+\)', re.IGNORECASE)
+_SPACE = re.compile(r'\s+')
+
+_log_lock = threading.Lock()
+
+
+def fingerprint(sql):
+    """Normalises a statement so the same query with different values matches."""
+    sql = _STRING.sub('?', sql)
+    sql = _NUMBER.sub('?', sql)
+    sql = sql.replace('%s', '?')
+    sql = _IN_LIST.sub('IN (...)', sql)
+    return _SPACE.sub(' ', sql).strip()
+
+
+def _origin():
+    """First frame that belongs to project code rather than Django or libraries."""
+    base = str(settings.BASE_DIR)
+    here = __file__
+    frame = sys._getframe(2)
+    while frame is not None:
+        filename = frame.f_code.co_filename
+        if (filename.startswith(base) and filename != here
+                and 'site-packages' not in filename and '/django/' not in filename):
+            return f"{os.path.relpath(filename, base)}:{frame.f_lineno} in {frame.f_code.co_name}"
+        frame = frame.f_back
+    return None
+
+
+class QueryRecorder:
+    def __init__(self):
+        self.queries = []
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.queries.append({
+                'fingerprint': fingerprint(sql),
+                'ms': (time.perf_counter() - started) * 1000,
+                'origin': _origin(),
+                'alias': context['connection'].alias,
+            })
+
+    def summary(self, threshold):
+        groups = {}
+        for q in self.queries:
+            group = groups.setdefault(q['fingerprint'], {'count': 0, 'ms': 0.0, 'origins': set()})
+            group['count'] += 1
+            group['ms'] += q['ms']
+            if q['origin']:
+                group['origins'].add(q['origin'])
+
+        repeated = [
+            {'fingerprint': fp, 'count': g['count'], 'ms': round(g['ms'], 2), 'origins': sorted(g['origins'])}
+            for fp, g in groups.items() if g['count'] >= threshold
+        ]
+        repeated.sort(key=lambda g: g['count'], reverse=True)
+        return {
+            'count': len(self.queries),
+            'ms': round(sum(q['ms'] for q in self.queries), 2),
+            'distinct': len(groups),
+            'n_plus_one': repeated,
+        }
+
+
+class QueryProfilerMiddleware:
+    def __init__(self, get_response):
+        if not getattr(settings, 'QUERY_PROFILER', False):
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.threshold = getattr(settings, 'QUERY_PROFILER_N_PLUS_ONE', 5)
+        self.slow_ms = getattr(settings, 'QUERY_PROFILER_SLOW_MS', 500)
+        self.log_path = getattr(settings, 'QUERY_PROFILER_LOG', None)
+        self.log_max_bytes = getattr(settings, 'QUERY_PROFILER_LOG_MAX_BYTES', 5 * 1024 * 1024)
+
+    def __call__(self, request):
+        recorder = QueryRecorder()
+        started = time.perf_counter()
+        with ExitStack() as stack:
+            for conn in connections.all():
+                stack.enter_context(conn.execute_wrapper(recorder))
+            response = self.get_response(request)
+        total_ms = (time.perf_counter() - started) * 1000
+
+        profile = recorder.summary(self.threshold)
+        request.query_profile = profile
+
+        timings = [
+            f'db;dur={profile["ms"]:.1f};desc="{profile["count"]} queries"',
+            f'app;dur={total_ms:.1f}',
+        ]
+        if profile['n_plus_one']:
+            timings.append(f'nplusone;desc="{len(profile["n_plus_one"])} repeated"')
+            for group in profile['n_plus_one']:
+                logger.warning(
+                    "Possible N+1 on %s: %d x %s (%s)", request.path, group['count'],
+                    group['fingerprint'][:200], ', '.join(group['origins']) or 'unknown origin'
+                )
+        response['Server-Timing'] = ', '.join(
+            t for t in [response.get('Server-Timing')] + timings if t
+        )
+
+        if self.log_path and (total_ms >= self.slow_ms or profile['n_plus_one']):
+            self.write_log({
+                'at': timezone.now().isoformat(),
+                'method': request.method,
+                'path': request.path,
+                'status': response.status_code,
+                'ms': round(total_ms, 2),
+                'queries': profile['count'],
+                'db_ms': profile['ms'],
+                'distinct': profile['distinct'],
+                'n_plus_one': profile['n_plus_one'],
+            })
+        return response
+
+    def write_log(self, entry):
+        line = json.dumps(entry, default=str) + '\n'
+        path = str(self.log_path)
+        with _log_lock:
+            try:
+                os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+                if os.path.exists(path) and os.path.getsize(path) + len(line) > self.log_max_bytes:
+                    os.replace(path, path + '.1')
+                with open(path, 'a', encoding='utf-8') as f:
+                    f.write(line)
+            except OSError:
+                logger.exception("Could not write query profile log %s", path)
+
+
+class QueryBudgetMiddleware:
+    """
+    Counts the queries of each request and compares them with the view's
+    entry in accounts.budgets.QUERY_BUDGETS. QUERY_BUDGET_MODE selects
+    'raise' (tests), 'warn' (log only) or 'off' (not installed).
+    """
+
+    def __init__(self, get_response):
+        self.mode = getattr(settings, 'QUERY_BUDGET_MODE', 'off')
+        if self.mode not in ('warn', 'raise'):
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        count = 0
+
+        def counter(execute, sql, params, many, context):
+            nonlocal count
+            count += 1
+            return execute(sql, params, many, context)
+
+        with ExitStack() as stack:
+            for conn in connections.all():
+                stack.enter_context(conn.execute_wrapper(counter))
+            response = self.get_response(request)
+
+        match = getattr(request, 'resolver_match', None)
+        budget = budget_for(match.url_name) if match else None
+        if budget is not None and count > budget:
+            message = f"{match.url_name} ran {count} queries (budget {budget}) for {request.method} {request.path}"
+            if self.mode == 'raise':
+                raise QueryBudgetExceeded(message)
+            logger.warning(message)
+        return response
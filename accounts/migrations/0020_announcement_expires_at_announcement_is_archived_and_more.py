@@ -0,0 +1,27 @@
+# Generated by Django 5.0.14 on 2026-10-19 00:51
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0019_profile_course_of_study_profile_education_level_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='announcement',
+            name='expires_at',
+            field=models.DateTimeField(blank=True, help_text='Hidden from feeds after this time', null=True),
+        ),
+        migrations.AddField(
+            model_name='announcement',
+            name='is_archived',
+            field=models.BooleanField(default=False),
+        ),
+        migrations.AddIndex(
+            model_name='announcement',
+            index=models.Index(fields=['unit', 'is_active', 'is_archived', '-created_at'], name='announcement_feed_idx'),
+        ),
+    ]
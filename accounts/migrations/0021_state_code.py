@@ -0,0 +1,18 @@
+# Generated by Django 5.0.14 on 2026-10-19 00:53
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0020_announcement_expires_at_announcement_is_archived_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='state',
+            name='code',
+            field=models.CharField(blank=True, max_length=5),
+        ),
+    ]
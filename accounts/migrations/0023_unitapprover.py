@@ -0,0 +1,28 @@
+# Generated by Django 5.0.14 on 2026-10-19 01:14
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0022_outboundemail'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='UnitApprover',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('distance', models.PositiveSmallIntegerField(default=0)),
+                ('same_category', models.BooleanField(default=True)),
+                ('leader', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='approvable_units', to=settings.AUTH_USER_MODEL)),
+                ('unit', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='approvers', to='accounts.organizationunit')),
+            ],
+            options={
+                'unique_together': {('unit', 'leader')},
+            },
+        ),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 5.0.14 on 2026-10-19 01:20
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0023_unitapprover'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MemberStatusChange',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('target_username', models.CharField(max_length=150)),
+                ('was_active', models.BooleanField()),
+                ('is_active', models.BooleanField()),
+                ('reason', models.CharField(blank=True, max_length=255)),
+                ('created_at', models.DateTimeField(db_index=True, default=django.utils.timezone.now)),
+                ('actor', models.ForeignKey(null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='status_changes_made', to=settings.AUTH_USER_MODEL)),
+                ('target', models.ForeignKey(null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='status_changes', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'ordering': ['-created_at'],
+                'indexes': [models.Index(fields=['target', '-created_at'], name='status_change_target_idx'), models.Index(fields=['actor', '-created_at'], name='status_change_actor_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.0.14 on 2026-10-19 01:25
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0024_memberstatuschange'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='disbursement',
+            name='transaction_reference',
+            field=models.CharField(blank=True, max_length=100, null=True, unique=True),
+        ),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 5.0.14 on 2026-10-19 01:40
+
+import izalams.references
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0025_disbursement_transaction_reference'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='payrollrecord',
+            name='reference',
+            field=models.CharField(default=izalams.references.payroll_reference, max_length=100, unique=True),
+        ),
+    ]
@@ -0,0 +1,112 @@
+# Generated by Django 5.0.14 on 2026-10-19 01:47
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+def check_duplicate_months(apps, schema_editor):
+    """
+    Records entered by hand could pay a member twice for the same month.
+    Those have to be reviewed (and one of each pair removed or re-dated) by
+    someone who knows which payment was real before the
+    payroll_once_per_month constraint can be added, so stop and list them.
+    """
+    PayrollRecord = apps.get_model('accounts', 'PayrollRecord')
+    duplicates = list(
+        PayrollRecord.objects.filter(month__isnull=False, year__isnull=False)
+        .values('member_id', 'month', 'year').annotate(n=models.Count('pk')).filter(n__gt=1)
+        .order_by('member_id', 'year', 'month')
+    )
+    if not duplicates:
+        return
+    lines = []
+    for group in duplicates:
+        pks = PayrollRecord.objects.filter(
+            member_id=group['member_id'], month=group['month'], year=group['year'],
+        ).order_by('pk').values_list('pk', flat=True)
+        lines.append(
+            f"  member {group['member_id']}, {group['month']} {group['year']}: "
+            f"records {', '.join(str(pk) for pk in pks)}"
+        )
+    raise RuntimeError(
+        "Some members have more than one payroll record for the same month. "
+        "Resolve these before migrating:\n" + "\n".join(lines)
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0026_payrollrecord_reference_default'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SalaryTemplate',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('amount', models.DecimalField(decimal_places=2, max_digits=10)),
+                ('is_active', models.BooleanField(default=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.AddField(
+            model_name='payrollrecord',
+            name='last_error',
+            field=models.CharField(blank=True, max_length=255),
+        ),
+        migrations.CreateModel(
+            name='PayrollRun',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('month', models.CharField(max_length=20)),
+                ('year', models.IntegerField()),
+                ('status', models.CharField(choices=[('queued', 'Queued'), ('processing', 'Processing'), ('completed', 'Completed')], default='queued', max_length=12)),
+                ('record_count', models.PositiveIntegerField(default=0)),
+                ('skipped_count', models.PositiveIntegerField(default=0)),
+                ('total_amount', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('sent_count', models.PositiveIntegerField(default=0)),
+                ('failed_count', models.PositiveIntegerField(default=0)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('finished_at', models.DateTimeField(blank=True, null=True)),
+                ('created_by', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='payroll_runs', to=settings.AUTH_USER_MODEL)),
+                ('unit', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='payroll_runs', to='accounts.organizationunit')),
+            ],
+            options={
+                'ordering': ['-created_at'],
+            },
+        ),
+        migrations.AddField(
+            model_name='payrollrecord',
+            name='run',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='records', to='accounts.payrollrun'),
+        ),
+        migrations.AddIndex(
+            model_name='payrollrecord',
+            index=models.Index(fields=['run', 'status'], name='payroll_run_status_idx'),
+        ),
+        migrations.RunPython(check_duplicate_months, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='payrollrecord',
+            constraint=models.UniqueConstraint(fields=('member', 'month', 'year'), name='payroll_once_per_month'),
+        ),
+        migrations.AddField(
+            model_name='salarytemplate',
+            name='member',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='salary_lines', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddField(
+            model_name='salarytemplate',
+            name='unit',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='salary_lines', to='accounts.organizationunit'),
+        ),
+        migrations.AddIndex(
+            model_name='payrollrun',
+            index=models.Index(fields=['status', 'created_at'], name='payroll_run_due_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='salarytemplate',
+            constraint=models.UniqueConstraint(fields=('unit', 'member'), name='salary_template_line_once'),
+        ),
+    ]
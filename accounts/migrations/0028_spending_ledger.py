@@ -0,0 +1,61 @@
+# Generated by Django 5.0.14 on 2026-10-19 01:55
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0027_payroll_runs'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='UnitBalance',
+            fields=[
+                ('unit', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='balance', serialize=False, to='accounts.organizationunit')),
+                ('total_spent', models.DecimalField(decimal_places=2, default=0, max_digits=16)),
+                ('entry_count', models.PositiveIntegerField(default=0)),
+                ('updated_at', models.DateTimeField(default=django.utils.timezone.now)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='UnitMonthlySpend',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('year', models.IntegerField()),
+                ('month', models.PositiveSmallIntegerField()),
+                ('total', models.DecimalField(decimal_places=2, default=0, max_digits=16)),
+                ('entry_count', models.PositiveIntegerField(default=0)),
+                ('unit', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='monthly_spend', to='accounts.organizationunit')),
+            ],
+            options={
+                'ordering': ['-year', '-month'],
+            },
+        ),
+        migrations.CreateModel(
+            name='LedgerEntry',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('payroll', 'Payroll'), ('disbursement', 'Disbursement'), ('reversal', 'Reversal')], max_length=12)),
+                ('amount', models.DecimalField(decimal_places=2, max_digits=12)),
+                ('reference', models.CharField(max_length=120, unique=True)),
+                ('created_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('authorized_by', models.ForeignKey(null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='authorized_entries', to=settings.AUTH_USER_MODEL)),
+                ('member', models.ForeignKey(null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='ledger_entries', to=settings.AUTH_USER_MODEL)),
+                ('unit', models.ForeignKey(null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='ledger_entries', to='accounts.organizationunit')),
+            ],
+            options={
+                'verbose_name_plural': 'ledger entries',
+                'ordering': ['-id'],
+                'indexes': [models.Index(fields=['member', '-created_at'], name='ledger_member_idx'), models.Index(fields=['unit', '-created_at'], name='ledger_unit_idx'), models.Index(fields=['authorized_by', '-id'], name='ledger_authorized_idx')],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='unitmonthlyspend',
+            constraint=models.UniqueConstraint(fields=('unit', 'year', 'month'), name='unit_monthly_spend_once'),
+        ),
+    ]
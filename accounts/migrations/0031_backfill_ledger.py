@@ -0,0 +1,27 @@
+# Generated by Django 5.0.14 on 2026-10-19 03:05
+
+from django.db import migrations
+
+
+def post_existing_payments(apps, schema_editor):
+    """
+    Posts every payment settled before the ledger existed and recomputes the
+    unit snapshots (what `manage.py rebuild_ledger` does), so unit_spent()
+    can read UnitBalance alone. This calls the live ledger code rather than
+    historical models; squash it away once every deployment has run it.
+    """
+    from accounts.ledger import backfill, rebuild_snapshots
+
+    backfill()
+    rebuild_snapshots()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0030_outbound_email_claims'),
+    ]
+
+    operations = [
+        migrations.RunPython(post_existing_payments, migrations.RunPython.noop),
+    ]
@@ -1,11 +1,16 @@
 from django.db import models
 from django.contrib.auth.models import AbstractUser
 from django.conf import settings
+from django.utils import timezone
+from django.utils.functional import cached_property
+
+from izalams.references import payroll_reference
 
 # --- 1. Geographic Hierarchy Models ---
 
 class State(models.Model):
     name = models.CharField(max_length=50, unique=True)
+    code = models.CharField(max_length=5, blank=True)
     def __str__(self): return self.name
 
 class LGA(models.Model):
@@ -49,6 +54,15 @@ class User(AbstractUser):
     groups = models.ManyToManyField('auth.Group', related_name='custom_user_groups', blank=True)
     user_permissions = models.ManyToManyField('auth.Permission', related_name='custom_user_permissions', blank=True)
 
+    @cached_property
+    def primary_profile(self):
+        """
+        The user's first profile. Unlike `profiles.first()` this reuses a
+        prefetch_related('profiles') cache, so list pages don't query per row.
+        """
+        profiles = list(self.profiles.all())
+        return min(profiles, key=lambda p: p.pk) if profiles else None
+
 # --- 3. Organizational Models ---
 
 class OrganizationUnit(models.Model):
@@ -77,6 +91,22 @@ class Profile(models.Model):
     graduation_year = models.IntegerField(blank=True, null=True)
     is_active = models.BooleanField(default=False) # Approval Switch
 
+class UnitApprover(models.Model):
+    """
+    Precomputed routing table: `leader` may approve members of `unit`.
+    Maintained by accounts/approvers.py (signals + `manage.py rebuild_approvers`).
+    """
+    unit = models.ForeignKey(OrganizationUnit, on_delete=models.CASCADE, related_name='approvers')
+    leader = models.ForeignKey(User, on_delete=models.CASCADE, related_name='approvable_units')
+    # 0 = the unit's own leader, then 1 = LG, 2 = State, 3 = National office above it
+    distance = models.PositiveSmallIntegerField(default=0)
+    same_category = models.BooleanField(default=True)
+
+    class Meta:
+        unique_together = ('unit', 'leader')
+
+    def __str__(self): return f"{self.leader} -> {self.unit}"
+
 # --- 4. Messaging & Content ---
 
 class Message(models.Model):
@@ -107,22 +137,61 @@ class PayrollRecord(models.Model):
     month = models.CharField(max_length=20, blank=True, null=True)
     year = models.IntegerField(blank=True, null=True)
     status = models.CharField(max_length=20, default='pending')
-    reference = models.CharField(max_length=100, unique=True)
+    reference = models.CharField(max_length=100, unique=True, default=payroll_reference)
     payment_date = models.DateTimeField(null=True, blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
+    # Set for records generated by a PayrollRun (see accounts/payroll.py)
+    run = models.ForeignKey('PayrollRun', on_delete=models.SET_NULL, null=True, blank=True, related_name='records')
+    last_error = models.CharField(max_length=255, blank=True)
+    # When a disbursement worker took the record (status 'sending')
+    claimed_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        constraints = [
+            # A member is paid at most once per month; reruns skip them by this index
+            models.UniqueConstraint(fields=['member', 'month', 'year'], name='payroll_once_per_month'),
+        ]
+        indexes = [
+            # The disbursement worker's poll: WHERE run_id = ... AND status = 'pending'
+            models.Index(fields=['run', 'status'], name='payroll_run_status_idx'),
+        ]
+
+class AnnouncementQuerySet(models.QuerySet):
+    def live(self, now=None):
+        """Active, not archived and not yet expired."""
+        now = now or timezone.now()
+        return self.filter(is_active=True, is_archived=False).filter(
+            models.Q(expires_at__isnull=True) | models.Q(expires_at__gt=now)
+        )
 
 class Announcement(models.Model):
     content = models.CharField(max_length=255)
     is_active = models.BooleanField(default=True)
+    is_archived = models.BooleanField(default=False)
+    expires_at = models.DateTimeField(null=True, blank=True, help_text="Hidden from feeds after this time")
     unit = models.ForeignKey(OrganizationUnit, on_delete=models.CASCADE, null=True, blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
 
+    objects = AnnouncementQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            # Serves the capped per-unit feed: WHERE unit_id IN (...) ORDER BY created_at DESC LIMIT N
+            models.Index(fields=['unit', 'is_active', 'is_archived', '-created_at'], name='announcement_feed_idx'),
+        ]
+
+    def is_live(self, now=None):
+        now = now or timezone.now()
+        return self.is_active and not self.is_archived and (self.expires_at is None or self.expires_at > now)
+
 class Disbursement(models.Model):
     authorized_by = models.ForeignKey(User, on_delete=models.CASCADE, related_name='authorizations')
     recipient = models.ForeignKey(User, on_delete=models.CASCADE, related_name='received_payments')
     amount = models.DecimalField(max_digits=10, decimal_places=2)
     timestamp = models.DateTimeField(auto_now_add=True)
     status = models.CharField(max_length=20, default='SUCCESS')
+    # Paystack transfer reference; transfer.* webhooks update the status by it
+    transaction_reference = models.CharField(max_length=100, unique=True, null=True, blank=True)
 
 class GalleryImage(models.Model):
     title = models.CharField(max_length=100, blank=True)
@@ -142,4 +211,180 @@ class DisciplinaryReport(models.Model):
     complaint = models.TextField()
     evidence = models.FileField(upload_to='reports/', null=True, blank=True)
     status = models.CharField(max_length=20, default='pending')
-    created_at = models.DateTimeField(auto_now_add=True)
\ No newline at end of file
+    created_at = models.DateTimeField(auto_now_add=True)
+
+# --- 6. Email Outbox ---
+
+class OutboundEmail(models.Model):
+    """
+    Mail waiting for delivery. Rows are written by accounts.mail.QueuedEmailBackend
+    inside the caller's transaction and sent by `manage.py send_queued_mail`.
+    """
+    STATUS_CHOICES = [('queued', 'Queued'), ('sending', 'Sending'), ('sent', 'Sent'), ('failed', 'Failed')]
+
+    subject = models.CharField(max_length=255)
+    body = models.TextField(blank=True)
+    html_body = models.TextField(blank=True)
+    from_email = models.CharField(max_length=255, blank=True)
+    to = models.JSONField(default=list)
+    cc = models.JSONField(default=list, blank=True)
+    bcc = models.JSONField(default=list, blank=True)
+    reply_to = models.JSONField(default=list, blank=True)
+    headers = models.JSONField(default=dict, blank=True)
+
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='queued')
+    attempts = models.PositiveSmallIntegerField(default=0)
+    next_attempt_at = models.DateTimeField(default=timezone.now)
+    claimed_at = models.DateTimeField(null=True, blank=True)
+    last_error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    sent_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            # The worker's poll: WHERE status='queued' AND next_attempt_at <= now ORDER BY next_attempt_at
+            models.Index(fields=['status', 'next_attempt_at'], name='outbound_email_due_idx'),
+        ]
+
+    def __str__(self): return f"{self.subject} -> {', '.join(self.to)} ({self.status})"
+
+# --- 7. Member Status Audit ---
+
+class MemberStatusChange(models.Model):
+    """
+    Append-only record of every suspension and reactivation. Rows are written
+    in bulk by accounts.approvers.set_member_status and never edited; the
+    user links survive account deletion as NULLs next to the saved username.
+    """
+    actor = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, related_name='status_changes_made')
+    target = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, related_name='status_changes')
+    target_username = models.CharField(max_length=150)
+    was_active = models.BooleanField()
+    is_active = models.BooleanField()
+    reason = models.CharField(max_length=255, blank=True)
+    created_at = models.DateTimeField(default=timezone.now, db_index=True)
+
+    class Meta:
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['target', '-created_at'], name='status_change_target_idx'),
+            models.Index(fields=['actor', '-created_at'], name='status_change_actor_idx'),
+        ]
+
+    def save(self, *args, **kwargs):
+        if self.pk is not None:
+            raise ValueError("Member status changes are append-only.")
+        super().save(*args, **kwargs)
+
+    def __str__(self):
+        change = "Reactivated" if self.is_active else "Suspended"
+        return f"{change} {self.target_username} ({self.created_at:%Y-%m-%d})"
+
+# --- 8. Payroll Runs ---
+
+class SalaryTemplate(models.Model):
+    """A unit's standing monthly amount per member; PayrollRuns are generated from it."""
+    unit = models.ForeignKey(OrganizationUnit, on_delete=models.CASCADE, related_name='salary_lines')
+    member = models.ForeignKey(User, on_delete=models.CASCADE, related_name='salary_lines')
+    amount = models.DecimalField(max_digits=10, decimal_places=2)
+    is_active = models.BooleanField(default=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['unit', 'member'], name='salary_template_line_once'),
+        ]
+
+    def __str__(self): return f"{self.member} - ₦{self.amount} ({self.unit})"
+
+class PayrollRun(models.Model):
+    """
+    One month's payroll for a unit. Creating it writes every PayrollRecord up
+    front; `manage.py disburse_payroll` then sends the transfers in batches.
+    """
+    STATUS_CHOICES = [('queued', 'Queued'), ('processing', 'Processing'), ('completed', 'Completed')]
+
+    unit = models.ForeignKey(OrganizationUnit, on_delete=models.CASCADE, related_name='payroll_runs')
+    month = models.CharField(max_length=20)
+    year = models.IntegerField()
+    # A run is a financial record: it outlives the leader who started it
+    created_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, related_name='payroll_runs')
+    status = models.CharField(max_length=12, choices=STATUS_CHOICES, default='queued')
+    record_count = models.PositiveIntegerField(default=0)
+    skipped_count = models.PositiveIntegerField(default=0)
+    total_amount = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    sent_count = models.PositiveIntegerField(default=0)
+    failed_count = models.PositiveIntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['status', 'created_at'], name='payroll_run_due_idx'),
+        ]
+
+    def __str__(self): return f"{self.unit} payroll, {self.month} {self.year} ({self.status})"
+
+
+# --- 9. Spending Ledger ---
+
+class LedgerEntry(models.Model):
+    """
+    Append-only record of money that left a unit: one entry per settled
+    payroll transfer or disbursement, keyed by its transfer reference, and a
+    negative `reversal` entry if it is later failed or reversed. Entries are
+    written by accounts.ledger, which keeps UnitBalance and UnitMonthlySpend
+    in step in the same transaction.
+    """
+    KIND_CHOICES = [('payroll', 'Payroll'), ('disbursement', 'Disbursement'), ('reversal', 'Reversal')]
+
+    unit = models.ForeignKey(OrganizationUnit, on_delete=models.SET_NULL, null=True, related_name='ledger_entries')
+    member = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, related_name='ledger_entries')
+    authorized_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, related_name='authorized_entries')
+    kind = models.CharField(max_length=12, choices=KIND_CHOICES)
+    amount = models.DecimalField(max_digits=12, decimal_places=2)
+    reference = models.CharField(max_length=120, unique=True)
+    created_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        ordering = ['-id']
+        verbose_name_plural = 'ledger entries'
+        indexes = [
+            models.Index(fields=['member', '-created_at'], name='ledger_member_idx'),
+            models.Index(fields=['unit', '-created_at'], name='ledger_unit_idx'),
+            # payroll_history pages through a leader's entries newest first by id
+            models.Index(fields=['authorized_by', '-id'], name='ledger_authorized_idx'),
+        ]
+
+    def save(self, *args, **kwargs):
+        if self.pk is not None:
+            raise ValueError("Ledger entries are append-only.")
+        super().save(*args, **kwargs)
+
+    def __str__(self): return f"{self.get_kind_display()} {self.reference}: ₦{self.amount}"
+
+class UnitBalance(models.Model):
+    """Running total of a unit's ledger entries, so reading its spend is one primary-key lookup."""
+    unit = models.OneToOneField(OrganizationUnit, on_delete=models.CASCADE, primary_key=True, related_name='balance')
+    total_spent = models.DecimalField(max_digits=16, decimal_places=2, default=0)
+    entry_count = models.PositiveIntegerField(default=0)
+    updated_at = models.DateTimeField(default=timezone.now)
+
+    def __str__(self): return f"{self.unit}: ₦{self.total_spent}"
+
+class UnitMonthlySpend(models.Model):
+    """A unit's ledger total for one calendar month (local time)."""
+    unit = models.ForeignKey(OrganizationUnit, on_delete=models.CASCADE, related_name='monthly_spend')
+    year = models.IntegerField()
+    month = models.PositiveSmallIntegerField()
+    total = models.DecimalField(max_digits=16, decimal_places=2, default=0)
+    entry_count = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        ordering = ['-year', '-month']
+        constraints = [
+            models.UniqueConstraint(fields=['unit', 'year', 'month'], name='unit_monthly_spend_once'),
+        ]
+
+    def __str__(self): return f"{self.unit} {self.year}-{self.month:02d}: ₦{self.total}"
@@ -0,0 +1,202 @@
+"""
+Monthly payroll runs.
+
+Each unit keeps a SalaryTemplate: the standing amount for each member it
+pays. create_run() turns the template into one PayrollRun and all of its
+PayrollRecords with a single bulk INSERT. Members who already have a record
+for that month are skipped through the (member, month, year) unique index,
+both when the run is planned and, for a concurrent rerun, at insert time.
+
+Nothing is paid inside the request. `manage.py disburse_payroll` sends the
+queued records in batches (disburse_due) over the shared Paystack client.
+Each batch is claimed first (status `sending`), so overlapping workers do
+not send the same records, and each transfer carries the record's own
+(lowercase, as Paystack requires) reference, so a retried batch cannot pay
+anyone twice. Accepted transfers become `processing` records with a
+Disbursement row under the same reference. Paystack's transfer.* webhooks
+settle both (see donations/events.py).
+"""
+import logging
+from datetime import timedelta
+
+import requests
+from django.db import transaction
+from django.db.models import Count, Exists, OuterRef, Q, Subquery, Sum
+from django.utils import timezone
+
+from .models import Disbursement, OrganizationUnit, PayrollRecord, PayrollRun, SalaryTemplate, User
+from .utils import initiate_paystack_transfer
+
+logger = logging.getLogger(__name__)
+
+OPEN_RUN_STATUSES = ('queued', 'processing')
+
+CLAIM_TIMEOUT = timedelta(minutes=10)
+
+
+def save_template(unit, amounts):
+    """Upserts the unit's template lines from {member_id: amount} in one statement."""
+    SalaryTemplate.objects.bulk_create(
+        [SalaryTemplate(unit=unit, member_id=member_id, amount=amount, is_active=True)
+         for member_id, amount in amounts.items()],
+        update_conflicts=True,
+        unique_fields=['unit', 'member'],
+        update_fields=['amount', 'is_active', 'updated_at'],
+    )
+
+
+def create_run(unit, month, year, created_by, member_ids=None, batch_size=500):
+    """
+    Creates the unit's PayrollRun for `month`/`year` from its active template
+    lines (only `member_ids`, when given) and writes every PayrollRecord up
+    front. Members already paid for the month are counted as skipped.
+    """
+    lines = SalaryTemplate.objects.filter(unit=unit, is_active=True, member__is_active=True)
+    if member_ids is not None:
+        lines = lines.filter(member_id__in=member_ids)
+    lines = list(lines.annotate(
+        already_paid=Exists(PayrollRecord.objects.filter(member=OuterRef('member'), month=month, year=year))
+    ).values_list('member_id', 'amount', 'already_paid'))
+    due = [(member_id, amount) for member_id, amount, already_paid in lines if not already_paid]
+
+    with transaction.atomic():
+        run = PayrollRun.objects.create(unit=unit, month=month, year=year, created_by=created_by)
+        # ignore_conflicts: a concurrent run for the same month loses the race quietly
+        PayrollRecord.objects.bulk_create([
+            PayrollRecord(member_id=member_id, amount=amount, month=month, year=year, run=run)
+            for member_id, amount in due
+        ], batch_size=batch_size, ignore_conflicts=True)
+        totals = run.records.aggregate(count=Count('pk'), amount=Sum('amount'))
+        run.record_count = totals['count']
+        run.total_amount = totals['amount'] or 0
+        run.skipped_count = len(lines) - run.record_count
+        if not run.record_count:
+            run.status, run.finished_at = 'completed', timezone.now()
+        run.save(update_fields=['record_count', 'total_amount', 'skipped_count', 'status', 'finished_at'])
+    return run
+
+
+def _send(record):
+    """Returns (new status, transaction reference, error)."""
+    member = record.member
+    if not member.account_number or not member.bank_code:
+        return 'failed', None, 'No bank account on file'
+    response = initiate_paystack_transfer(
+        member, record.amount, reference=record.reference,
+        reason=f"JIBWIS payroll {record.month} {record.year}",
+    )
+    if response and response.get('status'):
+        data = response.get('data') or {}
+        return 'processing', (data.get('reference') or record.reference).lower(), ''
+    message = (response or {}).get('message') or 'Transfer recipient could not be created'
+    if 'duplicate' in message.lower():
+        # An earlier attempt got through before its response was lost
+        return 'processing', record.reference, ''
+    return 'failed', None, message[:255]
+
+
+def _claim(batch_size):
+    """
+    Marks up to `batch_size` due records as `sending` with one conditional
+    UPDATE and returns the ones this worker won, so overlapping workers never
+    send the same record. Claims older than CLAIM_TIMEOUT (a worker that died
+    mid-batch) are taken over; the record's reference keeps a resend from
+    paying twice.
+    """
+    now = timezone.now()
+    due = Q(status='pending') | Q(status='sending', claimed_at__lt=now - CLAIM_TIMEOUT)
+    pks = list(
+        PayrollRecord.objects.filter(due, run__status__in=OPEN_RUN_STATUSES)
+        .order_by('pk').values_list('pk', flat=True)[:batch_size]
+    )
+    if not pks:
+        return []
+    PayrollRecord.objects.filter(due, pk__in=pks).update(status='sending', claimed_at=now)
+    return list(
+        PayrollRecord.objects.filter(pk__in=pks, status='sending', claimed_at=now)
+        .select_related('member', 'run').order_by('pk')
+    )
+
+
+def disburse_due(batch_size=50):
+    """
+    Sends one batch of queued payroll transfers. Returns (sent, failed); (0, 0)
+    means nothing was due. A network failure (or the Paystack circuit breaker
+    being open) ends the batch early and leaves the rest queued for next time.
+    """
+    batch = _claim(batch_size)
+    if not batch:
+        return 0, 0
+
+    done, disbursements = [], []
+    for index, record in enumerate(batch):
+        if record.run.created_by_id is None:
+            record.status, record.last_error = 'failed', 'The leader who started this run no longer exists'
+            done.append(record)
+            continue
+        # Records queued before payroll_reference() went lowercase
+        record.reference = record.reference.lower()
+        try:
+            status, transaction_reference, error = _send(record)
+        except requests.RequestException as exc:
+            logger.warning("Payroll disbursement paused at record %s: %s", record.pk, exc)
+            record.last_error = f"{type(exc).__name__}: {exc}"[:255]
+            # Hand this record and the rest of the batch back to the queue
+            for unsent in batch[index:]:
+                unsent.status = 'pending'
+                done.append(unsent)
+            break
+        record.status, record.last_error = status, error
+        done.append(record)
+        if status == 'processing':
+            disbursements.append(Disbursement(
+                authorized_by_id=record.run.created_by_id, recipient=record.member, amount=record.amount,
+                status='PROCESSING', transaction_reference=transaction_reference,
+            ))
+
+    with transaction.atomic():
+        PayrollRecord.objects.bulk_update(done, ['reference', 'status', 'last_error'])
+        Disbursement.objects.bulk_create(disbursements, ignore_conflicts=True)
+        refresh_runs({record.run_id for record in done})
+
+    failed = sum(1 for record in done if record.status == 'failed')
+    return len(disbursements), failed
+
+
+def refresh_runs(run_ids):
+    """Recounts the runs' records in one query and closes the ones with nothing left to send."""
+    counts = PayrollRecord.objects.filter(run_id__in=run_ids).values('run_id').annotate(
+        pending=Count('pk', filter=Q(status__in=['pending', 'sending'])),
+        failed=Count('pk', filter=Q(status='failed')),
+        sent=Count('pk', filter=Q(status__in=['processing', 'success'])),
+    )
+    runs = PayrollRun.objects.in_bulk(run_ids)
+    now = timezone.now()
+    for row in counts:
+        run = runs[row['run_id']]
+        run.sent_count, run.failed_count = row['sent'], row['failed']
+        if row['pending']:
+            run.status = 'processing'
+        elif run.status != 'completed':
+            run.status, run.finished_at = 'completed', now
+    PayrollRun.objects.bulk_update(runs.values(), ['sent_count', 'failed_count', 'status', 'finished_at'])
+
+
+def schedule_runs(month, year):
+    """
+    Creates this month's run for every unit with active template lines and
+    no run for the month yet, on behalf of whoever ran the unit's last
+    payroll. Units nobody has run payroll for are left to a leader. Returns
+    the new runs.
+    """
+    existing = PayrollRun.objects.filter(unit=OuterRef('unit'), month=month, year=year)
+    latest = PayrollRun.objects.filter(unit=OuterRef('unit')).order_by('-created_at').values('created_by')[:1]
+    units = (
+        SalaryTemplate.objects.filter(is_active=True).exclude(Exists(existing))
+        .values('unit').annotate(leader=Subquery(latest)).filter(leader__isnull=False)
+        .values_list('unit', 'leader').distinct()
+    )
+    plan = list(units)
+    unit_objs = OrganizationUnit.objects.in_bulk([unit_id for unit_id, _ in plan])
+    leaders = User.objects.in_bulk([leader_id for _, leader_id in plan])
+    return [create_run(unit_objs[unit_id], month, year, leaders[leader_id]) for unit_id, leader_id in plan]
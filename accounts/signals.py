@@ -1,18 +1,102 @@
-from django.db.models.signals import post_save
+from django.db.models.signals import post_save, post_delete
 from django.dispatch import receiver
-from django.core.mail import send_mail
-from .models import Profile
+from django.core.mail import send_mass_mail
+from .approvers import notification_recipients, sync_leader, sync_unit
+from .cache import bump_version
+from .images import ensure_derivatives
+from .ledger import sync_disbursement, sync_references
+from .models import Profile, GalleryImage, Announcement, VideoPost, OrganizationUnit, State, LGA, Ward, User, Disbursement, PayrollRecord
 
 @receiver(post_save, sender=Profile)
 def notify_leader(sender, instance, created, **kwargs):
+    if created and not instance.is_active:
+        # Nearest approvers from the routing table (accounts/approvers.py).
+        # Queued in the outbox (accounts/mail.py); sent after the registration commits.
+        body = f'Assalamu Alaikum, {instance.user.username} has registered for {instance.unit.name}. Please log in to approve.'
+        send_mass_mail([
+            ('New Member Awaiting Approval', body, 'admin@jibwis.org', [leader.email])
+            for leader in notification_recipients(instance.unit, exclude_user=instance.user)
+            if leader.email
+        ], fail_silently=True)
+
+# --- Approver routing table (see accounts/approvers.py) ---
+
+@receiver([post_save, post_delete], sender=Profile)
+def sync_profile_approvals(sender, instance, **kwargs):
+    sync_leader(instance.user_id)
+
+@receiver(post_save, sender=User)
+def sync_user_approvals(sender, instance, created, update_fields=None, **kwargs):
     if created:
-        # Find the leader for the specific unit
-        leader = Profile.objects.filter(unit=instance.unit, is_leader=True).first()
-        if leader:
-            send_mail(
-                subject='New Member Awaiting Approval',
-                message=f'Assalamu Alaikum, {instance.user.username} has registered for {instance.unit.name}. Please log in to approve.',
-                from_email='admin@jibwis.org',
-                recipient_list=[leader.user.email],
-                fail_silently=True,
-            )
\ No newline at end of file
+        return
+    if update_fields is None or {'is_staff', 'is_active'} & set(update_fields):
+        sync_leader(instance.pk)
+
+@receiver(post_save, sender=OrganizationUnit)
+def sync_unit_approvals(sender, instance, created, **kwargs):
+    sync_unit(instance)
+    if not created:
+        # The unit's own leaders may now cover a different area
+        for user_id in Profile.objects.filter(unit=instance, user__is_staff=True).values_list('user_id', flat=True):
+            sync_leader(user_id)
+
+# --- Responsive image derivatives (generated on upload) ---
+
+def _image_changed(update_fields, field_name):
+    return update_fields is None or field_name in update_fields
+
+@receiver(post_save, sender=GalleryImage)
+def build_gallery_derivatives(sender, instance, update_fields=None, **kwargs):
+    if _image_changed(update_fields, 'image'):
+        ensure_derivatives(instance.image, 'gallery')
+
+@receiver(post_save, sender=Profile)
+def build_avatar_derivatives(sender, instance, update_fields=None, **kwargs):
+    if _image_changed(update_fields, 'profile_picture'):
+        ensure_derivatives(instance.profile_picture, 'avatar')
+
+# --- Landing page cache invalidation (see accounts/cache.py) ---
+
+@receiver([post_save, post_delete], sender=Announcement)
+def invalidate_announcements(sender, **kwargs):
+    bump_version('announcements')
+
+# View and like counters are not part of the cached video fragment, so
+# bumping them must not throw away the landing page (likes send m2m_changed,
+# which is deliberately not handled here)
+VIDEO_COUNTER_FIELDS = frozenset(['views_count'])
+
+@receiver([post_save, post_delete], sender=VideoPost)
+def invalidate_videos(sender, update_fields=None, **kwargs):
+    if update_fields and set(update_fields) <= VIDEO_COUNTER_FIELDS:
+        return
+    bump_version('videos')
+
+@receiver([post_save, post_delete], sender=GalleryImage)
+def invalidate_gallery(sender, **kwargs):
+    bump_version('gallery')
+
+@receiver([post_save, post_delete], sender=OrganizationUnit)
+def invalidate_unit_lineage(sender, **kwargs):
+    bump_version('units')
+
+# --- Geography bundle invalidation (see accounts/geography.py) ---
+
+@receiver([post_save, post_delete], sender=State)
+@receiver([post_save, post_delete], sender=LGA)
+@receiver([post_save, post_delete], sender=Ward)
+def invalidate_geography(sender, **kwargs):
+    bump_version('geography')
+
+# --- Spending ledger (see accounts/ledger.py) ---
+# Bulk writers (payroll runs, transfer webhooks) call the ledger themselves
+
+@receiver(post_save, sender=Disbursement)
+def post_disbursement(sender, instance, raw=False, **kwargs):
+    if not raw:
+        sync_disbursement(instance)
+
+@receiver(post_save, sender=PayrollRecord)
+def post_payroll_record(sender, instance, raw=False, **kwargs):
+    if not raw and instance.status in ('success', 'failed'):
+        sync_references([instance.reference])
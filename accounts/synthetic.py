@@ -0,0 +1,285 @@
+"""
+Deterministic synthetic data for load testing and benchmarks.
+
+Builds the full JIBWIS hierarchy (National -> 37 States -> every LGA ->
+N Wards, for each category) and fills every unit with one chairman and M
+members, plus messages, payroll records, donations and video likes. All
+writes are bulk inserts sharing one precomputed password hash, so a
+million-user database takes minutes rather than hours. Usernames and
+SYN- references continue from what an earlier run left behind, so runs can
+be stacked on one database.
+"""
+import random
+from decimal import Decimal
+
+from django.contrib.auth.hashers import make_password
+from django.core.management import call_command
+from django.db import transaction
+from django.db.models import Max
+from django.utils import timezone
+
+from .approvers import rebuild as rebuild_approvers
+from .constants import MONTHS
+from .ledger import backfill as backfill_ledger
+from .models import (
+    LGA, Message, OrganizationUnit, PayrollRecord, Profile, State, User,
+    VideoPost, Ward,
+)
+
+FIRST_NAMES = ['Abubakar', 'Aisha', 'Bello', 'Fatima', 'Ibrahim', 'Hauwa', 'Musa', 'Zainab',
+               'Usman', 'Maryam', 'Yusuf', 'Khadija', 'Sani', 'Amina', 'Idris', 'Hadiza']
+LAST_NAMES = ['Abdullahi', 'Mohammed', 'Lawal', 'Garba', 'Bello', 'Umar', 'Aliyu', 'Sulaiman',
+              'Danjuma', 'Tijjani', 'Yakubu', 'Isah']
+COURSES = ['Islamic Studies', 'Computer Science', 'Arabic', 'Nursing', 'Medicine', 'Accounting']
+EDUCATION = [choice for choice, _ in User.EDUCATION_LEVELS]
+DONATION_PURPOSES = ['Zakka', 'Sadaqah', 'Ramadan Feeding', 'Mosque Building', 'First Aid Kits']
+
+
+class DatasetGenerator:
+    def __init__(self, wards_per_lga=1, members_per_unit=10, messages_per_member=1,
+                 payroll_per_member=1, donations=0, videos=0, likes_per_video=0,
+                 categories=('ADMIN', 'ULAMA', 'FAG'), max_states=None, pending_ratio=0.1,
+                 password='password123', seed=42, batch_size=5000, log=None):
+        if not 0 <= payroll_per_member <= len(MONTHS):
+            # One record per member and month (payroll_once_per_month)
+            raise ValueError(f"payroll_per_member must be between 0 and {len(MONTHS)}")
+        self.wards_per_lga = wards_per_lga
+        self.members_per_unit = members_per_unit
+        self.messages_per_member = messages_per_member
+        self.payroll_per_member = payroll_per_member
+        self.donations = donations
+        self.videos = videos
+        self.likes_per_video = likes_per_video
+        self.categories = categories
+        self.max_states = max_states
+        self.pending_ratio = pending_ratio
+        self.password_hash = make_password(password)
+        self.rng = random.Random(seed)
+        self.batch_size = batch_size
+        self.log = log or (lambda msg: None)
+
+        self.user_seq = 0
+        self.record_seq = 0
+        self.donation_seq = 0
+        self.counts = {'units': 0, 'users': 0, 'messages': 0, 'payroll': 0, 'donations': 0, 'likes': 0}
+        self.sampled_user_ids = []
+
+    def resume_sequences(self):
+        """Continues usernames and SYN- references after the highest ones already stored."""
+        from donations.models import Donation
+
+        def last(queryset, field, prefix):
+            value = queryset.filter(**{f'{field}__regex': rf'^{prefix}[0-9]+$'}).aggregate(last=Max(field))['last']
+            return int(value[len(prefix):]) if value else 0
+
+        # Fixed-width numbers, so the highest string is the highest number
+        self.user_seq = last(User.objects, 'username', 'user')
+        self.record_seq = last(PayrollRecord.objects, 'reference', 'SYN-PAY-')
+        self.donation_seq = last(Donation.objects, 'reference', 'SYN-DON-')
+
+    # --- Hierarchy ---
+
+    def ensure_geography(self):
+        if not State.objects.exists():
+            call_command('import_nigeria', verbosity=0)
+        states = list(State.objects.order_by('name'))
+        if self.max_states:
+            states = states[:self.max_states]
+        lgas = list(LGA.objects.filter(state__in=states).order_by('state__name', 'name'))
+
+        existing = set(Ward.objects.filter(lga__in=lgas).values_list('lga_id', 'name'))
+        Ward.objects.bulk_create([
+            Ward(lga=lga, name=f"Ward {i + 1}")
+            for lga in lgas for i in range(self.wards_per_lga)
+            if (lga.id, f"Ward {i + 1}") not in existing
+        ], batch_size=self.batch_size)
+        return states, lgas
+
+    def build_units(self, states, lgas):
+        """Creates every unit level by level so each row can point at its parent."""
+        lgas_by_state = {}
+        for lga in lgas:
+            lgas_by_state.setdefault(lga.state_id, []).append(lga)
+
+        units = []
+        for category in self.categories:
+            national = (
+                OrganizationUnit.objects.filter(category=category, level='NATIONAL').order_by('pk').first()
+                or OrganizationUnit.objects.create(
+                    name=f"JIBWIS National HQ ({category})", category=category, level='NATIONAL'
+                )
+            )
+            state_units = OrganizationUnit.objects.bulk_create([
+                OrganizationUnit(name=f"{s.name} State ({category})", category=category,
+                                 level='STATE', state=s, parent=national)
+                for s in states
+            ], batch_size=self.batch_size)
+            lg_units = OrganizationUnit.objects.bulk_create([
+                OrganizationUnit(name=f"{lga.name} LG ({category})", category=category, level='LG',
+                                 state_id=su.state_id, lga=lga, parent=su)
+                for su in state_units for lga in lgas_by_state.get(su.state_id, [])
+            ], batch_size=self.batch_size)
+            ward_units = OrganizationUnit.objects.bulk_create([
+                OrganizationUnit(name=f"Ward {i + 1} Branch ({category})", category=category,
+                                 level='WARD', state_id=lu.state_id, lga_id=lu.lga_id,
+                                 ward_name=f"Ward {i + 1}", parent=lu)
+                for lu in lg_units for i in range(self.wards_per_lga)
+            ], batch_size=self.batch_size)
+            units.extend([national, *state_units, *lg_units, *ward_units])
+
+        self.counts['units'] = len(units)
+        return units
+
+    # --- People and activity ---
+
+    def make_user(self, is_staff, is_active):
+        self.user_seq += 1
+        first = self.rng.choice(FIRST_NAMES)
+        last = self.rng.choice(LAST_NAMES)
+        return User(
+            username=f"user{self.user_seq:07d}",
+            first_name=first,
+            last_name=last,
+            email=f"user{self.user_seq}@example.org",
+            phone_number=f"080{self.user_seq:08d}",
+            password=self.password_hash,
+            is_staff=is_staff,
+            is_active=is_active,
+            education_level=self.rng.choice(EDUCATION),
+            course_of_study=self.rng.choice(COURSES),
+            graduation_year=self.rng.randint(1995, 2025),
+        )
+
+    def populate_units(self, units):
+        """Fills units in chunks sized so that each chunk inserts ~batch_size users."""
+        per_unit = 1 + self.members_per_unit
+        chunk = max(1, self.batch_size // per_unit)
+        for start in range(0, len(units), chunk):
+            with transaction.atomic():
+                self._populate_chunk(units[start:start + chunk])
+            self.log(f"  {min(start + chunk, len(units))}/{len(units)} units populated "
+                     f"({self.counts['users']} users)")
+
+    def _populate_chunk(self, units):
+        users, plan = [], []
+        for unit in units:
+            users.append(self.make_user(is_staff=True, is_active=True))
+            plan.append((unit, 'Chairman', True))
+            for _ in range(self.members_per_unit):
+                active = self.rng.random() >= self.pending_ratio
+                users.append(self.make_user(is_staff=False, is_active=active))
+                plan.append((unit, 'Member', active))
+
+        users = User.objects.bulk_create(users, batch_size=self.batch_size)
+        if users and users[0].pk is None:
+            # Backends that cannot return ids from bulk inserts
+            ids = dict(User.objects.filter(username__in=[u.username for u in users]).values_list('username', 'id'))
+            for u in users:
+                u.pk = ids[u.username]
+        self.counts['users'] += len(users)
+
+        Profile.objects.bulk_create([
+            Profile(user=u, unit=unit, position=position, is_active=active)
+            for u, (unit, position, active) in zip(users, plan)
+        ], batch_size=self.batch_size)
+
+        messages, payroll = [], []
+        now = timezone.now()
+        leader = None
+        for u, (unit, position, active) in zip(users, plan):
+            if position == 'Chairman':
+                leader = u
+                continue
+            for i in range(self.messages_per_member):
+                messages.append(Message(
+                    sender=leader, recipient=u, subject=f"Unit memo #{i + 1}",
+                    body="Assalamu Alaikum. Please attend the monthly unit meeting.",
+                    is_read=self.rng.random() < 0.5,
+                ))
+            for i in range(self.payroll_per_member):
+                self.record_seq += 1
+                month_index = (now.month - 1 - i) % 12
+                payroll.append(PayrollRecord(
+                    member=u,
+                    amount=Decimal(self.rng.randrange(5000, 50000, 500)),
+                    month=MONTHS[month_index],
+                    year=now.year - (1 if now.month - 1 - i < 0 else 0),
+                    status=self.rng.choice(['success', 'success', 'success', 'pending', 'failed']),
+                    reference=f"SYN-PAY-{self.record_seq:09d}",
+                    payment_date=now,
+                ))
+            if len(self.sampled_user_ids) < 10000:
+                self.sampled_user_ids.append(u.pk)
+
+        Message.objects.bulk_create(messages, batch_size=self.batch_size)
+        PayrollRecord.objects.bulk_create(payroll, batch_size=self.batch_size)
+        self.counts['messages'] += len(messages)
+        self.counts['payroll'] += len(payroll)
+
+    def create_videos_and_likes(self):
+        if not self.videos:
+            return
+        videos = VideoPost.objects.bulk_create([
+            VideoPost(title=f"Friday Khutbah #{i + 1}", video_file='videos/synthetic.mp4',
+                      views_count=self.rng.randint(0, 5000))
+            for i in range(self.videos)
+        ])
+        Like = VideoPost.likes.through
+        likes = []
+        for video in videos:
+            k = min(self.likes_per_video, len(self.sampled_user_ids))
+            for user_id in self.rng.sample(self.sampled_user_ids, k):
+                likes.append(Like(videopost_id=video.pk, user_id=user_id))
+        Like.objects.bulk_create(likes, batch_size=self.batch_size, ignore_conflicts=True)
+        self.counts['likes'] = len(likes)
+
+    def create_donations(self):
+        if not self.donations:
+            return
+        from donations.models import Donation
+
+        statuses = ['completed'] * 6 + ['pending', 'processing', 'failed', 'cancelled']
+        for start in range(0, self.donations, self.batch_size):
+            rows = []
+            for _ in range(start, min(start + self.batch_size, self.donations)):
+                self.donation_seq += 1
+                i = self.donation_seq
+                status = self.rng.choice(statuses)
+                rows.append(Donation(
+                    donor_name=f"{self.rng.choice(FIRST_NAMES)} {self.rng.choice(LAST_NAMES)}",
+                    donor_email=f"donor{i}@example.org",
+                    donor_phone=f"081{i:08d}",
+                    amount=Decimal(self.rng.randrange(100, 100000, 50)),
+                    purpose=self.rng.choice(DONATION_PURPOSES),
+                    payment_method=self.rng.choice(['card', 'transfer']),
+                    status=status,
+                    reference=f"SYN-DON-{i:09d}",
+                    completed_at=timezone.now() if status == 'completed' else None,
+                ))
+            Donation.objects.bulk_create(rows, batch_size=self.batch_size)
+            self.counts['donations'] += len(rows)
+        # bulk_create skips the signals that maintain the daily rollups
+        from donations.rollups import rebuild as rebuild_rollups
+        self.counts['donation_rollups'] = rebuild_rollups(batch_size=self.batch_size)
+
+    def run(self):
+        self.resume_sequences()
+        self.log("Preparing geography...")
+        states, lgas = self.ensure_geography()
+        self.log("Creating organisation units...")
+        with transaction.atomic():
+            units = self.build_units(states, lgas)
+        self.log(f"Populating {len(units)} units...")
+        self.populate_units(units)
+        self.create_videos_and_likes()
+        self.create_donations()
+        # Bulk inserts skip the signals that maintain the approver table
+        self.log("Building approver routing table...")
+        self.counts['approvers'] = rebuild_approvers(batch_size=self.batch_size)
+        self.log("Posting payroll to the spending ledger...")
+        self.counts['ledger_entries'] = backfill_ledger(batch_size=self.batch_size)
+        return self.counts
+
+
+def generate_dataset(**options):
+    return DatasetGenerator(**options).run()
@@ -0,0 +1,38 @@
+from django import template
+from django.forms.utils import flatatt
+from django.utils.html import format_html
+
+from accounts.images import ensure_derivatives
+
+register = template.Library()
+
+
+def _srcset(entries):
+    return ', '.join(f"{url} {width}w" for width, url in entries)
+
+
+@register.simple_tag
+def responsive_image(field_file, preset='gallery', sizes='100vw', **attrs):
+    """
+    Renders a <picture> with WebP and JPEG srcsets for an uploaded image.
+    Derivatives are generated on first use if the upload hook missed them;
+    the original file is used as a fallback when the image can't be decoded.
+
+        {% responsive_image item.image 'gallery' sizes='100vw' class='d-block w-100' alt=item.title %}
+    """
+    if not field_file:
+        return ''
+
+    derivatives = ensure_derivatives(field_file, preset)
+    if not derivatives:
+        return format_html('<img src="{}"{}>', field_file.url, flatatt(attrs))
+
+    jpeg = derivatives['jpeg']
+    attrs.setdefault('loading', 'lazy')
+    attrs.setdefault('decoding', 'async')
+    return format_html(
+        '<picture><source type="image/webp" srcset="{}" sizes="{}">'
+        '<img src="{}" srcset="{}" sizes="{}"{}></picture>',
+        _srcset(derivatives['webp']), sizes,
+        jpeg[-1][1], _srcset(jpeg), sizes, flatatt(attrs),
+    )
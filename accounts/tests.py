@@ -1,3 +1,1037 @@
-from django.test import TestCase
+import gzip
+import json
+import os
+import tempfile
+from datetime import timedelta
+from decimal import Decimal
+from importlib import import_module
+from io import BytesIO, StringIO
+from unittest import mock
 
-# Create your tests here.
+import requests
+from PIL import Image
+from django.apps import apps
+from django.conf import settings
+from django.core import mail
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.core.mail import send_mail
+from django.db import connection, transaction
+from django.http import HttpResponse
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import URLPattern, reverse
+from django.utils import timezone
+
+from .announcements import cache_timeout as announcement_cache_timeout, unit_feed, unit_lineage_ids
+from .approvers import approve_profiles, can_approve, pending_approvals, rebuild, set_member_status
+from .benchmarks import compare, run_benchmarks, scenarios, seed
+from . import ledger
+from .budgets import QUERY_BUDGETS
+from .cache import get_versions
+from .deletion import purge_users
+from .geography import get_bundle
+from .images import ensure_derivatives
+from .mail import deliver_queued
+from .middleware import QueryRecorder, fingerprint
+from .management.commands.import_nigeria import iter_json_array
+from .payroll import create_run, disburse_due, schedule_runs
+from .synthetic import DatasetGenerator
+from .templatetags.image_tags import responsive_image
+from .models import (
+    Announcement, Disbursement, DisciplinaryReport, LedgerEntry, LGA, MemberStatusChange, Message,
+    OrganizationUnit, OutboundEmail, PayrollRecord, PayrollRun, Profile, SalaryTemplate, State, UnitApprover,
+    UnitBalance, UnitMonthlySpend, User, VideoPost, Ward,
+)
+
+
+class BenchmarkHarnessTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        seed('tiny')
+
+    def test_every_scenario_reports_metrics(self):
+        results = run_benchmarks(repeat=1)
+        self.assertEqual(set(results), {name for name, *_ in scenarios()})
+        for metrics in results.values():
+            self.assertEqual(set(metrics), {'wall_ms', 'queries', 'peak_kb'})
+
+    def test_compare_flags_query_growth(self):
+        baseline = {'inbox': {'wall_ms': 10.0, 'queries': 5, 'peak_kb': 100.0}}
+        self.assertEqual(compare({'inbox': dict(baseline['inbox'])}, baseline), [])
+        regressions = compare({'inbox': dict(baseline['inbox'], queries=6)}, baseline)
+        self.assertEqual(len(regressions), 1)
+
+
+class SyntheticDatasetTests(TestCase):
+    options = dict(max_states=1, members_per_unit=1, payroll_per_member=2, donations=3, categories=('FAG',))
+
+    def setUp(self):
+        LGA.objects.create(state=State.objects.create(name='Kano'), name='Dala')
+
+    def test_keep_existing_continues_the_sequences(self):
+        first = DatasetGenerator(**self.options).run()
+        second = DatasetGenerator(**self.options).run()  # as with --keep-existing
+
+        self.assertEqual(second['users'], first['users'])
+        self.assertEqual(User.objects.count(), first['users'] * 2)
+        self.assertEqual(PayrollRecord.objects.count(), first['payroll'] * 2)
+        from donations.models import Donation
+        self.assertEqual(Donation.objects.count(), 6)
+        self.assertEqual(OrganizationUnit.objects.filter(level='NATIONAL').count(), 1)
+
+    def test_cleanup_keeps_superusers(self):
+        admin = User.objects.create_superuser('admin', password='pw')
+        call_command('setup_test_data', '--max-states=1', '--members-per-unit=1', stdout=StringIO())
+        call_command('setup_test_data', '--max-states=1', '--members-per-unit=1', stdout=StringIO())
+        self.assertTrue(User.objects.filter(pk=admin.pk).exists())
+        self.assertEqual(OrganizationUnit.objects.filter(level='NATIONAL').count(), 3)
+
+    def test_payroll_is_limited_to_a_year(self):
+        with self.assertRaises(ValueError):
+            DatasetGenerator(payroll_per_member=13)
+        with self.assertRaises(CommandError):
+            call_command('setup_test_data', '--payroll-per-member=13', stdout=StringIO())
+
+
+class QueryBudgetRegistryTests(TestCase):
+    def test_every_named_view_has_a_budget(self):
+        from accounts.urls import urlpatterns as account_urls
+        from donations.urls import urlpatterns as donation_urls
+
+        names = {p.name for p in account_urls + donation_urls if isinstance(p, URLPattern) and p.name}
+        self.assertEqual(names - set(QUERY_BUDGETS), set())
+
+
+@override_settings(QUERY_BUDGET_MODE='raise')
+class QueryBudgetTests(TestCase):
+    """
+    Renders each list view with 1 and then 100 rows behind it: the query
+    count must stay flat and within the view's budget (the middleware raises
+    QueryBudgetExceeded otherwise).
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.state = State.objects.create(name='Kano')
+        cls.lga = LGA.objects.create(state=cls.state, name='Dala')
+        cls.national = OrganizationUnit.objects.create(name='National HQ (FAG)', category='FAG', level='NATIONAL')
+        cls.ward = OrganizationUnit.objects.create(
+            name='Ward 1 Branch (FAG)', category='FAG', level='WARD',
+            state=cls.state, lga=cls.lga, ward_name='Ward 1', parent=cls.national,
+        )
+        cls.leader = User.objects.create_user('leader', password='pw', is_staff=True)
+        Profile.objects.create(user=cls.leader, unit=cls.national, position='Chairman', is_active=True)
+        cls.video = VideoPost.objects.create(title='Khutbah', video_file='videos/khutbah.mp4')
+
+    def setUp(self):
+        cache.clear()
+        self.seeded = 0
+        self.client.force_login(self.leader)
+
+    def seed(self, n):
+        """n more members, each with a profile, messages both ways, pay, a report and a like."""
+        users = User.objects.bulk_create([
+            User(username=f'member{i}', first_name='Member', last_name=str(i), is_active=i % 2 == 0)
+            for i in range(self.seeded, self.seeded + n)
+        ])
+        users = list(User.objects.filter(username__in=[u.username for u in users]))
+        Profile.objects.bulk_create([
+            Profile(user=u, unit=self.national if i % 2 else self.ward, position='Member', is_active=u.is_active)
+            for i, u in enumerate(users)
+        ])
+        Message.objects.bulk_create(
+            [Message(sender=u, recipient=self.leader, subject='Hello', body='Salam') for u in users] +
+            [Message(sender=self.leader, recipient=u, subject='Memo', body='Salam') for u in users]
+        )
+        PayrollRecord.objects.bulk_create([
+            PayrollRecord(member=u, amount=Decimal('5000'), status='success', reference=f'PAY-{u.pk}')
+            for u in users
+        ])
+        Disbursement.objects.bulk_create([
+            Disbursement(authorized_by=self.leader, recipient=u, amount=Decimal('5000')) for u in users
+        ])
+        DisciplinaryReport.objects.bulk_create([
+            DisciplinaryReport(reporter=u, subject_leader=self.leader, complaint='Late') for u in users
+        ])
+        Announcement.objects.bulk_create([Announcement(content=f'Notice {u.pk}') for u in users])
+        self.video.likes.add(*users)
+        ledger.backfill()
+        self.seeded += n
+
+    def count_queries(self, url_name, data=None):
+        cache.clear()
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse(url_name), data)
+        self.assertLess(response.status_code, 400, url_name)
+        return len(queries)
+
+    def assertFlat(self, url_name, data=None):
+        self.seed(1)
+        few = self.count_queries(url_name, data)
+        self.seed(99)
+        many = self.count_queries(url_name, data)
+        self.assertLessEqual(many, few, f"{url_name}: {few} queries with 1 row, {many} with 100")
+        self.assertLessEqual(many, QUERY_BUDGETS[url_name])
+
+    def test_dashboard(self):
+        self.assertFlat('dashboard')
+
+    def test_inbox(self):
+        self.assertFlat('inbox')
+
+    def test_sent_messages(self):
+        self.assertFlat('sent_messages')
+
+    def test_members_list(self):
+        self.assertFlat('members_list')
+
+    def test_member_search(self):
+        self.assertFlat('member_search', {'category': 'FAG'})
+
+    def test_leader_directory(self):
+        self.assertFlat('leader_directory')
+
+    def test_bulk_payroll(self):
+        with mock.patch('accounts.views.get_paystack_balance', return_value=0):
+            self.assertFlat('bulk_payroll')
+
+    def test_payroll_history(self):
+        self.assertFlat('payroll_history')
+
+    def test_export_members_excel(self):
+        self.assertFlat('export_members_excel')
+
+    def test_export_payroll_csv(self):
+        self.assertFlat('export_payroll_csv')
+
+    def test_disciplinary_admin(self):
+        self.assertFlat('disciplinary_admin')
+
+    def test_landing_page(self):
+        self.client.logout()
+        self.assertFlat('landing')
+
+
+class LandingCacheTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.video = VideoPost.objects.create(title='Khutbah', video_file='videos/khutbah.mp4')
+        self.member = User.objects.create_user('member')
+
+    def assertServedFromCache(self):
+        with self.assertNumQueries(0):
+            self.assertEqual(self.client.get(reverse('landing')).status_code, 200)
+
+    def test_views_and_likes_keep_the_cached_page(self):
+        self.client.get(reverse('landing'))
+        versions = get_versions('videos')
+
+        with mock.patch('accounts.views.render', return_value=HttpResponse()):  # no video_detail.html yet
+            self.client.get(reverse('video_detail', args=[self.video.pk]))
+            self.client.get(reverse('video_detail', args=[self.video.pk]))
+        self.video.likes.add(self.member)
+        self.assertEqual(get_versions('videos'), versions)
+        self.assertServedFromCache()
+        self.video.refresh_from_db()
+        self.assertEqual(self.video.views_count, 2)
+
+    def test_editing_a_video_invalidates_the_page(self):
+        self.client.get(reverse('landing'))
+        versions = get_versions('videos')
+        self.video.title = 'Tafsir'
+        self.video.save()
+        self.assertNotEqual(get_versions('videos'), versions)
+        self.assertContains(self.client.get(reverse('landing')), 'Tafsir')
+
+    def test_like_counts_are_rendered_outside_the_fragment(self):
+        self.video.likes.add(self.member)
+        self.client.force_login(self.member)
+        self.client.get(reverse('landing'))
+        self.video.likes.remove(self.member)
+        response = self.client.get(reverse('landing'))
+        self.assertEqual(response.context['like_counts'], {self.video.pk: 0})
+
+
+class AnnouncementTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        kano = State.objects.create(name='Kano')
+        dala = LGA.objects.create(state=kano, name='Dala')
+        self.national = OrganizationUnit.objects.create(name='HQ', category='FAG', level='NATIONAL')
+        self.state = OrganizationUnit.objects.create(name='Kano', category='FAG', level='STATE', state=kano)
+        self.lg = OrganizationUnit.objects.create(name='Dala', category='FAG', level='LG', state=kano, lga=dala)
+        self.ward = OrganizationUnit.objects.create(
+            name='Ward 1', category='FAG', level='WARD', state=kano, lga=dala, ward_name='Ward 1'
+        )
+        self.other_ward = OrganizationUnit.objects.create(
+            name='Ward 2', category='FAG', level='WARD', state=kano, lga=dala, ward_name='Ward 2'
+        )
+        self.ulama_state = OrganizationUnit.objects.create(name='Kano', category='ULAMA', level='STATE', state=kano)
+
+    def test_lineage_covers_offices_above_the_unit_in_its_category(self):
+        self.assertEqual(unit_lineage_ids(self.ward), sorted([self.ward.pk, self.lg.pk, self.state.pk, self.national.pk]))
+        self.assertEqual(unit_lineage_ids(self.national), [self.national.pk])
+
+        # An explicit parent outside the location rules is followed as well
+        self.ward.parent = self.ulama_state
+        self.ward.save()
+        self.assertIn(self.ulama_state.pk, unit_lineage_ids(self.ward))
+
+    def test_unit_feed_merges_national_and_lineage_announcements(self):
+        now = timezone.now()
+        national = Announcement.objects.create(content='National')
+        state = Announcement.objects.create(content='State', unit=self.state)
+        Announcement.objects.create(content='Sibling ward', unit=self.other_ward)
+        Announcement.objects.create(content='Expired', unit=self.ward, expires_at=now - timedelta(minutes=1))
+        own = Announcement.objects.create(content='Own', unit=self.ward, expires_at=now + timedelta(days=1))
+
+        self.assertEqual(unit_feed(self.ward), [own, state, national])
+        self.assertEqual(unit_feed(None), [national])
+        with override_settings(ANNOUNCEMENT_FEED_LIMIT=2):
+            cache.clear()
+            self.assertEqual(unit_feed(self.ward), [own, state])
+
+    def test_archive_command_retires_expired_announcements(self):
+        expired = Announcement.objects.create(content='Old', expires_at=timezone.now() - timedelta(hours=1))
+        current = Announcement.objects.create(content='New', expires_at=timezone.now() + timedelta(hours=1))
+        versions = get_versions('announcements')
+
+        out = StringIO()
+        call_command('archive_announcements', stdout=out)
+        self.assertIn('Archived 1 expired announcement(s).', out.getvalue())
+        expired.refresh_from_db()
+        current.refresh_from_db()
+        self.assertEqual((expired.is_archived, expired.is_active), (True, False))
+        self.assertFalse(current.is_archived)
+        self.assertNotEqual(get_versions('announcements'), versions)
+
+    def test_landing_page_is_cached_until_the_next_announcement_expires(self):
+        self.assertEqual(announcement_cache_timeout(), settings.PAGE_CACHE_TIMEOUT)
+        Announcement.objects.create(content='Soon', expires_at=timezone.now() + timedelta(seconds=60))
+        Announcement.objects.create(content='Later', expires_at=timezone.now() + timedelta(hours=1))
+        self.assertLessEqual(announcement_cache_timeout(), 61)
+
+        with mock.patch('accounts.cache.cache.set', wraps=cache.set) as cache_set:
+            self.client.get(reverse('landing'))
+        page_timeouts = [c.args[2] for c in cache_set.call_args_list if c.args[0].startswith('page:')]
+        self.assertEqual(len(page_timeouts), 1)
+        self.assertLessEqual(page_timeouts[0], 61)
+
+    def test_impossible_expiry_dates_are_rejected(self):
+        leader = User.objects.create_user('leader', password='pw', is_staff=True)
+        Profile.objects.create(user=leader, unit=self.ward, position='Chairman', is_active=True)
+        self.client.force_login(leader)
+        for value in ('2026-02-30T10:00', 'next week'):
+            with self.subTest(value=value):
+                response = self.client.post(
+                    reverse('dashboard'), {'add_announcement': '1', 'content': 'Meeting', 'expires_at': value},
+                    follow=True,
+                )
+                self.assertContains(response, 'Invalid expiry date')
+        self.assertFalse(Announcement.objects.exists())
+
+        self.client.post(reverse('dashboard'), {'add_announcement': '1', 'content': 'Meeting', 'expires_at': '2026-03-01T10:00'})
+        self.assertEqual(Announcement.objects.get().unit, self.ward)
+
+
+class GeographyBundleTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.kano = State.objects.create(name='Kano')
+        self.abia = State.objects.create(name='Abia')
+        self.dala = LGA.objects.create(state=self.kano, name='Dala')
+        self.fagge = LGA.objects.create(state=self.kano, name='Fagge')
+        Ward.objects.create(lga=self.dala, name='Ward 1')
+
+    def test_bundle_nests_the_tree_and_is_memoized(self):
+        bundle = get_bundle()
+        tree = json.loads(bundle.json)
+        self.assertEqual([s['name'] for s in tree['states']], ['Abia', 'Kano'])
+        kano = tree['states'][1]
+        self.assertEqual([(l['name'], [w['name'] for w in l['wards']]) for l in kano['lgas']],
+                         [('Dala', ['Ward 1']), ('Fagge', [])])
+        self.assertEqual(gzip.decompress(bundle.gzip), bundle.json)
+        self.assertEqual(bundle.lga_choices(self.kano.pk), [(self.dala.pk, 'Dala'), (self.fagge.pk, 'Fagge')])
+        self.assertEqual(bundle.lga_choices(self.abia.pk), [])
+
+        with self.assertNumQueries(0):
+            self.assertIs(get_bundle(), bundle)
+
+    def test_edits_rebuild_the_bundle(self):
+        bundle = get_bundle()
+        Ward.objects.create(lga=self.fagge, name='Ward 2')
+        rebuilt = get_bundle()
+        self.assertIsNot(rebuilt, bundle)
+        self.assertNotEqual(rebuilt.etag, bundle.etag)
+        self.assertIn(b'Ward 2', rebuilt.json)
+
+    def test_view_serves_compressed_versioned_json(self):
+        bundle = get_bundle()
+        url = reverse('ajax_geography')
+
+        response = self.client.get(url, {'v': bundle.version}, headers={'Accept-Encoding': 'gzip, br'})
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertEqual(response.content, bundle.gzip)
+        self.assertIn('immutable', response['Cache-Control'])
+        self.assertIn('Accept-Encoding', response['Vary'])
+
+        response = self.client.get(url, {'v': 'stale'})
+        self.assertEqual(json.loads(response.content), json.loads(bundle.json))
+        self.assertNotIn('immutable', response['Cache-Control'])
+
+        self.assertEqual(self.client.get(url, headers={'If-None-Match': bundle.etag}).status_code, 304)
+
+
+class ImportNigeriaTests(TestCase):
+    def parse(self, text, chunk_size=3):
+        return list(iter_json_array(StringIO(text), chunk_size=chunk_size))
+
+    def test_elements_are_streamed_across_chunk_boundaries(self):
+        text = (
+            ' [ {"name": "Kano", "lgas": [{"name": "Dala", "wards": ["Ward [1], \\"A\\"", "Gwammaja"]}]},\n'
+            '   [1, [2, 3]], 12345, "caf\\u00e9, ]" ] '
+        )
+        expected = json.loads(text)
+        for chunk_size in (1, 2, 3, 7, 64 * 1024):
+            with self.subTest(chunk_size=chunk_size):
+                self.assertEqual(self.parse(text, chunk_size), expected)
+        self.assertEqual(self.parse('[]'), [])
+
+    def test_malformed_input_is_rejected(self):
+        for text in ('{"name": "Kano"}', '[{"name": "Kano"', '[{"name": "Kano"}, {]'):
+            with self.subTest(text=text), self.assertRaises(ValueError):
+                self.parse(text)
+
+    def write(self, data):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        path = os.path.join(directory.name, 'geography.json')
+        with open(path, 'w', encoding='utf-8') as handle:
+            json.dump(data, handle)
+        return path
+
+    def test_reimporting_is_idempotent(self):
+        nested = self.write([
+            {'name': 'Kano', 'code': 'KN', 'lgas': ['Fagge', {'name': 'Dala', 'wards': ['Ward 1', ' Ward 2 ']}]},
+        ])
+        flat = self.write([
+            {'state': 'Kano', 'lga': 'Dala', 'ward': 'Ward 3'},
+            {'state': 'Abia', 'lga': 'Aba North'},
+        ])
+
+        out = StringIO()
+        call_command('import_nigeria', nested, flat, stdout=out)
+        self.assertIn('States: 2 inserted, 0 updated, 0 unchanged', out.getvalue())
+        self.assertIn('Wards: 3 inserted', out.getvalue())
+        snapshot = (
+            sorted(State.objects.values_list('name', 'code')),
+            sorted(LGA.objects.values_list('state__name', 'name')),
+            sorted(Ward.objects.values_list('lga__name', 'name')),
+        )
+        self.assertEqual(snapshot[2], [('Dala', 'Ward 1'), ('Dala', 'Ward 2'), ('Dala', 'Ward 3')])
+
+        out = StringIO()
+        call_command('import_nigeria', nested, flat, stdout=out)
+        self.assertIn('States: 0 inserted, 0 updated, 2 unchanged', out.getvalue())
+        self.assertIn('LGAs: 0 inserted, 0 updated, 3 unchanged', out.getvalue())
+        self.assertIn('Wards: 0 inserted, 0 updated, 3 unchanged', out.getvalue())
+        self.assertEqual(snapshot, (
+            sorted(State.objects.values_list('name', 'code')),
+            sorted(LGA.objects.values_list('state__name', 'name')),
+            sorted(Ward.objects.values_list('lga__name', 'name')),
+        ))
+
+    def test_dry_run_and_code_changes(self):
+        call_command('import_nigeria', self.write([{'name': 'Kano', 'code': 'KN'}]), stdout=StringIO())
+        renamed = self.write([{'name': 'Kano', 'code': 'KAN', 'lgas': ['Dala']}])
+
+        out = StringIO()
+        call_command('import_nigeria', renamed, '--dry-run', stdout=out)
+        self.assertIn('States: 0 inserted, 1 updated, 0 unchanged', out.getvalue())
+        self.assertEqual(State.objects.get().code, 'KN')
+        self.assertFalse(LGA.objects.exists())
+
+        call_command('import_nigeria', renamed, stdout=StringIO())
+        self.assertEqual(State.objects.get().code, 'KAN')
+
+
+class QueryProfilerTests(TestCase):
+    def test_fingerprint_collapses_literals_and_in_lists(self):
+        self.assertEqual(
+            fingerprint("SELECT * FROM t WHERE name = 'O''Brien' AND id IN (%s, %s, %s) AND n > 10.5"),
+            "SELECT * FROM t WHERE name = ? AND id IN (...) AND n > ?",
+        )
+        self.assertEqual(fingerprint('SELECT 1\n  FROM  t2 WHERE pk = %s'), fingerprint('SELECT 7 FROM t2 WHERE pk = 9'))
+
+    def test_summary_flags_repeated_fingerprints(self):
+        recorder = QueryRecorder()
+        with connection.execute_wrapper(recorder):
+            for pk in range(6):
+                list(User.objects.filter(pk=pk))
+            State.objects.count()
+        summary = recorder.summary(threshold=5)
+        self.assertEqual((summary['count'], summary['distinct']), (7, 2))
+        [group] = summary['n_plus_one']
+        self.assertEqual(group['count'], 6)
+        self.assertIn('accounts/tests.py', group['origins'][0])
+
+    def test_slow_requests_are_logged_and_the_log_rotates(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        path = os.path.join(directory.name, 'logs', 'slow.jsonl')
+        with override_settings(QUERY_PROFILER=True, QUERY_PROFILER_SLOW_MS=0,
+                               QUERY_PROFILER_LOG=path, QUERY_PROFILER_LOG_MAX_BYTES=600):
+            for _ in range(4):
+                response = self.client.get(reverse('ajax_geography'))
+                self.assertIn('db;dur=', response['Server-Timing'])
+
+        with open(path, encoding='utf-8') as handle:
+            entries = [json.loads(line) for line in handle]
+        self.assertTrue(entries)
+        self.assertEqual(entries[-1]['path'], reverse('ajax_geography'))
+        self.assertTrue(os.path.exists(path + '.1'))
+        self.assertLessEqual(os.path.getsize(path), 600)
+
+
+class ImageDerivativeTests(TestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        media = override_settings(MEDIA_ROOT=directory.name)
+        media.enable()
+        self.addCleanup(media.disable)
+        cache.clear()
+
+    def upload(self, content):
+        name = default_storage.save('profiles/picture.jpg', ContentFile(content))
+        return Profile(profile_picture=name).profile_picture
+
+    def jpeg(self, width, height):
+        buf = BytesIO()
+        Image.new('RGB', (width, height), 'green').save(buf, 'JPEG')
+        return buf.getvalue()
+
+    def test_preset_widths_are_rendered_once_without_upscaling(self):
+        picture = self.upload(self.jpeg(150, 100))
+        derivatives = ensure_derivatives(picture, 'avatar')
+        self.assertEqual([w for w, _ in derivatives['webp']], [96, 150])
+        self.assertEqual([w for w, _ in derivatives['jpeg']], [96, 150])
+        self.assertTrue(all(default_storage.exists(url[len(settings.MEDIA_URL):]) for _, url in derivatives['jpeg']))
+
+        with mock.patch('accounts.images._load') as load:
+            self.assertEqual(ensure_derivatives(picture, 'avatar'), derivatives)
+        load.assert_not_called()
+
+    def test_undecodable_uploads_are_not_decoded_again(self):
+        picture = self.upload(b'not an image')
+        self.assertIsNone(ensure_derivatives(picture, 'avatar'))
+        with mock.patch('accounts.images.Image.open') as image_open:
+            self.assertIsNone(ensure_derivatives(picture, 'gallery'))
+        image_open.assert_not_called()
+        self.assertEqual(responsive_image(picture, 'avatar'), f'<img src="{picture.url}">')
+
+
+@override_settings(
+    EMAIL_BACKEND='accounts.mail.QueuedEmailBackend',
+    EMAIL_DELIVERY_BACKEND='django.core.mail.backends.locmem.EmailBackend',
+)
+class EmailOutboxTests(TestCase):
+    def test_mail_is_queued_on_commit_and_delivered_in_a_batch(self):
+        with self.captureOnCommitCallbacks(execute=False) as callbacks:
+            send_mail('Welcome', 'Salam', 'admin@jibwis.org', ['member@example.org'])
+            send_mail('Reminder', 'Salam', 'admin@jibwis.org', ['member@example.org'])
+        self.assertFalse(OutboundEmail.objects.exists())
+        for callback in callbacks:
+            callback()
+        self.assertEqual(OutboundEmail.objects.filter(status='queued').count(), 2)
+
+        self.assertEqual(deliver_queued(), (2, 0))
+        self.assertEqual([m.subject for m in mail.outbox], ['Welcome', 'Reminder'])
+        self.assertEqual(OutboundEmail.objects.filter(status='sent').count(), 2)
+
+    def test_failures_back_off_then_give_up(self):
+        email = OutboundEmail.objects.create(subject='Hi', body='Salam', to=['member@example.org'])
+        with mock.patch('django.core.mail.backends.locmem.EmailBackend.send_messages', side_effect=OSError('down')):
+            self.assertEqual(deliver_queued(max_attempts=2), (0, 1))
+            email.refresh_from_db()
+            self.assertEqual((email.status, email.attempts), ('queued', 1))
+            self.assertGreater(email.next_attempt_at, timezone.now())
+
+            self.assertEqual(deliver_queued(max_attempts=2), (0, 0))  # not due yet
+            OutboundEmail.objects.update(next_attempt_at=timezone.now())
+            deliver_queued(max_attempts=2)
+        email.refresh_from_db()
+        self.assertEqual((email.status, email.attempts), ('failed', 2))
+
+
+    def test_rows_claimed_by_another_worker_are_not_sent_twice(self):
+        held = OutboundEmail.objects.create(subject='Held', body='Salam', to=['a@example.org'])
+        stale = OutboundEmail.objects.create(subject='Stale', body='Salam', to=['b@example.org'])
+        OutboundEmail.objects.create(subject='Free', body='Salam', to=['c@example.org'])
+        now = timezone.now()
+        OutboundEmail.objects.filter(pk=held.pk).update(status='sending', claimed_at=now)
+        OutboundEmail.objects.filter(pk=stale.pk).update(status='sending', claimed_at=now - timedelta(hours=1))
+
+        self.assertEqual(deliver_queued(), (2, 0))
+        self.assertEqual(sorted(m.subject for m in mail.outbox), ['Free', 'Stale'])
+        held.refresh_from_db()
+        self.assertEqual(held.status, 'sending')
+
+
+class ApproverIndexTests(TestCase):
+    def setUp(self):
+        self.kano = State.objects.create(name='Kano')
+        self.dala = LGA.objects.create(state=self.kano, name='Dala')
+        self.national = OrganizationUnit.objects.create(name='HQ', category='FAG', level='NATIONAL')
+        self.state = OrganizationUnit.objects.create(name='Kano', category='FAG', level='STATE', state=self.kano)
+        self.lg = OrganizationUnit.objects.create(name='Dala', category='FAG', level='LG', state=self.kano, lga=self.dala)
+        self.ward = OrganizationUnit.objects.create(
+            name='Ward 1', category='FAG', level='WARD', state=self.kano, lga=self.dala, ward_name='Ward 1'
+        )
+        self.other_state = OrganizationUnit.objects.create(
+            name='Lagos', category='FAG', level='STATE', state=State.objects.create(name='Lagos')
+        )
+        self.chairman = self.make_leader('national', self.national)
+        self.state_chairman = self.make_leader('kano', self.state)
+
+    def make_leader(self, username, unit):
+        user = User.objects.create_user(username, email=f'{username}@example.org', is_staff=True)
+        Profile.objects.create(user=user, unit=unit, position='Chairman', is_active=True)
+        return user
+
+    def pairs(self):
+        return set(UnitApprover.objects.values_list('unit_id', 'leader_id', 'distance'))
+
+    def test_signals_match_a_full_rebuild(self):
+        incremental = self.pairs()
+        self.assertIn((self.ward.pk, self.state_chairman.pk, 2), incremental)
+        self.assertNotIn((self.other_state.pk, self.state_chairman.pk, 2), incremental)
+        rebuild()
+        self.assertEqual(self.pairs(), incremental)
+
+    def test_losing_staff_status_removes_the_leader(self):
+        self.state_chairman.is_staff = False
+        self.state_chairman.save()
+        self.assertFalse(UnitApprover.objects.filter(leader=self.state_chairman).exists())
+
+    def test_registration_notifies_the_nearest_leaders(self):
+        member = User.objects.create_user('member', is_active=False)
+        with override_settings(EMAIL_BACKEND='django.core.mail.backends.locmem.EmailBackend'):
+            Profile.objects.create(user=member, unit=self.ward, position='Member')
+        self.assertEqual([m.to for m in mail.outbox], [['kano@example.org']])
+        self.assertEqual([p.user for p in pending_approvals(self.state_chairman)], [member])
+
+    @override_settings(QUERY_BUDGET_MODE='raise')
+    def test_bulk_approval_only_touches_the_leaders_jurisdiction(self):
+        ward_members = [User.objects.create_user(f'ward{i}', is_active=False) for i in range(3)]
+        outsider = User.objects.create_user('lagos', is_active=False)
+        profiles = [Profile.objects.create(user=u, unit=self.ward, position='Member') for u in ward_members]
+        foreign = Profile.objects.create(user=outsider, unit=self.other_state, position='Member')
+
+        self.client.force_login(self.state_chairman)
+        response = self.client.post(
+            reverse('bulk_approve_members'), {'profile_ids': [p.pk for p in profiles] + [foreign.pk]}
+        )
+        self.assertRedirects(response, reverse('dashboard'), fetch_redirect_response=False)
+
+        self.assertEqual(Profile.objects.filter(pk__in=[p.pk for p in profiles], is_active=True).count(), 3)
+        self.assertEqual(User.objects.filter(pk__in=[u.pk for u in ward_members], is_active=True).count(), 3)
+        foreign.refresh_from_db()
+        outsider.refresh_from_db()
+        self.assertFalse(foreign.is_active or outsider.is_active)
+        self.assertEqual(Message.objects.filter(sender=self.state_chairman, subject='Account Activated').count(), 3)
+
+    def test_approving_a_leader_adds_them_to_the_routing_table(self):
+        leader = User.objects.create_user('ward_chair', is_staff=True, is_active=False)
+        profile = Profile.objects.create(user=leader, unit=self.ward, position='Chairman')
+        self.assertFalse(UnitApprover.objects.filter(leader=leader).exists())
+        self.assertEqual(approve_profiles(self.chairman, [profile.pk]), 1)
+        self.assertTrue(UnitApprover.objects.filter(unit=self.ward, leader=leader, distance=0).exists())
+
+    @override_settings(QUERY_BUDGET_MODE='raise')
+    def test_bulk_suspension_is_scoped_and_audited(self):
+        lg_members = [User.objects.create_user(f'lg{i}') for i in range(3)]
+        for user in lg_members:
+            Profile.objects.create(user=user, unit=self.lg, position='Member', is_active=True)
+        outsider = User.objects.create_user('lagos')
+        Profile.objects.create(user=outsider, unit=self.other_state, position='Member', is_active=True)
+
+        self.client.force_login(self.state_chairman)
+        self.client.post(reverse('bulk_member_status'), {
+            'status_action': 'suspend', 'reason': 'Dues unpaid',
+            'selected_members': [u.pk for u in lg_members] + [outsider.pk, self.state_chairman.pk],
+        })
+
+        self.assertEqual(User.objects.filter(pk__in=[u.pk for u in lg_members], is_active=False).count(), 3)
+        self.assertFalse(Profile.objects.filter(user__in=lg_members, is_active=True).exists())
+        self.assertTrue(User.objects.get(pk=outsider.pk).is_active)
+        self.assertTrue(User.objects.get(pk=self.state_chairman.pk).is_active)
+        audit = MemberStatusChange.objects.filter(actor=self.state_chairman)
+        self.assertEqual(sorted(audit.values_list('target_username', flat=True)), ['lg0', 'lg1', 'lg2'])
+        self.assertTrue(all(c.was_active and not c.is_active and c.reason == 'Dues unpaid' for c in audit))
+
+        # A whole unit at once; members already active are left alone and not logged again
+        self.client.post(reverse('bulk_member_status'), {'status_action': 'reactivate', 'unit_id': self.lg.pk})
+        self.assertEqual(User.objects.filter(pk__in=[u.pk for u in lg_members], is_active=True).count(), 3)
+        self.assertEqual(MemberStatusChange.objects.filter(target__in=lg_members).count(), 6)
+
+    def test_state_leaders_cannot_suspend_ward_members(self):
+        member = User.objects.create_user('ward_member')
+        Profile.objects.create(user=member, unit=self.ward, position='Member', is_active=True)
+        self.assertTrue(can_approve(self.state_chairman, self.ward))  # approval still reaches the ward
+
+        self.client.force_login(self.state_chairman)
+        url = reverse('toggle_member_status', args=[member.pk])
+        self.assertEqual(self.client.get(url).status_code, 405)
+        self.client.post(url, {'reason': 'Dues unpaid'})
+        self.client.post(reverse('bulk_member_status'), {'status_action': 'suspend', 'unit_id': self.ward.pk})
+        self.assertTrue(User.objects.get(pk=member.pk).is_active)
+
+        self.client.force_login(self.chairman)
+        self.client.post(url, {'reason': 'Dues unpaid'})
+        self.assertFalse(User.objects.get(pk=member.pk).is_active)
+        self.assertEqual(MemberStatusChange.objects.get(target=member).reason, 'Dues unpaid')
+
+    def test_suspension_leaves_profiles_outside_the_jurisdiction_alone(self):
+        member = User.objects.create_user('two_units')
+        in_scope = Profile.objects.create(user=member, unit=self.lg, position='Member', is_active=True)
+        elsewhere = Profile.objects.create(user=member, unit=self.other_state, position='Member', is_active=True)
+
+        self.assertEqual(set_member_status(self.state_chairman, False, user_ids=[member.pk]), 1)
+        in_scope.refresh_from_db()
+        elsewhere.refresh_from_db()
+        self.assertEqual((in_scope.is_active, elsewhere.is_active), (False, True))
+        self.assertTrue(User.objects.get(pk=member.pk).is_active)  # still active in Lagos
+        self.assertEqual(set_member_status(self.state_chairman, False, user_ids=[member.pk]), 0)
+
+        # Once no profile is left active, the account is suspended too
+        self.assertEqual(set_member_status(self.chairman, False, user_ids=[member.pk]), 1)
+        self.assertFalse(User.objects.get(pk=member.pk).is_active)
+
+    def test_suspending_a_leader_removes_their_approver_rows(self):
+        set_member_status(self.chairman, False, 'Transfer', user_ids=[self.state_chairman.pk])
+        self.assertFalse(UnitApprover.objects.filter(leader=self.state_chairman).exists())
+        change = MemberStatusChange.objects.get(target=self.state_chairman)
+        with self.assertRaises(ValueError):
+            change.save()
+
+
+class PurgeTests(TestCase):
+    def setUp(self):
+        self.ward = OrganizationUnit.objects.create(name='Ward 1', category='FAG', level='WARD')
+        self.national = OrganizationUnit.objects.create(name='HQ', category='FAG', level='NATIONAL')
+        self.admin = User.objects.create_user('admin', is_staff=True)
+        Profile.objects.create(user=self.admin, unit=self.national, position='Secretary', is_active=True)
+        self.member = User.objects.create_user('member')
+        Profile.objects.create(user=self.member, unit=self.ward, position='Member', is_active=True)
+        self.bystander = User.objects.create_user('bystander')
+
+    def seed_member_data(self, count):
+        Message.objects.bulk_create(
+            [Message(sender=self.member, recipient=self.bystander, subject='s', body='b') for _ in range(count)]
+            + [Message(sender=self.bystander, recipient=self.member, subject='s', body='b') for _ in range(count)]
+        )
+        PayrollRecord.objects.create(member=self.member, amount=Decimal('1000'), month='January', year=2025, reference='PAY-1')
+        Disbursement.objects.create(authorized_by=self.admin, recipient=self.member, amount=Decimal('1000'))
+        DisciplinaryReport.objects.create(reporter=self.bystander, subject_leader=self.member, complaint='Absent')
+        video = VideoPost.objects.create(title='Tafsir', video_file='videos/t.mp4')
+        video.likes.add(self.member, self.bystander)
+        MemberStatusChange.objects.create(
+            actor=self.member, target=self.bystander, target_username='bystander', was_active=True, is_active=False,
+        )
+        return video
+
+    def test_purge_removes_cascades_in_chunks_and_keeps_the_audit(self):
+        video = self.seed_member_data(7)
+        chunks = []
+        deleted = purge_users([self.member.pk], chunk_size=3, progress=lambda label, rows: chunks.append(label))
+
+        self.assertFalse(User.objects.filter(pk=self.member.pk).exists())
+        self.assertEqual(deleted['accounts.Message'], 14)
+        self.assertEqual(chunks.count('accounts.Message'), 6)  # 3 + 3 + 1 rows per direction
+        self.assertFalse(PayrollRecord.objects.exists() or Disbursement.objects.exists() or DisciplinaryReport.objects.exists())
+        self.assertEqual(list(video.likes.all()), [self.bystander])
+        change = MemberStatusChange.objects.get()
+        self.assertIsNone(change.actor_id)
+        self.assertTrue(User.objects.filter(pk=self.bystander.pk).exists())
+
+    def test_purge_matches_the_orm_cascade(self):
+        self.seed_member_data(2)
+        with transaction.atomic():
+            sid = transaction.savepoint()
+            _, expected = User.objects.filter(pk=self.member.pk).delete()
+            transaction.savepoint_rollback(sid)
+        deleted = purge_users([self.member.pk])
+        self.assertEqual({k: v for k, v in deleted.items() if v}, {k: v for k, v in expected.items() if v})
+
+    @override_settings(QUERY_BUDGET_MODE='raise')
+    def test_bulk_delete_respects_rank(self):
+        chairman = User.objects.create_user('chairman', is_staff=True)
+        Profile.objects.create(user=chairman, unit=self.national, position='National Chairman', is_active=True)
+        self.seed_member_data(2)
+
+        self.client.force_login(self.admin)
+        self.client.post(reverse('bulk_delete_members'), {'selected_members': [self.member.pk, chairman.pk]})
+        self.assertFalse(User.objects.filter(pk=self.member.pk).exists())
+        self.assertTrue(User.objects.filter(pk=chairman.pk).exists())
+
+
+@override_settings(QUERY_BUDGET_MODE='raise')
+class PayrollRunTests(TestCase):
+    def setUp(self):
+        self.state = OrganizationUnit.objects.create(name='Kano', category='FAG', level='STATE', state=State.objects.create(name='Kano'))
+        self.leader = User.objects.create_user('leader', is_staff=True)
+        Profile.objects.create(user=self.leader, unit=self.state, position='Chairman', is_active=True)
+        self.members = []
+        for i in range(3):
+            user = User.objects.create_user(f'member{i}', account_number=f'012345678{i}', bank_code='058')
+            Profile.objects.create(user=user, unit=self.state, position='Member', is_active=True)
+            self.members.append(user)
+        self.client.force_login(self.leader)
+
+    def post_payroll(self, amounts, month='March', year=2025):
+        data = {'month': month, 'year': year, 'selected_members': [str(pk) for pk in amounts]}
+        data.update({f'amount_{pk}': amount for pk, amount in amounts.items()})
+        return self.client.post(reverse('process_payroll'), data)
+
+    def accepted(self, member, amount, reference=None, reason=''):
+        return {'status': True, 'data': {'reference': reference}}
+
+    def test_posting_saves_the_template_and_queues_a_run(self):
+        response = self.post_payroll({m.pk: '5000' for m in self.members})
+        self.assertRedirects(response, reverse('payroll_history'), fetch_redirect_response=False)
+
+        run = PayrollRun.objects.get()
+        self.assertEqual((run.status, run.record_count, run.total_amount), ('queued', 3, Decimal('15000')))
+        self.assertEqual(SalaryTemplate.objects.filter(unit=self.state).count(), 3)
+        self.assertEqual(set(run.records.values_list('month', 'year', 'status').distinct()), {('March', 2025, 'pending')})
+
+        # A rerun for the same month pays only the member added since
+        SalaryTemplate.objects.filter(member=self.members[0]).update(amount=Decimal('6000'))
+        newcomer = User.objects.create_user('newcomer')
+        SalaryTemplate.objects.create(unit=self.state, member=newcomer, amount=Decimal('2000'))
+        rerun = create_run(self.state, 'March', 2025, self.leader)
+        self.assertEqual((rerun.record_count, rerun.skipped_count), (1, 3))
+        self.assertEqual(PayrollRecord.objects.filter(month='March', year=2025).count(), 4)
+
+    def test_history_lists_runs_until_they_are_sent(self):
+        response = self.client.get(self.post_payroll({self.members[0].pk: '5000'})['Location'])
+        run = PayrollRun.objects.get()
+        self.assertEqual(list(response.context['open_runs']), [run])
+        self.assertContains(response, 'Payroll runs in progress')
+
+        with mock.patch('accounts.payroll.initiate_paystack_transfer', side_effect=self.accepted):
+            disburse_due()
+        self.assertEqual(list(self.client.get(reverse('payroll_history')).context['open_runs']), [])
+
+    def test_worker_sends_transfers_under_each_records_reference(self):
+        self.members[2].account_number = ''
+        self.members[2].save()
+        self.post_payroll({m.pk: '5000' for m in self.members}, month='April')
+        run = PayrollRun.objects.get()
+
+        with mock.patch('accounts.payroll.initiate_paystack_transfer', side_effect=self.accepted) as send:
+            self.assertEqual(disburse_due(), (2, 1))
+        self.assertEqual(
+            {call.kwargs['reference'] for call in send.call_args_list},
+            set(PayrollRecord.objects.filter(member__in=self.members[:2]).values_list('reference', flat=True)),
+        )
+        run.refresh_from_db()
+        self.assertEqual((run.status, run.sent_count, run.failed_count), ('completed', 2, 1))
+        self.assertEqual(
+            set(Disbursement.objects.values_list('transaction_reference', flat=True)),
+            {call.kwargs['reference'] for call in send.call_args_list},
+        )
+        self.assertEqual(disburse_due(), (0, 0))
+
+    def test_transfer_references_are_lowercase(self):
+        self.post_payroll({self.members[0].pk: '5000'})
+        # Queued before references were generated in lowercase
+        PayrollRecord.objects.update(reference='PAY-01HZ0000000000000000000000')
+        with mock.patch('accounts.payroll.initiate_paystack_transfer', side_effect=self.accepted) as send:
+            self.assertEqual(disburse_due(), (1, 0))
+        reference = 'pay-01hz0000000000000000000000'
+        self.assertEqual(send.call_args.kwargs['reference'], reference)
+        self.assertEqual(PayrollRecord.objects.get().reference, reference)
+        self.assertEqual(Disbursement.objects.get().transaction_reference, reference)
+
+    def test_network_failure_leaves_the_rest_queued(self):
+        self.post_payroll({m.pk: '5000' for m in self.members})
+        with mock.patch('accounts.payroll.initiate_paystack_transfer', side_effect=requests.ConnectionError('down')):
+            self.assertEqual(disburse_due(), (0, 0))
+        self.assertEqual(PayrollRecord.objects.filter(status='pending').count(), 3)
+        self.assertEqual(PayrollRun.objects.get().status, 'processing')
+
+    def test_claimed_records_are_not_sent_by_an_overlapping_worker(self):
+        self.post_payroll({m.pk: '5000' for m in self.members})
+        from .payroll import _claim
+        first = _claim(2)
+        self.assertEqual(len(first), 2)
+        with mock.patch('accounts.payroll.initiate_paystack_transfer', side_effect=self.accepted) as send:
+            self.assertEqual(disburse_due(), (1, 0))
+        self.assertEqual([call.args[0] for call in send.call_args_list], [self.members[2]])
+
+        # A claim abandoned by a dead worker is taken over once it goes stale
+        PayrollRecord.objects.filter(status='sending').update(claimed_at=timezone.now() - timedelta(hours=1))
+        with mock.patch('accounts.payroll.initiate_paystack_transfer', side_effect=self.accepted):
+            self.assertEqual(disburse_due(), (2, 0))
+        self.assertEqual(PayrollRun.objects.get().status, 'completed')
+
+    def test_runs_outlive_the_leader_who_started_them(self):
+        self.post_payroll({m.pk: '5000' for m in self.members})
+        purge_users([self.leader.pk])
+        run = PayrollRun.objects.get()
+        self.assertIsNone(run.created_by)
+        self.assertEqual(run.records.count(), 3)
+        with mock.patch('accounts.payroll.initiate_paystack_transfer') as send:
+            self.assertEqual(disburse_due(), (0, 3))
+        send.assert_not_called()
+
+    def test_transfer_webhooks_settle_run_records(self):
+        from donations.events import process_events, record_event
+
+        self.post_payroll({self.members[0].pk: '5000'})
+        with mock.patch('accounts.payroll.initiate_paystack_transfer', side_effect=self.accepted):
+            disburse_due()
+        record = PayrollRecord.objects.get()
+        self.assertEqual(record.status, 'processing')
+
+        record_event({'event': 'transfer.success', 'data': {'reference': record.reference}})
+        process_events()
+        record.refresh_from_db()
+        self.assertEqual(record.status, 'success')
+        self.assertIsNotNone(record.payment_date)
+        self.assertEqual(Disbursement.objects.get().status, 'SUCCESS')
+
+    def test_schedule_reuses_the_last_runs_leader(self):
+        self.post_payroll({m.pk: '5000' for m in self.members})
+        runs = schedule_runs('April', 2025)
+        self.assertEqual([(r.unit, r.created_by, r.record_count) for r in runs], [(self.state, self.leader, 3)])
+        self.assertEqual(schedule_runs('April', 2025), [])
+
+
+class LedgerTests(TestCase):
+    def setUp(self):
+        self.state = OrganizationUnit.objects.create(name='Kano', category='FAG', level='STATE')
+        self.ward = OrganizationUnit.objects.create(name='Ward 1', category='FAG', level='WARD', parent=self.state)
+        self.leader = User.objects.create_user('leader', is_staff=True)
+        Profile.objects.create(user=self.leader, unit=self.state, position='Chairman', is_active=True)
+        self.member = User.objects.create_user('member', account_number='0123456789', bank_code='058')
+        Profile.objects.create(user=self.member, unit=self.ward, position='Member', is_active=True)
+
+    def balance(self, unit):
+        row = UnitBalance.objects.filter(unit=unit).values_list('total_spent', 'entry_count').first()
+        return row or (0, 0)
+
+    def test_run_payment_is_posted_once_and_reversals_are_appended(self):
+        from donations.events import process_events, record_event
+
+        SalaryTemplate.objects.create(unit=self.state, member=self.member, amount=Decimal('5000'))
+        create_run(self.state, 'March', 2025, self.leader)
+        accepted = {'status': True, 'data': {}}
+        with mock.patch('accounts.payroll.initiate_paystack_transfer', return_value=accepted):
+            disburse_due()
+        reference = PayrollRecord.objects.get().reference
+        self.assertFalse(LedgerEntry.objects.exists())  # not settled yet
+
+        record_event({'event': 'transfer.success', 'data': {'reference': reference}})
+        process_events()
+        entry = LedgerEntry.objects.get()
+        self.assertEqual((entry.kind, entry.reference, entry.unit, entry.member, entry.authorized_by),
+                         ('payroll', reference, self.state, self.member, self.leader))
+        self.assertEqual(self.balance(self.state), (Decimal('5000'), 1))
+
+        record_event({'event': 'transfer.reversed', 'data': {'reference': reference}})
+        process_events()
+        self.assertEqual(sorted(LedgerEntry.objects.values_list('kind', 'amount')),
+                         [('payroll', Decimal('5000')), ('reversal', Decimal('-5000'))])
+        self.assertEqual(self.balance(self.state), (Decimal('0'), 2))
+
+        month = timezone.localdate()
+        self.assertEqual(
+            list(UnitMonthlySpend.objects.values_list('unit', 'year', 'month', 'total', 'entry_count')),
+            [(self.state.pk, month.year, month.month, Decimal('0'), 2)],
+        )
+
+    def test_one_off_payments_are_posted_to_the_paying_unit(self):
+        Disbursement.objects.create(authorized_by=self.leader, recipient=self.member, amount=Decimal('2000'))
+        PayrollRecord.objects.create(member=self.member, amount=Decimal('700'), month='May', year=2025)
+        self.assertEqual(self.balance(self.state), (Decimal('2000'), 1))
+        self.assertEqual(self.balance(self.ward), (0, 0))  # pending
+
+        record = PayrollRecord.objects.get()
+        record.status = 'success'
+        record.save()
+        record.save()
+        self.assertEqual(self.balance(self.ward), (Decimal('700'), 1))
+
+        with self.assertRaises(ValueError):
+            LedgerEntry.objects.first().save()
+
+    def test_rebuild_backfills_and_matches_the_running_totals(self):
+        Disbursement.objects.create(authorized_by=self.leader, recipient=self.member, amount=Decimal('2000'))
+        expected = list(UnitBalance.objects.values_list('unit', 'total_spent', 'entry_count'))
+        # Rows written before the ledger existed
+        PayrollRecord.objects.bulk_create([
+            PayrollRecord(member=self.member, amount=Decimal('300'), month='June', year=2024, status='success'),
+        ])
+        Disbursement.objects.bulk_create([
+            Disbursement(authorized_by=self.leader, recipient=self.member, amount=Decimal('100'), status='PROCESSING'),
+        ])
+        UnitBalance.objects.all().delete()
+
+        out = StringIO()
+        call_command('rebuild_ledger', stdout=out)
+        self.assertIn('Posted 1 ledger entry', out.getvalue())
+        self.assertEqual(
+            sorted(UnitBalance.objects.values_list('unit', 'total_spent', 'entry_count')),
+            sorted(expected + [(self.ward.pk, Decimal('300'), 1)]),
+        )
+        call_command('rebuild_ledger', stdout=StringIO())
+        self.assertEqual(LedgerEntry.objects.count(), 2)
+
+    def test_migration_posts_payroll_from_before_the_ledger(self):
+        # Saved without signals, as the pre-ledger views did
+        PayrollRecord.objects.bulk_create([
+            PayrollRecord(member=self.leader, amount=Decimal('300'), month='June', year=2024, status='success'),
+        ])
+        # The unit's first ledger entry must not hide the older payroll
+        Disbursement.objects.create(
+            authorized_by=self.leader, recipient=self.member, amount=Decimal('50'),
+            status='SUCCESS', transaction_reference='TRF-1',
+        )
+        self.assertEqual(ledger.unit_spent(self.state), Decimal('50'))
+
+        migration = import_module('accounts.migrations.0031_backfill_ledger')
+        migration.post_existing_payments(apps, None)
+        self.assertEqual(ledger.unit_spent(self.state), Decimal('350'))
+        self.assertEqual(ledger.unit_spent(self.ward), Decimal('0'))
+
+    def test_a_reversed_reference_is_not_posted_again(self):
+        disbursement = Disbursement.objects.create(
+            authorized_by=self.leader, recipient=self.member, amount=Decimal('2000'), transaction_reference='TRF-1',
+        )
+        for status in ('REVERSED', 'SUCCESS'):
+            disbursement.status = status
+            disbursement.save()
+        self.assertEqual(sorted(LedgerEntry.objects.values_list('reference', flat=True)), ['TRF-1', 'TRF-1:reversal'])
+        self.assertEqual(self.balance(self.state), (Decimal('0'), 2))
+
+    def test_history_pages_by_id(self):
+        LedgerEntry.objects.bulk_create([
+            LedgerEntry(unit=self.state, member=self.member, authorized_by=self.leader, kind='disbursement',
+                        amount=Decimal('10'), reference=f'DSB-{i}')
+            for i in range(60)
+        ])
+        self.client.force_login(self.leader)
+        first = self.client.get(reverse('payroll_history'))
+        self.assertEqual(len(first.context['history']), 50)
+        self.assertEqual(first.context['history'][0].reference, 'DSB-59')
+
+        second = self.client.get(reverse('payroll_history'), {'before': first.context['next_before']})
+        self.assertEqual([e.reference for e in second.context['history']], [f'DSB-{i}' for i in range(9, -1, -1)])
+        self.assertIsNone(second.context['next_before'])
@@ -9,6 +9,7 @@ urlpatterns = [
     path('', views.landing_page, name='landing'),
     path('dashboard/', views.dashboard, name='dashboard'),
     path('approve-member/<int:profile_id>/', views.approve_member, name='approve_member'),
+    path('approve-members/', views.bulk_approve_members, name='bulk_approve_members'),
     path('login/', CustomLoginView.as_view(), name='login'),
     path('logout/', auth_views.LogoutView.as_view(), name='logout'),
     path('register/', views.register, name='register'),
@@ -31,7 +32,9 @@ urlpatterns = [
     path('members/bulk-message/', views.bulk_message_send, name='bulk_message_send'),
     path('members/list/', views.members_list, name='members_list'),
     path('members/toggle/<int:member_id>/', views.toggle_member_status, name='toggle_member_status'),
+    path('members/status/', views.bulk_member_status, name='bulk_member_status'),
     path('members/delete-permanent/<int:user_id>/', views.delete_member_permanent, name='delete_member_permanent'),
+    path('members/delete-permanent/', views.bulk_delete_members, name='bulk_delete_members'),
     path('dashboard/payroll/history/', views.payroll_history, name='payroll_history'),
     path('verify-account-ajax/', views.verify_account_ajax, name='verify_account_ajax'),
     path('video/<int:video_id>/', views.video_detail, name='video_detail'),
@@ -42,6 +45,7 @@ urlpatterns = [
     path('message/reply/<int:message_id>/', views.leader_reply, name='leader_reply'),
     path('ajax/load-lgas/', views.load_lgas, name='ajax_load_lgas'),
     path('ajax/load-wards/', views.load_wards, name='ajax_load_wards'),
+    path('ajax/geography/', views.geography_data, name='ajax_geography'),
     path('favicon.ico', RedirectView.as_view(url='/static/images/favicon.ico')),
 
     path('password-reset/',
@@ -1,19 +1,14 @@
-import requests
-from django.conf import settings
+from donations.gateways import get_gateway
 
 def verify_bank_account(account_number, bank_code):
     """
     Verifies a Nigerian bank account using Paystack API.
     Returns the account name if successful, else None.
     """
-    # Replace 'YOUR_PAYSTACK_SECRET_KEY' with your actual key in settings.py
-    url = f"https://api.paystack.co/bank/resolve?account_number={account_number}&bank_code={bank_code}"
-    headers = {
-        "Authorization": f"Bearer {settings.PAYSTACK_SECRET_KEY}",
-    }
+    params = {'account_number': account_number, 'bank_code': bank_code}
 
     try:
-        response = requests.get(url, headers=headers, timeout=10)
+        response = get_gateway('paystack').get('/bank/resolve', params=params)
         data = response.json()
         
         if data.get('status') is True:
@@ -22,4 +17,45 @@ def verify_bank_account(account_number, bank_code):
     except Exception as e:
         print(f"Error verifying bank account: {e}")
     
-    return None
\ No newline at end of file
+    return None
+
+
+def initiate_paystack_transfer(recipient_user, amount, reference=None, reason="JIBWIS Unit Payroll"):
+    """
+    Sends `amount` naira to the user's bank account. Passing our own
+    `reference` makes the call safe to repeat: Paystack rejects a second
+    transfer with the same reference instead of paying twice.
+    """
+    # Paystack uses Kobo (100 Kobo = 1 Naira)
+    amount_in_kobo = int(float(amount) * 100)
+
+    paystack = get_gateway('paystack')
+
+    # Step 1: Create Transfer Recipient
+    recipient_data = {
+        "type": "nuban",
+        "name": recipient_user.get_full_name(),
+        "account_number": recipient_user.account_number,
+        "bank_code": recipient_user.bank_code, # e.g., '058' for GTB
+        "currency": "NGN"
+    }
+
+    rcp_res = paystack.post('/transferrecipient', json=recipient_data)
+
+    if rcp_res.status_code == 201:
+        recipient_code = rcp_res.json()['data']['recipient_code']
+
+        # Step 2: Initiate Transfer
+        transfer_data = {
+            "source": "balance",
+            "amount": amount_in_kobo,
+            "recipient": recipient_code,
+            "reason": reason,
+        }
+        if reference:
+            transfer_data["reference"] = reference
+
+        trn_res = paystack.post('/transfer', json=transfer_data)
+        return trn_res.json()
+
+    return None
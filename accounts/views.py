@@ -2,10 +2,10 @@ import openpyxl
 from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib.auth.decorators import login_required
 from django.contrib import messages
-from django.http import HttpResponse, JsonResponse
+from django.http import Http404, HttpResponse, JsonResponse
 from django.utils.translation import gettext as _
 import csv
-import requests
+from decimal import Decimal, InvalidOperation
 from axes.utils import reset
 from django.contrib.auth.views import LoginView
 from django.contrib.auth.views import PasswordResetView
@@ -14,19 +14,33 @@ from django.contrib.auth.views import PasswordResetConfirmView
 from django.conf import settings
 from django.db import transaction
 from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+from django.utils.cache import get_conditional_response, patch_cache_control, patch_vary_headers
+from django.views.decorators.http import require_POST
 from django.db import models
-from django.db.models import Sum, Count, Q
+from django.db.models import Count, F, OuterRef, Q, Subquery
 from django.urls import reverse_lazy
 from django.contrib.auth import get_user_model
+from donations.gateways import get_gateway
 from .forms import UserUpdateForm, ProfileUpdateForm
 from .utils import verify_bank_account
+from .cache import cache_anonymous_page, get_versions, CSRF_PLACEHOLDER
+from .announcements import cache_timeout as announcement_cache_timeout, unit_feed
+from .approvers import (
+    PENDING_QUEUE_LIMIT, approve_profiles, can_approve, can_manage_status, pending_approvals, set_member_status,
+)
+from .deletion import deletable_members, purge_users
+from .geography import get_bundle as get_geography_bundle
+from .constants import MONTHS
+from .ledger import unit_spent
+from .payroll import OPEN_RUN_STATUSES, create_run, save_template
 
 User = get_user_model()
 
 from .models import (
     User, Profile, Message, OrganizationUnit,
-    VideoPost, PayrollRecord, Announcement, GalleryImage, DisciplinaryReport,
-    Disbursement, LGA, Ward, State
+    VideoPost, Announcement, GalleryImage, DisciplinaryReport,
+    LGA, Ward, State, PayrollRun, SalaryTemplate, LedgerEntry
 )
 
 from .forms import (
@@ -35,17 +49,41 @@ from .forms import (
 
 # --- 1. PUBLIC VIEWS ---
 
+@cache_anonymous_page('announcements', 'videos', 'gallery', timeout=announcement_cache_timeout)
 def landing_page(request):
     """The public home page with news, scrolling announcements, and video feed."""
-    announcements = Announcement.objects.filter(is_active=True).order_by('-created_at')
-    videos = VideoPost.objects.all().order_by('-created_at')[:4]
+    # Querysets stay lazy: each one only runs when its template fragment
+    # misses the cache (see the {% cache %} blocks in landing.html).
+    announcements = Announcement.objects.live().order_by('-created_at')[:settings.ANNOUNCEMENT_FEED_LIMIT]
+    videos = VideoPost.objects.order_by('-created_at')[:4]
     gallery = GalleryImage.objects.all()[:6]
 
-    return render(request, 'landing.html', {
+    # Like counts change on every like, so they are kept out of the video
+    # fragment (a like does not bump its version) and filled in by script
+    like_counts = dict(
+        VideoPost.objects.order_by('-created_at').annotate(like_count=Count('likes')).values_list('id', 'like_count')[:4]
+    )
+
+    # Like state is per visitor, so it is kept out of the shared fragments
+    if request.user.is_authenticated:
+        liked_video_ids = list(request.user.video_likes.values_list('id', flat=True))
+    else:
+        liked_video_ids = request.session.get('guest_liked_videos', [])
+
+    context = {
         'announcements': announcements,
         'videos': videos,
-        'gallery': gallery
-    })
+        'gallery': gallery,
+        'liked_video_ids': liked_video_ids,
+        'like_counts': like_counts,
+        'fragment_versions': get_versions('announcements', 'videos', 'gallery'),
+        'fragment_timeout': settings.PAGE_CACHE_TIMEOUT,
+        # Expired announcements must drop off on time
+        'announcements_timeout': announcement_cache_timeout(),
+    }
+    if getattr(request, 'shared_page_cache', False):
+        context['csrf_token'] = CSRF_PLACEHOLDER
+    return render(request, 'landing.html', context)
 
 @transaction.atomic
 def register(request):
@@ -273,14 +311,25 @@ def dashboard(request):
     if request.method == 'POST' and user.is_staff:
         if 'add_announcement' in request.POST:
             content = request.POST.get('content')
+            raw_expiry = request.POST.get('expires_at', '').strip()
+            try:
+                expires_at = parse_datetime(raw_expiry) if raw_expiry else None
+            except ValueError:  # well-formed but impossible, e.g. 2026-02-30
+                expires_at = None
+            if raw_expiry and expires_at is None:
+                messages.error(request, "Invalid expiry date; the announcement was not posted.")
+                return redirect('dashboard')
+            if expires_at and timezone.is_naive(expires_at):
+                expires_at = timezone.make_aware(expires_at)
             if content:
                 # Use the new unit isolation
-                Announcement.objects.create(content=content, unit=user_profile.unit)
+                Announcement.objects.create(content=content, unit=user_profile.unit, expires_at=expires_at)
             return redirect('dashboard')
 
     # 3. Initialize Variables
     members = []
     pending = []
+    pending_total = 0
     unit_leaders = []
     total_spent = 0
 
@@ -289,32 +338,32 @@ def dashboard(request):
     if user.is_staff:
         # Members in the same unit
         members = Profile.objects.filter(unit=user_profile.unit, is_active=True).exclude(user=user)
-        # Pending members awaiting THIS leader's approval
-        pending = Profile.objects.filter(unit=user_profile.unit, is_active=False)
-        # Financial sum for this specific unit
-        total_spent = PayrollRecord.objects.filter(
-            member__profiles__unit=user_profile.unit,
-            status='success'
-        ).aggregate(Sum('amount'))['amount__sum'] or 0
+        # Pending members awaiting THIS leader's approval, across every unit
+        # in their jurisdiction (UnitApprover routing table)
+        pending_queue = pending_approvals(user)
+        pending = pending_queue[:PENDING_QUEUE_LIMIT]
+        pending_total = pending_queue.count()
+        # Financial sum for this specific unit: its running ledger balance
+        total_spent = unit_spent(user_profile.unit)
     else:
         # Regular members see who their leaders are
         unit_leaders = Profile.objects.filter(unit=user_profile.unit, user__is_staff=True)
 
-    # 5. Announcements (Unit-specific + National)
-    # Filter by user_profile.unit OR global announcements (where unit is NULL)
-    announcements = Announcement.objects.filter(
-        models.Q(unit=user_profile.unit) | models.Q(unit__isnull=True),
-        is_active=True
-    ).order_by('-created_at')
+    # 5. Announcements (National + own unit + State/LG offices above it)
+    # Precomputed, capped and cached per unit (see accounts/announcements.py)
+    announcements = unit_feed(user_profile.unit)
 
     context = {
         'leader_profile': user_profile,
         'members': members,
         'pending': pending,
+        'pending_total': pending_total,
         'unit_leaders': unit_leaders,
         'total_spent': total_spent,
         'announcements': announcements,
-        'messages_received': Message.objects.filter(recipient=user, recipient_deleted=False).order_by('-timestamp'),
+        'messages_received': Message.objects.filter(
+            recipient=user, recipient_deleted=False
+        ).select_related('sender').order_by('-timestamp'),
         'trending_videos': trending_videos,
     }
 
@@ -362,7 +411,7 @@ def members_list(request):
             Q(first_name__icontains=query) |
             Q(last_name__icontains=query) |
             Q(username__icontains=query) |
-            Q(profile__phone_number__icontains=query) # Assuming phone is in Profile
+            Q(phone_number__icontains=query)
         )
 
     # 5. Apply Category Filter (First Aid, Ulama, etc.)
@@ -412,53 +461,51 @@ def approve_member(request, profile_id):
 
     # 4. HIERARCHY JURISDICTION CHECK
     leader_lvl = leader_profile.unit.level
-    can_approve = False
 
     # Check for unit existence to avoid AttributeErrors
     if not member_unit:
         messages.error(request, "This member has not been assigned to a unit yet.")
         return redirect('members_list')
 
-    if leader_lvl == 'NATIONAL':
-        can_approve = True
-    elif leader_lvl == 'STATE':
-        if member_unit.state == leader_profile.unit.state:
-            can_approve = True
-    elif leader_lvl == 'LG':
-        if member_unit.lga == leader_profile.unit.lga:
-            can_approve = True
-    # --- ADDED WARD LEVEL LOGIC ---
-    elif leader_lvl == 'WARD':
-        # Ward Chairmen can only approve members in their exact same Ward
-        if member_unit == leader_profile.unit:
-            can_approve = True
-
-    if not can_approve:
+    # National approves anyone, State/LG within their area, Ward its own branch
+    # (precomputed in the UnitApprover table, see accounts/approvers.py)
+    if not can_approve(request.user, member_unit):
         messages.error(request, f"Jurisdiction Error: As a {leader_lvl} leader, you cannot manage this member.")
         return redirect('members_list')
 
-    # 5. Process Approval
+    # 5. Process Approval (activates Profile + User and sends the activation memo)
     if request.method == 'POST':
-        member_profile.is_active = True
-        member_user.is_active = True
+        approve_profiles(request.user, [member_profile.pk], check_jurisdiction=False)
+        messages.success(request, f"Member {member_user.get_full_name() or member_user.username} has been approved.")
 
-        member_profile.save()
-        member_user.save()
+    return redirect('members_list')
 
-        # Send an official JIBWIS notification
-        try:
-            Message.objects.create(
-                sender=request.user,
-                recipient=member_user,
-                subject="Account Activated",
-                body=f"Assalamu Alaikum. Your registration has been approved by the {leader_lvl} office of {leader_profile.unit.name}."
-            )
-        except Exception:
-            pass
+@login_required
+@require_POST
+def bulk_approve_members(request):
+    """Approves every selected pending profile the leader has jurisdiction over."""
+    if not request.user.is_staff:
+        messages.error(request, "Access denied. Only leaders can approve members.")
+        return redirect('dashboard')
 
-        messages.success(request, f"Member {member_user.get_full_name() or member_user.username} has been approved.")
+    if request.POST.get('scope') == 'all':
+        # The whole queue, not just the page shown on the dashboard
+        profile_ids = pending_approvals(request.user).values('pk')
+        approved = approve_profiles(request.user, profile_ids)
+        messages.success(request, f"Approved {approved} member(s).")
+        return redirect('dashboard')
 
-    return redirect('members_list')
+    profile_ids = {pk for pk in request.POST.getlist('profile_ids') if pk.isdigit()}
+    if not profile_ids:
+        messages.warning(request, "No members were selected.")
+        return redirect('dashboard')
+
+    approved = approve_profiles(request.user, profile_ids)
+    skipped = len(profile_ids) - approved
+    messages.success(request, f"Approved {approved} member(s).")
+    if skipped:
+        messages.warning(request, f"{skipped} selected member(s) were already active or outside your jurisdiction.")
+    return redirect('dashboard')
 
 # --- 3. PAYROLL & DATA ---
 
@@ -491,7 +538,7 @@ def export_members_excel(request):
 
     # 5. Populate Data
     for m in members.distinct():
-        p = m.profiles.first()
+        p = m.primary_profile
         ws.append([
             m.username,
             m.get_full_name(),
@@ -507,18 +554,34 @@ def export_members_excel(request):
 
     return response
 
+PAYROLL_HISTORY_PAGE_SIZE = 50
+
 @login_required
 def payroll_history(request):
     leader_profile = request.user.profiles.first()
 
-    # Base Query: Get all disbursements made by this leader or within their scope
-    # This assumes you have a 'Disbursement' model or similar to track payments
-    history = Disbursement.objects.filter(
-        authorized_by=request.user
-    ).order_by('-timestamp')
+    # Ledger entries this leader authorised, newest first. Paged by id
+    # (?before=<id>) so older pages are an index range read, not an OFFSET.
+    history = LedgerEntry.objects.filter(authorized_by=request.user).select_related('member', 'unit')
+    before = request.GET.get('before')
+    if before and before.isdigit():
+        history = history.filter(id__lt=int(before))
+    history = list(history.order_by('-id')[:PAYROLL_HISTORY_PAGE_SIZE + 1])
+    has_more = len(history) > PAYROLL_HISTORY_PAGE_SIZE
+    history = history[:PAYROLL_HISTORY_PAGE_SIZE]
+
+    # Runs still being sent have no entries until their transfers settle;
+    # list them on the first page so a payroll just queued shows up at once
+    open_runs = []
+    if not before:
+        open_runs = PayrollRun.objects.filter(
+            created_by=request.user, status__in=OPEN_RUN_STATUSES,
+        ).select_related('unit')
 
     context = {
         'history': history,
+        'next_before': history[-1].id if has_more else None,
+        'open_runs': open_runs,
         'leader_profile': leader_profile,
     }
     return render(request, 'payroll_history.html', context)
@@ -611,20 +674,13 @@ def delete_account(request):
 def verify_payment(request):
     return JsonResponse({'status': 'pending'})
 
-@login_required
-def bulk_payroll_page(request):
-    leader_profile = request.user.profiles.first()
-    if not leader_profile or not leader_profile.unit:
-        messages.error(request, "Access Denied.")
-        return redirect('dashboard')
-
-    leader_unit = leader_profile.unit
+def payroll_personnel(user, leader_unit):
+    """Everyone `user` may pay: their unit's category, narrowed to their State, LGA or ward."""
     category = leader_unit.category
     level = leader_unit.level  # Assumes your model has 'level'
-    query = request.GET.get('q', '')
 
     # Base Query: Start with everyone in the same category
-    personnel = User.objects.filter(profiles__unit__category=category).distinct().exclude(id=request.user.id)
+    personnel = User.objects.filter(profiles__unit__category=category).distinct().exclude(id=user.id)
 
     # Apply Level Restrictions
     if level == 'STATE':
@@ -637,6 +693,24 @@ def bulk_payroll_page(request):
         # Ward leaders only see personnel in their specific ward
         personnel = personnel.filter(profiles__unit=leader_unit)
     # If level is 'NATIONAL', no extra filter is applied (they see everyone)
+    return personnel
+
+@login_required
+def bulk_payroll_page(request):
+    leader_profile = request.user.profiles.first()
+    if not leader_profile or not leader_profile.unit:
+        messages.error(request, "Access Denied.")
+        return redirect('dashboard')
+
+    leader_unit = leader_profile.unit
+    category = leader_unit.category
+    query = request.GET.get('q', '')
+    personnel = payroll_personnel(request.user, leader_unit)
+
+    # Amounts default to the unit's salary template (see accounts/payroll.py)
+    personnel = personnel.annotate(salary=Subquery(
+        SalaryTemplate.objects.filter(unit=leader_unit, member=OuterRef('pk')).values('amount')[:1]
+    ))
 
     # Apply Search Filter
     if query:
@@ -647,77 +721,62 @@ def bulk_payroll_page(request):
         )
 
     context = {
-        'members': personnel.order_by('profiles__unit__level', 'profiles__unit__name'),
+        'members': personnel.prefetch_related('profiles__unit').order_by('profiles__unit__level', 'profiles__unit__name'),
         'leader_profile': leader_profile,
         'category_name': category,
         'paystack_balance': get_paystack_balance(),
         'search_query': query,
+        'months': MONTHS,
+        'current_month': MONTHS[timezone.localdate().month - 1],
+        'current_year': timezone.localdate().year,
+        'recent_runs': PayrollRun.objects.filter(unit=leader_unit)[:5],
     }
     return render(request, 'bulk_payroll.html', context)
 
 
-def initiate_paystack_transfer(recipient_user, amount):
-    # Paystack uses Kobo (100 Kobo = 1 Naira)
-    amount_in_kobo = int(float(amount) * 100)
-
-    headers = {
-        "Authorization": f"Bearer {settings.PAYSTACK_SECRET_KEY}",
-        "Content-Type": "application/json",
-    }
-
-    # Step 1: Create Transfer Recipient
-    recipient_data = {
-        "type": "nuban",
-        "name": recipient_user.get_full_name(),
-        "account_number": recipient_user.account_number,
-        "bank_code": recipient_user.bank_code, # e.g., '058' for GTB
-        "currency": "NGN"
-    }
-
-    rcp_res = requests.post("https://api.paystack.co/transferrecipient", json=recipient_data, headers=headers)
-
-    if rcp_res.status_code == 201:
-        recipient_code = rcp_res.json()['data']['recipient_code']
-
-        # Step 2: Initiate Transfer
-        transfer_data = {
-            "source": "balance",
-            "amount": amount_in_kobo,
-            "recipient": recipient_code,
-            "reason": "JIBWIS Unit Payroll"
-        }
-
-        trn_res = requests.post("https://api.paystack.co/transfer", json=transfer_data, headers=headers)
-        return trn_res.json()
-
-    return None
-
 @login_required
+@require_POST
 def process_payroll(request):
-    if request.method == 'POST':
-        selected_ids = request.POST.getlist('selected_members')
-        processed_count = 0
-
-        for p_id in selected_ids:
-            amount = request.POST.get(f'amount_{p_id}')
-            recipient = User.objects.get(id=p_id)
-
-            # CALL PAYSTACK
-            response = initiate_paystack_transfer(recipient, amount)
-
-            if response and response.get('status'):
-                # Save to Ledger only if Paystack accepted it
-                Disbursement.objects.create(
-                    authorized_by=request.user,
-                    recipient=recipient,
-                    amount=amount,
-                    status='PROCESSING', # Paystack transfers are often queued
-                    transaction_reference=response['data'].get('reference')
-                )
-                processed_count += 1
+    """
+    Saves the posted amounts as the unit's salary template and queues this
+    month's PayrollRun for them; `manage.py disburse_payroll` sends the
+    transfers. Members already paid for the month are skipped.
+    """
+    leader_profile = request.user.primary_profile
+    if not leader_profile or not leader_profile.unit:
+        messages.error(request, "Access Denied.")
+        return redirect('dashboard')
+    leader_unit = leader_profile.unit
 
-        messages.success(request, f"Successfully initiated {processed_count} real-time transfers.")
-        return redirect('payroll_history')
+    month = request.POST.get('month') or MONTHS[timezone.localdate().month - 1]
+    try:
+        year = int(request.POST.get('year') or timezone.localdate().year)
+    except ValueError:
+        year = None
+    if month not in MONTHS or year is None:
+        messages.error(request, "Choose a valid payroll month.")
+        return redirect('bulk_payroll')
+
+    amounts = {}
+    for p_id in request.POST.getlist('selected_members'):
+        try:
+            amount = Decimal(request.POST.get(f'amount_{p_id}') or '')
+            amounts[int(p_id)] = amount
+        except (InvalidOperation, ValueError):
+            continue
+    allowed = set(payroll_personnel(request.user, leader_unit).filter(pk__in=amounts).values_list('pk', flat=True))
+    amounts = {member_id: amount for member_id, amount in amounts.items() if member_id in allowed and amount > 0}
+    if not amounts:
+        messages.warning(request, "Select at least one member with an amount.")
+        return redirect('bulk_payroll')
+
+    save_template(leader_unit, amounts)
+    run = create_run(leader_unit, month, year, request.user, member_ids=list(amounts))
+
+    messages.success(request, f"Payroll for {month} {year} queued: {run.record_count} transfer(s), ₦{run.total_amount:,.2f}.")
+    if run.skipped_count:
+        messages.info(request, f"{run.skipped_count} member(s) were already paid for {month} {year} and were skipped.")
+    return redirect('payroll_history')
 
 @login_required
 def export_payroll_csv(request):
@@ -727,17 +786,17 @@ def export_payroll_csv(request):
 
     writer = csv.writer(response)
     # Write the header row
-    writer.writerow([_('Member'), _('Amount'), _('Reference'), _('Status'), _('Date')])
+    writer.writerow([_('Member'), _('Amount'), _('Reference'), _('Type'), _('Date')])
 
-    # Pull records from your PayrollRecord model
-    records = PayrollRecord.objects.all().select_related('member')
-    for record in records:
+    # Every settled payment and reversal, from the spending ledger
+    entries = LedgerEntry.objects.select_related('member').order_by('id')
+    for entry in entries.iterator(chunk_size=2000):
         writer.writerow([
-            record.member.get_full_name(),
-            record.amount,
-            record.reference,
-            record.status,
-            record.payment_date.strftime("%Y-%m-%d %H:%M")
+            entry.member.get_full_name() if entry.member else '',
+            entry.amount,
+            entry.reference,
+            entry.get_kind_display(),
+            timezone.localtime(entry.created_at).strftime("%Y-%m-%d %H:%M"),
         ])
 
     return response
@@ -843,11 +902,13 @@ def submit_report(request):
 def disciplinary_admin(request):
     # Security Check: Only National level staff can see this
     profile = request.user.profiles.first()
-    if not request.user.is_staff or profile.unit.level != 'NAT':
+    if not request.user.is_staff or not profile or profile.unit.level != 'NATIONAL':
         messages.error(request, "Access Denied: High-level Clearance Required.")
         return redirect('dashboard')
 
-    reports = DisciplinaryReport.objects.all().order_by('-created_at')
+    reports = DisciplinaryReport.objects.select_related('reporter', 'subject_leader').prefetch_related(
+        'reporter__profiles__unit', 'subject_leader__profiles'
+    ).order_by('-created_at')
 
     return render(request, 'disciplinary_list.html', {'reports': reports})
 
@@ -916,7 +977,7 @@ def bulk_message_send(request):
             # Broadcast logic
             matching_profiles = Profile.objects.filter(
                 unit=base_profile.unit,
-                category=category,
+                unit__category=category,
                 is_active=True
             ).select_related('user')
             recipients = [p.user for p in matching_profiles]
@@ -949,74 +1010,61 @@ def bulk_message_send(request):
 
 
 @login_required
+@require_POST
 def toggle_member_status(request, member_id):
     if not request.user.is_staff:
         messages.error(request, "Access denied.")
         return redirect('dashboard')
 
-    # 1. Identify the Leader and their Unit
-    leader_profile = getattr(request.user, 'profile', None) or getattr(request.user, 'profiles', None)
-    if hasattr(leader_profile, 'first'):
-        leader_profile = leader_profile.first()
-
-    if not leader_profile or not leader_profile.unit:
-        messages.error(request, "You must be assigned to a unit to manage members.")
-        return redirect('dashboard')
-
-    # 2. Fetch the target member's profile
-    target_profile = get_object_or_404(Profile, user_id=member_id)
-    target_unit = target_profile.unit
-
-    if not target_unit:
+    target_profile = Profile.objects.filter(user_id=member_id).select_related('user', 'unit').order_by('pk').first()
+    if target_profile is None:
+        raise Http404("Member not found")
+    if not target_profile.unit:
         messages.error(request, "This member is not assigned to any unit.")
         return redirect('members_list')
 
-    # 3. --- HIERARCHY JURISDICTION CHECK ---
-    leader_lvl = leader_profile.unit.level    # e.g., 'NATIONAL', 'STATE', 'LG', 'WARD'
-    member_lvl = target_unit.level
-    can_manage = False
-
-    # National can manage all
-    if leader_lvl == 'NATIONAL':
-        can_manage = True
-
-    # State can manage their own State members and LGs in that State
-    elif leader_lvl == 'STATE':
-        if target_unit.state == leader_profile.unit.state:
-            if member_lvl in ['STATE', 'LG']:
-                can_manage = True
-
-    # LG can manage their own LG members and Wards in that LGA
-    elif leader_lvl == 'LG':
-        if target_unit.lga == leader_profile.unit.lga:
-            if member_lvl in ['LG', 'WARD']:
-                can_manage = True
-
-    # --- ADDED WARD LEVEL LOGIC ---
-    # A Ward Chairman can manage anyone in their specific Ward unit
-    elif leader_lvl == 'WARD':
-        if target_unit == leader_profile.unit:
-            can_manage = True
-
-    if not can_manage:
-        messages.error(request, f"Jurisdiction Error: As a {leader_lvl} leader, you cannot manage this member.")
+    # Jurisdiction comes from the approver routing table (see status_approvers)
+    if not can_manage_status(request.user, target_profile.unit):
+        messages.error(request, "Jurisdiction Error: You cannot manage members of this unit.")
         return redirect('members_list')
 
-    # 4. --- EXECUTE TOGGLE ---
-    reason = request.GET.get('reason', 'No reason provided')
+    reason = request.POST.get('reason', '').strip() or 'No reason provided'
     new_status = not target_profile.is_active
+    set_member_status(request.user, new_status, reason, user_ids=[member_id])
+
+    status_msg = "Activated" if new_status else f"Suspended ({reason})"
+    messages.success(request, f"Successfully updated {target_profile.user.username} to {status_msg}")
+    return redirect('members_list')
 
-    target_profile.is_active = new_status
-    target_user = target_profile.user
-    target_user.is_active = new_status
+@login_required
+@require_POST
+def bulk_member_status(request):
+    """Suspends or reactivates the selected members, or every member of one unit."""
+    if not request.user.is_staff:
+        messages.error(request, "Access denied.")
+        return redirect('dashboard')
 
-    target_profile.save()
-    target_user.save()
+    action = request.POST.get('status_action')
+    if action not in ('suspend', 'reactivate'):
+        messages.error(request, "Unknown action.")
+        return redirect('members_list')
+    reason = request.POST.get('reason', '').strip() or 'No reason provided'
 
-    # Log the action for transparency
-    status_msg = "Activated" if new_status else f"Suspended ({reason})"
-    messages.success(request, f"Successfully updated {target_user.username} to {status_msg}")
+    unit = None
+    user_ids = None
+    if request.POST.get('unit_id', '').isdigit():
+        unit = get_object_or_404(OrganizationUnit, pk=request.POST['unit_id'])
+    else:
+        user_ids = {pk for pk in request.POST.getlist('selected_members') if pk.isdigit()}
+        if not user_ids:
+            messages.warning(request, "No members were selected.")
+            return redirect('members_list')
 
+    changed = set_member_status(request.user, action == 'reactivate', reason, user_ids=user_ids, unit=unit)
+    verb = "Reactivated" if action == 'reactivate' else "Suspended"
+    messages.success(request, f"{verb} {changed} member(s).")
+    if user_ids is not None and changed < len(user_ids):
+        messages.warning(request, f"{len(user_ids) - changed} selected member(s) were unchanged or outside your jurisdiction.")
     return redirect('members_list')
 
 @login_required
@@ -1029,37 +1077,35 @@ def delete_member_permanent(request, user_id): # Name must match urls.py
         messages.error(request, "Unauthorized. Only leaders can delete accounts.")
         return redirect('dashboard')
 
-    # 2. Identify the Leader and the Target
-    leader_profile = getattr(request.user, 'profile', None) or getattr(request.user, 'profiles', None)
-    if hasattr(leader_profile, 'first'): leader_profile = leader_profile.first()
-
+    # 2. Hierarchy Protection (see accounts/deletion.py)
     target_user = get_object_or_404(User, id=user_id)
-    target_profile = getattr(target_user, 'profile', None) or getattr(target_user, 'profiles', None)
-    if hasattr(target_profile, 'first'): target_profile = target_profile.first()
+    if not deletable_members(request.user).filter(pk=target_user.pk).exists():
+        messages.error(request, "Jurisdiction Error: You do not have the rank to delete this account.")
+        return redirect('members_list')
 
-    # 3. Hierarchy Protection Logic
-    can_delete = False
-    leader_lvl = leader_profile.unit.level
+    # 3. Chunked removal of the account and everything that cascades from it
+    purge_users([target_user.pk])
+    messages.success(request, f"Leader account {target_user.username} has been permanently removed.")
+    return redirect('members_list')
 
-    # National can delete anyone except other National Chairmen
-    if leader_lvl == 'NATIONAL':
-        if not (target_profile and target_profile.unit.level == 'NATIONAL' and 'chairman' in target_profile.position.lower()):
-            can_delete = True
-
-    # State can only delete LG/Ward within their state
-    elif leader_lvl == 'STATE':
-        if target_profile and target_profile.unit.state == leader_profile.unit.state:
-            if target_profile.unit.level in ['LG', 'WARD']:
-                can_delete = True
-
-    # 4. Final Execution
-    if can_delete or request.user.is_superuser:
-        username = target_user.username
-        target_user.delete() # This removes Profile and User due to CASCADE
-        messages.success(request, f"Leader account {username} has been permanently removed.")
-    else:
-        messages.error(request, "Jurisdiction Error: You do not have the rank to delete this account.")
+@login_required
+@require_POST
+def bulk_delete_members(request):
+    """Permanently deletes the selected members the leader has the rank to remove."""
+    if not request.user.is_staff:
+        messages.error(request, "Unauthorized. Only leaders can delete accounts.")
+        return redirect('dashboard')
+
+    user_ids = {pk for pk in request.POST.getlist('selected_members') if pk.isdigit()}
+    if not user_ids:
+        messages.warning(request, "No members were selected.")
+        return redirect('members_list')
 
+    allowed = list(deletable_members(request.user).filter(pk__in=user_ids).values_list('pk', flat=True))
+    purge_users(allowed)
+    messages.success(request, f"Permanently removed {len(allowed)} account(s).")
+    if len(allowed) < len(user_ids):
+        messages.warning(request, f"{len(user_ids) - len(allowed)} selected account(s) are outside your authority and were kept.")
     return redirect('members_list')
 
 @login_required
@@ -1089,11 +1135,8 @@ def verify_account_ajax(request):
 
 def get_paystack_balance():
     """Fetches the current account balance from Paystack."""
-    headers = {
-        "Authorization": f"Bearer {settings.PAYSTACK_SECRET_KEY}",
-    }
     try:
-        response = requests.get("https://api.paystack.co/balance", headers=headers)
+        response = get_gateway('paystack').get('/balance')
         data = response.json()
         if data.get('status'):
             # The balance is an array of currencies; we find NGN
@@ -1149,9 +1192,10 @@ def toggle_video_like(request, video_id):
 
 def video_detail(request, video_id):
     video = get_object_or_404(VideoPost, id=video_id)
-    # Increment view count
+    # Increment view count in SQL: no save(), so no post_save and the
+    # landing page caches keyed on the `videos` version survive
+    VideoPost.objects.filter(pk=video.pk).update(views_count=F('views_count') + 1)
     video.views_count += 1
-    video.save()
     return render(request, 'video_detail.html', {'video': video})
 
 @login_required
@@ -1204,7 +1248,7 @@ def inbox(request):
     messages_received = Message.objects.filter(
         recipient=request.user,
         recipient_deleted=False
-    ).select_related('sender').order_by('-timestamp')
+    ).select_related('sender').prefetch_related('sender__profiles').order_by('-timestamp')
 
     # Optional: Count unread messages for the badge
     unread_count = messages_received.filter(is_read=False).count()
@@ -1214,15 +1258,44 @@ def inbox(request):
         'unread_count': unread_count
     })
 
+def _int_param(request, name):
+    try:
+        return int(request.GET.get(name))
+    except (TypeError, ValueError):
+        return None
+
 def load_lgas(request):
-    state_id = request.GET.get('state_id')
-    lgas = LGA.objects.filter(state_id=state_id).order_by('name')
-    return JsonResponse(list(lgas.values('id', 'name')), safe=False)
+    # Served from the in-process geography bundle: no database hit
+    lgas = get_geography_bundle().lgas_by_state.get(_int_param(request, 'state_id'), [])
+    return JsonResponse(lgas, safe=False)
 
 def load_wards(request):
-    lga_id = request.GET.get('lga_id')
-    wards = Ward.objects.filter(lga_id=lga_id).order_by('name')
-    return JsonResponse(list(wards.values('id', 'name')), safe=False)
+    wards = get_geography_bundle().wards_by_lga.get(_int_param(request, 'lga_id'), [])
+    return JsonResponse(wards, safe=False)
+
+def geography_data(request):
+    """
+    The whole State -> LGA -> Ward tree as one pre-compressed JSON payload.
+    Requests carrying the current ?v= version are cacheable forever; the
+    version changes whenever geography data is imported or edited.
+    """
+    bundle = get_geography_bundle()
+
+    response = get_conditional_response(request, etag=bundle.etag)
+    if response is None:
+        if 'gzip' in request.META.get('HTTP_ACCEPT_ENCODING', ''):
+            response = HttpResponse(bundle.gzip, content_type='application/json')
+            response['Content-Encoding'] = 'gzip'
+        else:
+            response = HttpResponse(bundle.json, content_type='application/json')
+
+    response['ETag'] = bundle.etag
+    patch_vary_headers(response, ('Accept-Encoding',))
+    if request.GET.get('v') == str(bundle.version):
+        patch_cache_control(response, public=True, max_age=60 * 60 * 24 * 365, immutable=True)
+    else:
+        patch_cache_control(response, public=True, max_age=60 * 60)
+    return response
 
 @login_required
 def sent_messages(request):
@@ -0,0 +1,24 @@
+from django.core.mail import EmailMultiAlternatives
+from django.template.loader import render_to_string
+from django.utils.html import strip_tags
+from django.utils.translation import gettext as _
+
+
+def confirmation_email(donation, connection=None):
+    """The donor's HTML receipt as an unsent message."""
+    html = render_to_string('donations/confirmation_email.html', {'donation': donation})
+    email = EmailMultiAlternatives(
+        subject=_('Contribution Confirmation'),
+        body=strip_tags(html),
+        to=[donation.donor_email],
+        connection=connection,
+    )
+    email.attach_alternative(html, 'text/html')
+    return email
+
+
+def send_confirmation_email(donation):
+    """Queue the HTML receipt for the donor (delivered by send_queued_mail)"""
+    if not donation.donor_email:
+        return
+    confirmation_email(donation).send(fail_silently=True)
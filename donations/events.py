@@ -0,0 +1,185 @@
+"""
+Paystack webhook event processing.
+
+paystack_webhook verifies the signature, stores the delivery as a
+PaystackEvent with one INSERT (redeliveries hit the unique (event, reference)
+key and are dropped) and acknowledges straight away. process_events() then
+applies pending events in batches:
+
+- charge.success completes the matching Donation, queues its receipt and
+  wakes donors waiting on its status (donations/status.py);
+- transfer.success / transfer.failed / transfer.reversed set the status of
+  the Disbursement with that transaction_reference, and settle the payroll
+  run record sent under that reference (accounts/payroll.py), then post
+  the settled payments to the spending ledger (accounts/ledger.py).
+
+Applying an event twice changes nothing, so an interrupted batch is simply
+picked up again. Run it with `manage.py process_paystack_events`.
+"""
+import hashlib
+import json
+import logging
+from functools import partial
+
+from django.core.mail import get_connection
+from django.db import transaction
+from django.db.models import Value
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from accounts.ledger import sync_references
+from accounts.models import Disbursement, PayrollRecord
+from accounts.payroll import refresh_runs
+from .emails import confirmation_email
+from .models import Donation, PaystackEvent
+from .status import publish
+
+logger = logging.getLogger('izalams.paystack')
+
+TRANSFER_STATUS = {
+    'transfer.success': 'SUCCESS',
+    'transfer.failed': 'FAILED',
+    'transfer.reversed': 'REVERSED',
+}
+HANDLED_EVENTS = {'charge.success', *TRANSFER_STATUS}
+
+
+def event_reference(payload):
+    """
+    The key a delivery is deduplicated on. Events without a reference,
+    transfer code or id fall back to a hash of the payload, so they do not
+    all collapse into one row.
+    """
+    data = payload.get('data') or {}
+    reference = data.get('reference') or data.get('transfer_code') or data.get('id')
+    if not reference:
+        canonical = json.dumps(payload, sort_keys=True, separators=(',', ':'), default=str)
+        reference = 'sha256:' + hashlib.sha256(canonical.encode()).hexdigest()
+    return str(reference)[:100]
+
+
+def record_event(payload):
+    """Stores one verified webhook payload; a duplicate delivery is ignored."""
+    PaystackEvent.objects.bulk_create([
+        PaystackEvent(event=str(payload.get('event') or '')[:50], reference=event_reference(payload), payload=payload)
+    ], ignore_conflicts=True)
+
+
+def complete_donations(donations, now, authorization_codes=None, only_from=None):
+    """
+    Marks `donations` completed (via transition(), so the rollups follow),
+    stores any Paystack authorization codes, queues the receipts and wakes
+    the donors waiting on them. Shared by the webhook worker,
+    `manage.py reconcile_paystack` and the bank statement import.
+
+    `donations` may have been read a while ago: only the rows the UPDATE
+    actually changed (still in `only_from`, when given) are receipted, and
+    they are returned.
+    """
+    if not donations:
+        return []
+    authorization_codes = authorization_codes or {}
+    changed = Donation.objects.filter(pk__in=[d.pk for d in donations]).transition_rows(
+        'completed', only_from, completed_at=Coalesce('completed_at', Value(now))
+    )
+    donations = [d for d in donations if d.pk in changed]
+    coded = []
+    for donation in donations:
+        donation.status = 'completed'
+        donation.completed_at = donation.completed_at or now
+        code = authorization_codes.get(donation.reference)
+        if code:
+            donation.authorization_code = code
+            coded.append(donation)
+    if coded:
+        Donation.objects.bulk_update(coded, ['authorization_code'])
+
+    # transition() sends no post_save; tell the waiting donors directly
+    for donation in donations:
+        transaction.on_commit(partial(publish, donation))
+
+    receipts = [d for d in donations if d.donor_email]
+    if receipts:
+        connection = get_connection(fail_silently=True)
+        connection.send_messages([confirmation_email(d, connection) for d in receipts])
+    return donations
+
+
+def _apply_charges(events, now):
+    """Completes the donations not completed yet and returns them."""
+    by_reference = {event.reference: event for event in events}
+    donations = list(Donation.objects.filter(reference__in=by_reference).exclude(status='completed'))
+    codes = {}
+    for reference, event in by_reference.items():
+        data = event.payload.get('data') or {}
+        codes[reference] = (data.get('authorization') or {}).get('authorization_code')
+    return complete_donations(donations, now, codes)
+
+
+def _apply_transfers(events):
+    # Events arrive in id order, so the last one per reference wins
+    latest = {event.reference: TRANSFER_STATUS[event.event] for event in events}
+    by_status = {}
+    for reference, status in latest.items():
+        by_status.setdefault(status, []).append(reference)
+    for status, references in by_status.items():
+        Disbursement.objects.filter(transaction_reference__in=references).exclude(status=status).update(status=status)
+        records = PayrollRecord.objects.filter(reference__in=references, run__isnull=False)
+        if status == 'SUCCESS':
+            records.exclude(status='success').update(status='success', payment_date=timezone.now())
+        else:
+            records.exclude(status='failed').update(status='failed', last_error=f'Transfer {status.lower()}')
+    run_ids = set(PayrollRecord.objects.filter(reference__in=latest, run__isnull=False).values_list('run_id', flat=True))
+    if run_ids:
+        refresh_runs(run_ids)
+    sync_references(latest)
+
+
+def _apply(events, now):
+    with transaction.atomic():
+        charges = [e for e in events if e.event == 'charge.success']
+        transfers = [e for e in events if e.event in TRANSFER_STATUS]
+        if charges:
+            _apply_charges(charges, now)
+        if transfers:
+            _apply_transfers(transfers)
+        for event in events:
+            event.status = 'processed' if event.event in HANDLED_EVENTS else 'ignored'
+            event.attempts += 1
+            event.processed_at = now
+            event.last_error = ''
+        PaystackEvent.objects.bulk_update(events, ['status', 'attempts', 'processed_at', 'last_error'])
+
+
+def process_events(batch_size=100, max_attempts=5):
+    """
+    Applies one batch of pending events in a single transaction. If the batch
+    fails, its events are retried one by one so a single bad payload cannot
+    hold up the rest. Returns (processed, failed); (0, 0) means none were pending.
+    """
+    batch = list(PaystackEvent.objects.filter(status='pending').order_by('id')[:batch_size])
+    if not batch:
+        return 0, 0
+
+    now = timezone.now()
+    try:
+        _apply(batch, now)
+        return len(batch), 0
+    except Exception:
+        logger.exception("Paystack event batch failed; retrying events one by one")
+
+    processed = failed = 0
+    for event in batch:
+        event.refresh_from_db()
+        try:
+            _apply([event], now)
+            processed += 1
+        except Exception as exc:
+            failed += 1
+            event.attempts += 1
+            event.last_error = f"{type(exc).__name__}: {exc}"[:2000]
+            if event.attempts >= max_attempts:
+                event.status = 'failed'
+                logger.error("Giving up on Paystack event %s after %d attempts", event.pk, event.attempts)
+            event.save(update_fields=['status', 'attempts', 'last_error'])
+    return processed, failed
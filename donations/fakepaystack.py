@@ -0,0 +1,161 @@
+"""
+A local stand-in for the Paystack API, for tests and offline rehearsals.
+
+FakePaystackServer speaks HTTP/1.1 with keep-alive on localhost and answers
+the endpoints this project calls:
+
+    POST /transaction/initialize    GET /transaction/verify/<reference>
+    POST /transferrecipient         POST /transfer
+    GET  /balance                   GET /bank/resolve
+
+Transactions live in `records` (reference -> {"status", "amount"}, the same
+format `reconcile_paystack --record` writes); initialised transactions are
+recorded as successful. `fail_next(n, status)` makes the next n requests
+answer with an error, and `delay` slows every answer, to exercise retries,
+timeouts and the circuit breaker. Point PAYSTACK_BASE_URL at `base_url`, or
+run it standalone with `manage.py fake_paystack`.
+"""
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from itertools import count
+from urllib.parse import parse_qs, urlsplit
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def setup(self):
+        super().setup()
+        self.server.fake.connections += 1
+
+    def log_message(self, format, *args):
+        if self.server.fake.verbose:
+            super().log_message(format, *args)
+
+    def do_GET(self):
+        self._dispatch('GET')
+
+    def do_POST(self):
+        self._dispatch('POST')
+
+    def _dispatch(self, method):
+        fake = self.server.fake
+        length = int(self.headers.get('Content-Length') or 0)
+        raw = self.rfile.read(length) if length else b''
+        url = urlsplit(self.path)
+        status, body = fake.answer(method, url.path, parse_qs(url.query), raw, self.headers)
+        payload = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+
+class FakePaystackServer:
+    def __init__(self, host='127.0.0.1', port=0, records=None, secret_key=None, balance=5_000_000, verbose=False):
+        self.records = dict(records or {})
+        self.transfers = {}  # reference -> kobo
+        self.secret_key = secret_key
+        self.balance = balance  # kobo
+        self.verbose = verbose
+        self.delay = 0
+        self.requests = []
+        self.connections = 0
+        self._failures = []
+        self._ids = count(1)
+        self._lock = threading.Lock()
+        self.httpd = ThreadingHTTPServer((host, port), _Handler)
+        self.httpd.daemon_threads = True
+        self.httpd.fake = self
+        self._thread = None
+
+    @property
+    def base_url(self):
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def fail_next(self, times=1, status=503):
+        with self._lock:
+            self._failures.extend([status] * times)
+
+    def start(self):
+        self._thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def serve_forever(self):
+        self.httpd.serve_forever()
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    # --- Answers ---
+
+    def answer(self, method, path, query, raw, headers):
+        if self.delay:
+            threading.Event().wait(self.delay)
+        with self._lock:
+            self.requests.append((method, path))
+            failure = self._failures.pop(0) if self._failures else None
+        if failure:
+            return failure, {'status': False, 'message': 'Simulated failure'}
+        if self.secret_key and headers.get('Authorization') != f'Bearer {self.secret_key}':
+            return 401, {'status': False, 'message': 'Invalid key'}
+        try:
+            data = json.loads(raw) if raw else {}
+        except ValueError:
+            return 400, {'status': False, 'message': 'Invalid JSON'}
+
+        route = (method, path.rstrip('/'))
+        if route == ('POST', '/transaction/initialize'):
+            reference = data.get('reference') or f"FAKE-{next(self._ids)}"
+            with self._lock:
+                self.records[reference] = {'status': 'success', 'amount': int(data.get('amount') or 0)}
+            return 200, {'status': True, 'message': 'Authorization URL created', 'data': {
+                'authorization_url': f"{self.base_url}/checkout/{reference}",
+                'access_code': f"ac_{reference}", 'reference': reference,
+            }}
+        if method == 'GET' and path.startswith('/transaction/verify/'):
+            reference = path.rstrip('/').rsplit('/', 1)[-1]
+            record = self.records.get(reference)
+            if record is None:
+                return 404, {'status': False, 'message': 'Transaction reference not found'}
+            return 200, {'status': True, 'message': 'Verification successful', 'data': dict(record, reference=reference)}
+        if route == ('POST', '/transferrecipient'):
+            return 201, {'status': True, 'message': 'Transfer recipient created', 'data': {
+                'recipient_code': f"RCP_{data.get('account_number', '')}", 'name': data.get('name', ''),
+            }}
+        if route == ('POST', '/transfer'):
+            amount = int(data.get('amount') or 0)
+            with self._lock:
+                reference = data.get('reference') or f"TRF-{next(self._ids)}"
+                if reference in self.transfers:
+                    return 400, {'status': False, 'message': 'Duplicate Transaction Reference'}
+                if amount > self.balance:
+                    return 400, {'status': False, 'message': 'Your balance is not enough to fulfil this request'}
+                self.balance -= amount
+                self.transfers[reference] = amount
+            return 200, {'status': True, 'message': 'Transfer has been queued', 'data': {
+                'reference': reference, 'amount': amount, 'status': 'pending',
+            }}
+        if route == ('GET', '/balance'):
+            return 200, {'status': True, 'message': 'Balances retrieved', 'data': [
+                {'currency': 'NGN', 'balance': self.balance},
+            ]}
+        if route == ('GET', '/bank/resolve'):
+            account = (query.get('account_number') or [''])[0]
+            if len(account) != 10 or not account.isdigit():
+                return 422, {'status': False, 'message': 'Could not resolve account name'}
+            return 200, {'status': True, 'message': 'Account number resolved', 'data': {
+                'account_number': account, 'account_name': f"FAKE ACCOUNT {account[-4:]}",
+            }}
+        return 404, {'status': False, 'message': f'No fake for {method} {path}'}
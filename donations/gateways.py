@@ -0,0 +1,144 @@
+"""
+Payment gateway registry.
+
+Active PaymentGateway rows are read once per process and kept in memory;
+saving or deleting a gateway bumps the `gateways` cache version (see
+donations/signals.py), which every process checks before trusting its copy.
+A gateway without an active row falls back to the PAYSTACK_* settings, so a
+deployment configured only through the environment keeps working.
+
+Each gateway hands out one long-lived outbound Client per credentials
+(izalams/outbound.py: keep-alive pool, per-endpoint timeouts, retries,
+circuit breaker and metrics), so calls reuse TLS connections instead of
+opening a new one per request:
+
+    paystack = get_gateway('paystack')
+    response = paystack.post('/transfer', json=payload)
+"""
+import threading
+from dataclasses import dataclass
+
+from django.conf import settings
+
+from accounts.cache import bump_version, get_versions
+from izalams.outbound import Client
+
+CACHE_NAMESPACE = 'gateways'
+
+POOL_SIZE = 10
+
+BASE_URLS = {
+    'paystack': 'https://api.paystack.co',
+    'flutterwave': 'https://api.flutterwave.com/v3',
+    'stripe': 'https://api.stripe.com/v1',
+}
+
+
+@dataclass(frozen=True)
+class Gateway:
+    name: str
+    public_key: str = ''
+    secret_key: str = ''
+    webhook_secret: str = ''
+    base_url: str = ''
+
+    @property
+    def signing_secret(self):
+        """Key that signs webhooks (Paystack signs with the secret key)."""
+        return self.webhook_secret or self.secret_key
+
+    def url(self, path):
+        return f"{self.base_url.rstrip('/')}/{path.lstrip('/')}"
+
+    @property
+    def client(self):
+        return _client_for(self)
+
+    @property
+    def session(self):
+        return self.client.session
+
+    def get(self, path, **kwargs):
+        return self.client.get(path, **kwargs)
+
+    def post(self, path, **kwargs):
+        return self.client.post(path, **kwargs)
+
+
+_lock = threading.Lock()
+_loaded = {'version': None, 'gateways': {}}
+_clients = {}
+
+
+def _load():
+    from .models import PaymentGateway
+
+    gateways = {}
+    for row in PaymentGateway.objects.filter(is_active=True).order_by('pk'):
+        gateways.setdefault(row.name, Gateway(
+            name=row.name,
+            public_key=row.public_key,
+            secret_key=row.secret_key,
+            webhook_secret=row.webhook_secret or '',
+            base_url=_settings_base_url(row.name),
+        ))
+    return gateways
+
+
+def _configured():
+    version = get_versions(CACHE_NAMESPACE)[CACHE_NAMESPACE]
+    if _loaded['version'] != version:
+        gateways = _load()
+        with _lock:
+            _loaded.update(version=version, gateways=gateways)
+    return _loaded['gateways']
+
+
+def _settings_base_url(name):
+    if name == 'paystack':
+        return getattr(settings, 'PAYSTACK_BASE_URL', None) or BASE_URLS['paystack']
+    return BASE_URLS.get(name, '')
+
+
+def _from_settings(name):
+    if name != 'paystack':
+        return None
+    return Gateway(
+        name='paystack',
+        public_key=getattr(settings, 'PAYSTACK_PUBLIC_KEY', '') or '',
+        secret_key=getattr(settings, 'PAYSTACK_SECRET_KEY', '') or '',
+        base_url=_settings_base_url('paystack'),
+    )
+
+
+def active_gateways():
+    """The active gateways, without touching the database on a warm process."""
+    return list(_configured().values())
+
+
+def get_gateway(name='paystack'):
+    """The named gateway's configuration; Paystack falls back to settings."""
+    gateway = _configured().get(name) or _from_settings(name)
+    if gateway is None:
+        raise LookupError(f"Payment gateway {name!r} is not configured")
+    return gateway
+
+
+def _client_for(gateway):
+    key = (gateway.name, gateway.base_url, gateway.secret_key)
+    client = _clients.get(key)
+    if client is None:
+        with _lock:
+            client = _clients.get(key)
+            if client is None:
+                client = Client(
+                    gateway.name, gateway.base_url, pool_size=POOL_SIZE,
+                    headers={'Authorization': f"Bearer {gateway.secret_key}"},
+                )
+                _clients[key] = client
+    return client
+
+
+def invalidate():
+    """Makes every process reload the gateways on its next lookup."""
+    bump_version(CACHE_NAMESPACE)
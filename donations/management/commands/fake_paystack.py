@@ -0,0 +1,33 @@
+import json
+
+from django.core.management.base import BaseCommand
+from donations.fakepaystack import FakePaystackServer
+
+class Command(BaseCommand):
+    help = 'Serves a local fake of the Paystack API (point PAYSTACK_BASE_URL at it)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--host', default='127.0.0.1')
+        parser.add_argument('--port', type=int, default=8765)
+        parser.add_argument('--records', help='Transactions to answer verify calls from (a reconcile_paystack --record file)')
+        parser.add_argument('--secret-key', help='Reject calls without this bearer key')
+        parser.add_argument('--balance', type=int, default=5_000_000, help='Starting NGN balance in kobo')
+
+    def handle(self, *args, **options):
+        records = {}
+        if options['records']:
+            with open(options['records'], encoding='utf-8') as f:
+                records = json.load(f)
+        server = FakePaystackServer(
+            options['host'], options['port'], records=records, secret_key=options['secret_key'],
+            balance=options['balance'], verbose=options['verbosity'] > 1,
+        )
+        self.stdout.write(self.style.SUCCESS(
+            f'Fake Paystack listening on {server.base_url} with {len(records)} transaction(s); Ctrl+C to stop.'
+        ))
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            server.httpd.server_close()
@@ -0,0 +1,46 @@
+import csv
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+from donations.statements import (
+    REPORT_FIELDS, OpenDonationIndex, StatementError, complete_matches, match_statement, read_statement,
+)
+
+class Command(BaseCommand):
+    help = 'Matches a bank statement (CSV or MT940) against open bank-transfer donations and completes the matches'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path')
+        parser.add_argument('--format', choices=['auto', 'csv', 'mt940'], default='auto')
+        parser.add_argument('--encoding', default='utf-8-sig')
+        parser.add_argument('--dry-run', action='store_true', help='Match and report only; change nothing')
+        parser.add_argument('--report', help='Write credits needing review to this CSV file (default: stdout)')
+
+    def handle(self, *args, **options):
+        index = OpenDonationIndex()
+        self.stdout.write(f'{len(index.by_reference)} open bank-transfer donation(s) indexed.')
+
+        report_file = open(options['report'], 'w', newline='', encoding='utf-8') if options['report'] else sys.stdout
+        writer = csv.DictWriter(report_file, fieldnames=REPORT_FIELDS)
+        writer.writeheader()
+        review = 0
+
+        def report(row):
+            nonlocal review
+            review += 1
+            writer.writerow(row)
+
+        try:
+            with open(options['path'], newline='', encoding=options['encoding']) as statement:
+                matched = match_statement(read_statement(statement, options['format']), index, report)
+        except StatementError as exc:
+            raise CommandError(str(exc))
+        finally:
+            if report_file is not sys.stdout:
+                report_file.close()
+
+        if options['dry_run']:
+            self.stdout.write(self.style.SUCCESS(f'Would complete {len(matched)} donation(s); {review} credit(s) need review.'))
+            return
+        completed = complete_matches(matched)
+        self.stdout.write(self.style.SUCCESS(f'Completed {completed} donation(s); {review} credit(s) need review.'))
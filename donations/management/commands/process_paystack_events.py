@@ -0,0 +1,30 @@
+import time
+
+from django.core.management.base import BaseCommand
+from donations.events import process_events
+
+class Command(BaseCommand):
+    help = 'Applies stored Paystack webhook events (run from cron, or with --loop as a worker)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=100, help='Events applied per transaction')
+        parser.add_argument('--max-attempts', type=int, default=5)
+        parser.add_argument('--loop', action='store_true', help='Keep polling instead of exiting when no events are pending')
+        parser.add_argument('--interval', type=float, default=2, help='Seconds between polls with --loop')
+
+    def handle(self, *args, **options):
+        total_processed = total_failed = 0
+        while True:
+            processed, failed = process_events(options['batch_size'], options['max_attempts'])
+            total_processed += processed
+            total_failed += failed
+            if processed or failed:
+                if options['verbosity'] > 1:
+                    self.stdout.write(f'Batch: {processed} applied, {failed} failed')
+                if processed:
+                    continue
+            if not options['loop']:
+                break
+            time.sleep(options['interval'])
+
+        self.stdout.write(self.style.SUCCESS(f'Applied {total_processed} event(s), {total_failed} failed.'))
@@ -0,0 +1,9 @@
+from django.core.management.base import BaseCommand
+from donations.rollups import rebuild
+
+class Command(BaseCommand):
+    help = 'Rebuilds the DonationDailyRollup table from the Donation table'
+
+    def handle(self, *args, **options):
+        count = rebuild()
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt donation rollups: {count} row(s).'))
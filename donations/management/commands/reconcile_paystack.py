@@ -0,0 +1,63 @@
+import csv
+import json
+import sys
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from donations.models import Donation
+from donations.reconcile import (
+    REPORT_FIELDS, UNRESOLVED, FakePaystackAdapter, fake_records, make_session, reconcile,
+)
+
+class Command(BaseCommand):
+    help = 'Verifies pending/processing donations against Paystack and resolves the settled ones'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--concurrency', type=int, default=8, help='Parallel verify requests')
+        parser.add_argument('--page-size', type=int, default=500)
+        parser.add_argument('--dry-run', action='store_true', help='Report only; change nothing')
+        parser.add_argument('--report', help='Write the mismatch report to this CSV file (default: stdout)')
+        parser.add_argument('--record', help='Save every Paystack response to this JSON file for --replay')
+        parser.add_argument('--replay', help='Answer from a file written by --record instead of calling Paystack')
+        parser.add_argument('--fake', action='store_true', help='Answer with generated outcomes (offline rehearsal)')
+
+    def handle(self, *args, **options):
+        if options['replay'] and options['fake']:
+            raise CommandError('Use either --replay or --fake, not both.')
+
+        adapter = None
+        if options['replay']:
+            with open(options['replay'], encoding='utf-8') as f:
+                adapter = FakePaystackAdapter(json.load(f))
+        elif options['fake']:
+            unresolved = Donation.objects.filter(status__in=UNRESOLVED).values_list('reference', 'amount')
+            adapter = FakePaystackAdapter(fake_records(unresolved.iterator()))
+        session = make_session(options['concurrency'], adapter)
+
+        recorded = {} if options['record'] else None
+        recorder = recorded.__setitem__ if recorded is not None else None
+
+        report_file = open(options['report'], 'w', newline='', encoding='utf-8') if options['report'] else sys.stdout
+        writer = csv.DictWriter(report_file, fieldnames=REPORT_FIELDS)
+        writer.writeheader()
+        started = time.monotonic()
+        try:
+            summary = reconcile(
+                session, concurrency=options['concurrency'], page_size=options['page_size'],
+                dry_run=options['dry_run'], report=writer.writerow, recorder=recorder,
+            )
+        finally:
+            if report_file is not sys.stdout:
+                report_file.close()
+            session.close()
+
+        if recorded is not None:
+            with open(options['record'], 'w', encoding='utf-8') as f:
+                json.dump(recorded, f)
+
+        verb = 'Would resolve' if options['dry_run'] else 'Resolved'
+        self.stdout.write(self.style.SUCCESS(
+            f"Checked {summary['checked']} donation(s) in {time.monotonic() - started:.1f}s. "
+            f"{verb} {summary['completed']} completed, {summary['failed']} failed; "
+            f"{summary['mismatches']} mismatch(es) reported."
+        ))
@@ -0,0 +1,29 @@
+# Generated by Django 5.0.14 on 2026-10-19 01:33
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('donations', '0002_paystackevent'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DonationDailyRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('purpose', models.CharField(max_length=255)),
+                ('payment_method', models.CharField(max_length=20)),
+                ('status', models.CharField(max_length=20)),
+                ('count', models.IntegerField(default=0)),
+                ('amount', models.DecimalField(decimal_places=2, default=0, max_digits=16)),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name='donationdailyrollup',
+            constraint=models.UniqueConstraint(fields=('date', 'purpose', 'payment_method', 'status'), name='donation_rollup_key'),
+        ),
+    ]
@@ -0,0 +1,26 @@
+# Generated by Django 5.0.14 on 2026-10-19 01:34
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('donations', '0003_donationdailyrollup'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DonationAnalytics',
+            fields=[
+            ],
+            options={
+                'verbose_name': 'Donation Analytics',
+                'verbose_name_plural': 'Donation Analytics',
+                'proxy': True,
+                'indexes': [],
+                'constraints': [],
+            },
+            bases=('donations.donation',),
+        ),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 5.0.14 on 2026-10-19 01:40
+
+import izalams.references
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('donations', '0004_donationanalytics'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='donation',
+            name='reference',
+            field=models.CharField(default=izalams.references.donation_reference, max_length=100, unique=True),
+        ),
+    ]
@@ -1,11 +1,50 @@
-from django.db import models
+from django.db import models, transaction
 from django.contrib.auth.models import User
 from django.core.validators import MinValueValidator
 from datetime import date
-import uuid
 from izalams import settings
+from izalams.references import donation_reference
 from django.utils import timezone
 
+class DonationQuerySet(models.QuerySet):
+    def transition(self, status, only_from=None, **fields):
+        """
+        Moves every donation in the queryset that is not already in `status`
+        (and, with `only_from`, is in one of those statuses) there, keeping
+        DonationDailyRollup in step (bulk updates skip the post_save signal
+        that maintains it). Extra `fields` are set on the same rows. Returns
+        the number of donations changed.
+        """
+        return len(self.transition_rows(status, only_from, **fields))
+
+    def transition_rows(self, status, only_from=None, **fields):
+        """
+        transition(), returning the pks of the rows this call changed. Each
+        UPDATE re-checks the status read just before it, so a row another
+        process moved in the meantime is neither overwritten nor reported.
+        """
+        from .rollups import STATE_FIELDS, apply_deltas, transition_deltas
+
+        rows = self.exclude(status=status)
+        if only_from is not None:
+            rows = rows.filter(status__in=only_from)
+        stamp = timezone.now()
+        with transaction.atomic():
+            states = {row.pop('pk'): row for row in rows.values('pk', *STATE_FIELDS)}
+            by_status = {}
+            for pk, state in states.items():
+                by_status.setdefault(state['status'], []).append(pk)
+            for old_status, pks in by_status.items():
+                self.model.objects.filter(pk__in=pks, status=old_status).update(
+                    status=status, updated_at=stamp, **fields
+                )
+            changed = set(self.model.objects.filter(
+                pk__in=list(states), status=status, updated_at=stamp,
+            ).values_list('pk', flat=True)) if states else set()
+            apply_deltas(transition_deltas([states[pk] for pk in changed], status))
+        return changed
+
+
 class Donation(models.Model):
     PAYMENT_METHODS = (
         ('card', 'Card Payment'),
@@ -33,7 +72,7 @@ class Donation(models.Model):
     # Payment information
     payment_method = models.CharField(max_length=20, choices=PAYMENT_METHODS)
     status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='pending')
-    reference = models.CharField(max_length=100, unique=True)
+    reference = models.CharField(max_length=100, unique=True, default=donation_reference)
     
     # Card payment fields (if applicable)
     card_last_four = models.CharField(max_length=4, blank=True, null=True)
@@ -50,6 +89,8 @@ class Donation(models.Model):
     updated_at = models.DateTimeField(auto_now=True)
     completed_at = models.DateTimeField(blank=True, null=True)
     
+    objects = DonationQuerySet.as_manager()
+
     class Meta:
         ordering = ['-created_at']
     
@@ -57,8 +98,7 @@ class Donation(models.Model):
         return f"{self.donor_name} - ₦{self.amount} - {self.status}"
     
     def generate_reference(self):
-        import uuid
-        return f"DON-{uuid.uuid4().hex[:12].upper()}"
+        return donation_reference()
     
     def save(self, *args, **kwargs):
         if not self.reference:
@@ -84,4 +124,72 @@ class PaymentGateway(models.Model):
     webhook_secret = models.CharField(max_length=255, blank=True, null=True)
     
     def __str__(self):
-        return self.get_name_display()
\ No newline at end of file
+        return self.get_name_display()
+
+class PaystackEvent(models.Model):
+    """
+    Raw Paystack webhook deliveries. The webhook only INSERTs here (duplicates
+    are dropped by the unique key) and `manage.py process_paystack_events`
+    applies them; see donations/events.py.
+    """
+    STATUS_CHOICES = (
+        ('pending', 'Pending'),
+        ('processed', 'Processed'),
+        ('ignored', 'Ignored'),
+        ('failed', 'Failed'),
+    )
+
+    event = models.CharField(max_length=50)
+    reference = models.CharField(max_length=100)
+    payload = models.JSONField()
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='pending')
+    attempts = models.PositiveSmallIntegerField(default=0)
+    last_error = models.TextField(blank=True)
+    received_at = models.DateTimeField(default=timezone.now)
+    processed_at = models.DateTimeField(blank=True, null=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['event', 'reference'], name='paystack_event_once'),
+        ]
+        indexes = [
+            # The worker's poll: WHERE status='pending' ORDER BY id
+            models.Index(fields=['status', 'id'], name='paystack_event_pending_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.event} {self.reference} ({self.status})"
+
+
+
+class DonationDailyRollup(models.Model):
+    """
+    Donation counts and totals per (day, purpose, method, status), kept
+    current as donations are created, change status or are deleted (see
+    donations/rollups.py). The analytics admin reads these instead of
+    aggregating the whole Donation table.
+    """
+    date = models.DateField()
+    purpose = models.CharField(max_length=255)
+    payment_method = models.CharField(max_length=20)
+    status = models.CharField(max_length=20)
+    count = models.IntegerField(default=0)
+    amount = models.DecimalField(max_digits=16, decimal_places=2, default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['date', 'purpose', 'payment_method', 'status'], name='donation_rollup_key',
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.date} {self.purpose} {self.payment_method} {self.status}: {self.count}"
+
+
+class DonationAnalytics(Donation):
+    """Admin entry point for the rollup-backed analytics page."""
+    class Meta:
+        proxy = True
+        verbose_name = "Donation Analytics"
+        verbose_name_plural = "Donation Analytics"
@@ -0,0 +1,198 @@
+"""
+Paystack reconciliation for unresolved donations.
+
+Donations left in `pending`/`processing` (no webhook arrived, nobody clicked
+confirm) are paged through by id, verified against Paystack's
+/transaction/verify endpoint over one pooled session with a bounded thread
+pool, and resolved in bulk per page:
+
+- Paystack `success` with the same amount completes the donation (receipt,
+  rollups and waiting donors included, see donations/events.py);
+- `failed` / `reversed` marks it failed;
+- anything else (not found, amount differs, still abandoned, HTTP errors)
+  is left alone and written to the mismatch report.
+
+For offline runs the session can be pointed at a FakePaystackAdapter that
+answers from a recorded JSON file or from generated outcomes, so a 50k
+backlog can be rehearsed without touching the network.
+"""
+import hashlib
+import json
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from decimal import Decimal
+from functools import partial
+
+import requests
+from django.db import transaction
+from django.utils import timezone
+from izalams.outbound import Client
+
+from .events import complete_donations
+from .gateways import get_gateway
+from .models import Donation
+from .status import publish
+
+UNRESOLVED = ('pending', 'processing')
+FAILED = ('failed', 'reversed')
+
+REPORT_FIELDS = ['reference', 'local_status', 'paystack_status', 'local_amount', 'paystack_amount', 'problem']
+
+
+def make_session(concurrency, adapter=None):
+    """
+    An outbound client whose connection pool fits `concurrency` workers; GETs
+    are retried on 429/5xx with jittered backoff (see izalams/outbound.py).
+    """
+    paystack = get_gateway('paystack')
+    return Client(
+        'paystack', paystack.base_url, pool_size=concurrency, adapter=adapter,
+        headers={'Authorization': f"Bearer {paystack.secret_key}"},
+    )
+
+
+class FakePaystackAdapter(requests.adapters.BaseAdapter):
+    """
+    Answers /transaction/verify/<reference> from `records`, a mapping of
+    reference -> {"status": ..., "amount": <kobo>}. Unknown references get
+    Paystack's 404. Used with `--replay` and `--fake`.
+    """
+
+    def __init__(self, records):
+        super().__init__()
+        self.records = records
+
+    def send(self, request, **kwargs):
+        reference = request.path_url.rstrip('/').rsplit('/', 1)[-1]
+        record = self.records.get(reference)
+        response = requests.Response()
+        response.request = request
+        response.url = request.url
+        response.headers['Content-Type'] = 'application/json'
+        if record is None:
+            response.status_code = 404
+            body = {'status': False, 'message': 'Transaction reference not found'}
+        else:
+            response.status_code = 200
+            body = {'status': True, 'message': 'Verification successful', 'data': dict(record, reference=reference)}
+        response._content = json.dumps(body).encode()
+        return response
+
+    def close(self):
+        pass
+
+
+def fake_records(donations, seed='reconcile'):
+    """Deterministic outcomes for offline runs: mostly paid, some failed, abandoned or missing."""
+    records = {}
+    for reference, amount in donations:
+        bucket = int(hashlib.sha1(f"{seed}:{reference}".encode()).hexdigest(), 16) % 100
+        if bucket < 5:
+            continue
+        status = 'success' if bucket < 80 else 'failed' if bucket < 90 else 'abandoned'
+        records[reference] = {'status': status, 'amount': int(amount * 100)}
+    return records
+
+
+@dataclass
+class Result:
+    reference: str
+    http_status: int = 0
+    data: dict = field(default_factory=dict)
+    error: str = ''
+
+
+def verify(session, reference, timeout=None):
+    try:
+        response = session.get(f"/transaction/verify/{reference}", timeout=timeout)
+    except requests.RequestException as exc:
+        return Result(reference, error=f"{type(exc).__name__}: {exc}")
+    try:
+        body = response.json()
+    except ValueError:
+        body = {}
+    return Result(reference, response.status_code, body.get('data') or {})
+
+
+def unresolved_pages(page_size, queryset=None):
+    """Keyset pagination over unresolved donations, so each page is an index range scan."""
+    queryset = (queryset if queryset is not None else Donation.objects.all()).filter(status__in=UNRESOLVED)
+    last_id = 0
+    while True:
+        page = list(queryset.filter(pk__gt=last_id).order_by('pk')[:page_size])
+        if not page:
+            return
+        yield page
+        last_id = page[-1].pk
+
+
+def _classify(donation, result):
+    """(new local status or None, problem or '') for one verification result."""
+    if result.error:
+        return None, result.error
+    if result.http_status == 404:
+        return None, 'not found on Paystack'
+    if result.http_status != 200:
+        return None, f'HTTP {result.http_status}'
+
+    remote = result.data.get('status')
+    if remote == 'success':
+        expected = int(Decimal(donation.amount) * 100)
+        if result.data.get('amount') != expected:
+            return None, 'amount differs'
+        return 'completed', ''
+    if remote in FAILED:
+        return 'failed', ''
+    return None, f'still {remote or "unknown"} on Paystack'
+
+
+def reconcile(session, concurrency=8, page_size=500, dry_run=False, report=None, recorder=None, queryset=None):
+    """
+    Verifies every unresolved donation and resolves the ones Paystack settled.
+    `report(row)` receives a dict (REPORT_FIELDS) for each mismatch and
+    `recorder(reference, data)` each verified payload. Returns a summary dict.
+    """
+    summary = {'checked': 0, 'completed': 0, 'failed': 0, 'mismatches': 0}
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        for page in unresolved_pages(page_size, queryset):
+            results = pool.map(lambda d: verify(session, d.reference), page)
+            to_complete, to_fail = [], []
+            for donation, result in zip(page, results):
+                summary['checked'] += 1
+                if recorder and result.http_status == 200:
+                    recorder(donation.reference, result.data)
+                new_status, problem = _classify(donation, result)
+                if new_status == 'completed':
+                    to_complete.append(donation)
+                elif new_status == 'failed':
+                    to_fail.append(donation)
+                else:
+                    summary['mismatches'] += 1
+                    if report:
+                        report({
+                            'reference': donation.reference,
+                            'local_status': donation.status,
+                            'paystack_status': result.data.get('status', ''),
+                            'local_amount': donation.amount,
+                            'paystack_amount': result.data.get('amount', ''),
+                            'problem': problem,
+                        })
+
+            if dry_run:
+                summary['completed'] += len(to_complete)
+                summary['failed'] += len(to_fail)
+                continue
+            # The page was read before the verify calls: the webhook worker may
+            # have settled some of it since, so only still-unresolved rows change
+            with transaction.atomic():
+                summary['completed'] += len(complete_donations(to_complete, timezone.now(), only_from=UNRESOLVED))
+                if to_fail:
+                    failed = Donation.objects.filter(pk__in=[d.pk for d in to_fail]).transition_rows(
+                        'failed', only_from=UNRESOLVED,
+                    )
+                    summary['failed'] += len(failed)
+                    for donation in to_fail:
+                        if donation.pk in failed:
+                            donation.status = 'failed'
+                            transaction.on_commit(partial(publish, donation))
+    return summary
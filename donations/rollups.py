@@ -0,0 +1,122 @@
+"""
+Daily donation rollups (DonationDailyRollup).
+
+Each donation is counted in the rollup row for the local date it was created
+and its current purpose, payment method and status. Saves and deletes adjust
+the affected rows through signals (donations/signals.py); bulk status changes
+go through Donation.objects.transition(), which computes the same deltas
+from the rows it read before its UPDATE. Deltas are applied as a
+`count = count + n` UPDATE, so concurrent writers add to the same row
+instead of overwriting each other. `manage.py rebuild_donation_rollups`
+recomputes the table from scratch.
+"""
+from collections import defaultdict
+from decimal import Decimal
+from functools import reduce
+from operator import or_
+
+from django.db import transaction
+from django.db.models import Case, Count, F, Q, Sum, Value, When
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from .models import Donation, DonationDailyRollup
+
+KEY_FIELDS = ('date', 'purpose', 'payment_method', 'status')
+
+
+def rollup_key(donation):
+    """The (date, purpose, method, status) bucket `donation` is counted in."""
+    created = donation.created_at or timezone.now()
+    return (timezone.localdate(created), donation.purpose, donation.payment_method, donation.status)
+
+
+def _grouped(queryset):
+    return queryset.annotate(date=TruncDate('created_at')).values(
+        'date', 'purpose', 'payment_method', 'status'
+    ).annotate(n=Count('id'), total=Sum('amount')).order_by()
+
+
+def transition_deltas(states, status):
+    """Rollup changes for moving donations in `states` (dicts of STATE_FIELDS) to `status`."""
+    deltas = defaultdict(lambda: [0, Decimal(0)])
+    for values in states:
+        old, amount = _state(values)
+        for key, sign in ((old, -1), (old[:3] + (status,), 1)):
+            deltas[key][0] += sign
+            deltas[key][1] += sign * Decimal(str(amount))
+    return deltas
+
+
+def apply_deltas(deltas):
+    """
+    Adds {key: (count, amount)} to the rollup rows: the missing rows are
+    created empty (ignoring ones that exist or a concurrent writer just
+    made), then one UPDATE adds each row's delta in place.
+    """
+    changes = [
+        (dict(zip(KEY_FIELDS, key)), count, amount) for key, (count, amount) in deltas.items() if count or amount
+    ]
+    if not changes:
+        return
+    with transaction.atomic(savepoint=False):
+        DonationDailyRollup.objects.bulk_create(
+            [DonationDailyRollup(**fields) for fields, _, _ in changes], ignore_conflicts=True,
+        )
+        DonationDailyRollup.objects.filter(reduce(or_, (Q(**fields) for fields, _, _ in changes))).update(
+            count=F('count') + Case(*(When(Q(**fields), then=Value(count)) for fields, count, _ in changes)),
+            amount=F('amount') + Case(
+                *(When(Q(**fields), then=Value(amount)) for fields, _, amount in changes),
+                output_field=DonationDailyRollup._meta.get_field('amount'),
+            ),
+        )
+
+
+def rebuild(batch_size=1000):
+    """Recomputes every rollup row from the Donation table. Returns the row count."""
+    rows = [
+        DonationDailyRollup(count=g['n'], amount=g['total'] or 0, **{f: g[f] for f in KEY_FIELDS})
+        for g in _grouped(Donation.objects.all())
+    ]
+    with transaction.atomic():
+        DonationDailyRollup.objects.all().delete()
+        DonationDailyRollup.objects.bulk_create(rows, batch_size=batch_size)
+    return len(rows)
+
+
+STATE_FIELDS = ('created_at', 'purpose', 'payment_method', 'status', 'amount')
+
+
+def loaded_values(donation):
+    """The fields that place `donation` in a bucket, as loaded; None if any were deferred."""
+    values = donation.__dict__
+    if any(f not in values for f in STATE_FIELDS):
+        return None
+    return {f: values[f] for f in STATE_FIELDS}
+
+
+def _state(values):
+    return rollup_key(Donation(**values)), values['amount']
+
+
+def saved_state(donation):
+    """(rollup key, amount) of the stored row, or None for a new donation."""
+    if donation._state.adding or donation.pk is None:
+        return None
+    values = getattr(donation, '_rollup_values', None)
+    if values is None:
+        values = Donation.objects.filter(pk=donation.pk).values(*STATE_FIELDS).first()
+        if values is None:
+            return None
+    return _state(values)
+
+
+def record_change(before, after):
+    """Moves one donation from the `before` bucket to `after`; either may be None."""
+    deltas = defaultdict(lambda: [0, Decimal(0)])
+    for state, sign in ((before, -1), (after, 1)):
+        if state is not None:
+            key, amount = state
+            deltas[key][0] += sign
+            deltas[key][1] += sign * Decimal(str(amount))
+    apply_deltas(deltas)
@@ -0,0 +1,42 @@
+from django.db import transaction
+from django.db.models.signals import post_delete, post_init, post_save, pre_save
+from django.dispatch import receiver
+
+from .gateways import invalidate as invalidate_gateways
+from .models import Donation, PaymentGateway
+from .rollups import loaded_values, record_change, rollup_key, saved_state
+from .status import publish
+
+# --- Waiting donors (see donations/status.py) ---
+
+@receiver(post_save, sender=Donation)
+def publish_donation_status(sender, instance, **kwargs):
+    transaction.on_commit(lambda: publish(instance))
+
+# --- Daily rollups (see donations/rollups.py) ---
+
+@receiver(post_init, sender=Donation)
+def track_rollup_bucket(sender, instance, **kwargs):
+    instance._rollup_values = loaded_values(instance)
+
+@receiver(pre_save, sender=Donation)
+def remember_rollup_bucket(sender, instance, raw=False, **kwargs):
+    instance._rollup_before = None if raw else saved_state(instance)
+
+@receiver(post_save, sender=Donation)
+def update_rollups(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    record_change(instance._rollup_before, (rollup_key(instance), instance.amount))
+    instance._rollup_values = loaded_values(instance)
+
+@receiver(post_delete, sender=Donation)
+def remove_from_rollups(sender, instance, **kwargs):
+    record_change(saved_state(instance) or (rollup_key(instance), instance.amount), None)
+
+# --- Gateway registry (see donations/gateways.py) ---
+
+@receiver(post_save, sender=PaymentGateway)
+@receiver(post_delete, sender=PaymentGateway)
+def reload_gateways(sender, **kwargs):
+    transaction.on_commit(invalidate_gateways)
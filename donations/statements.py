@@ -0,0 +1,239 @@
+"""
+Bank statement import for bank-transfer donations.
+
+Statements (bank CSV exports or MT940 files) are streamed one credit at a
+time and matched in a single pass against an in-memory index of open
+transfer donations (`pending`/`processing`) keyed by reference. A credit
+whose narrative carries a donation reference and the exact amount is a
+match; matches are completed in bulk at the end through
+complete_donations(), so receipts, rollups and waiting donors follow.
+
+Everything else is reported for a human: a reference with the wrong amount,
+a second credit for a donation already matched, and credits with no
+reference at all. For the latter the report suggests the open donation
+with that amount when there is exactly one.
+"""
+import csv
+import re
+from collections import defaultdict
+from dataclasses import dataclass
+from datetime import date, datetime
+from decimal import Decimal, InvalidOperation
+
+from django.db import transaction
+from django.utils import timezone
+
+from .events import complete_donations
+from .models import Donation
+
+OPEN_STATUSES = ('pending', 'processing')
+
+REPORT_FIELDS = ['line', 'date', 'amount', 'narrative', 'result', 'reference', 'donation_amount']
+
+_TOKEN = re.compile(r'[A-Z0-9][A-Z0-9-]{5,}')
+
+# Header names seen in Nigerian bank CSV exports, normalised to lower case
+CSV_COLUMNS = {
+    'date': ('date', 'transaction date', 'trans date', 'value date', 'posting date'),
+    'credit': ('credit', 'credit amount', 'deposit', 'deposits', 'cr', 'amount'),
+    'debit': ('debit', 'debit amount', 'withdrawal', 'withdrawals', 'dr'),
+    'narrative': ('narration', 'narrative', 'description', 'details', 'remarks', 'transaction details'),
+    'bank_reference': ('reference', 'ref', 'transaction reference', 'reference number'),
+}
+
+
+class StatementError(ValueError):
+    pass
+
+
+@dataclass
+class Credit:
+    line: int
+    date: date
+    amount: Decimal
+    narrative: str
+    bank_reference: str = ''
+
+
+def _amount(text):
+    text = (text or '').replace(',', '').replace('₦', '').replace('NGN', '').strip()
+    if not text or text == '-':
+        return None
+    try:
+        return Decimal(text)
+    except InvalidOperation:
+        raise StatementError(f"Unreadable amount {text!r}")
+
+
+def _date(text):
+    text = (text or '').strip()
+    for fmt in ('%Y-%m-%d', '%d/%m/%Y', '%d-%m-%Y', '%d-%b-%Y', '%d %b %Y', '%d/%m/%y'):
+        try:
+            return datetime.strptime(text, fmt).date()
+        except ValueError:
+            continue
+    raise StatementError(f"Unreadable date {text!r}")
+
+
+def read_csv(lines):
+    """Yields the credits of a CSV statement; debits and blank amounts are skipped."""
+    reader = csv.DictReader(lines)
+    if not reader.fieldnames:
+        return
+    headers = {name.strip().lower(): name for name in reader.fieldnames}
+    columns = {}
+    for key, aliases in CSV_COLUMNS.items():
+        columns[key] = next((headers[a] for a in aliases if a in headers), None)
+    if not columns['date'] or not columns['credit'] or not columns['narrative']:
+        raise StatementError(f"Missing date, credit or narration column in {reader.fieldnames}")
+
+    for row in reader:
+        amount = _amount(row.get(columns['credit']))
+        if amount is None or amount <= 0:
+            continue
+        if columns['debit'] and _amount(row.get(columns['debit'])):
+            continue
+        yield Credit(
+            line=reader.line_num,
+            date=_date(row[columns['date']]),
+            amount=amount,
+            narrative=row.get(columns['narrative']) or '',
+            bank_reference=(row.get(columns['bank_reference']) or '').strip() if columns['bank_reference'] else '',
+        )
+
+
+# :61:YYMMDD[MMDD]C|D|RC|RD[funds code]amount[N]type code[reference][//bank reference]
+_MT940_61 = re.compile(
+    r'^:61:(?P<date>\d{6})(?:\d{4})?(?P<mark>RC|RD|C|D)[A-Z]?(?P<amount>[\d,]+)'
+    r'[A-Z]\w{3}(?P<customer>[^/\n]*)(?://(?P<bank>.*))?'
+)
+
+
+def read_mt940(lines):
+    """Yields the credits of an MT940 statement (:61: lines with their :86: narratives)."""
+    pending = None
+    in_86 = False
+    for number, raw in enumerate(lines, 1):
+        line = raw.rstrip('\r\n')
+        if line.startswith(':61:'):
+            if pending:
+                yield pending
+            pending, in_86 = None, False
+            match = _MT940_61.match(line)
+            if not match:
+                raise StatementError(f"Unreadable :61: line {number}")
+            if match['mark'] != 'C':
+                continue
+            pending = Credit(
+                line=number,
+                date=datetime.strptime(match['date'], '%y%m%d').date(),
+                amount=Decimal(match['amount'].replace(',', '.')),
+                narrative=match['customer'].strip(),
+                bank_reference=(match['bank'] or '').strip(),
+            )
+        elif line.startswith(':86:'):
+            in_86 = True
+            if pending:
+                pending.narrative = f"{pending.narrative} {line[4:]}".strip()
+        elif line.startswith(':') or line.startswith('-'):
+            in_86 = False
+        elif in_86 and pending:
+            pending.narrative = f"{pending.narrative} {line}".strip()
+    if pending:
+        yield pending
+
+
+def read_statement(lines, fmt='auto'):
+    lines = iter(lines)
+    if fmt == 'auto':
+        first = next(lines, '')
+        fmt = 'mt940' if first.lstrip().startswith((':20:', '{1:', ':')) else 'csv'
+        lines = _prepend(first, lines)
+    if fmt == 'mt940':
+        return read_mt940(lines)
+    if fmt == 'csv':
+        return read_csv(lines)
+    raise StatementError(f"Unknown statement format {fmt!r}")
+
+
+def _prepend(first, rest):
+    yield first
+    yield from rest
+
+
+class OpenDonationIndex:
+    """Open transfer donations by reference, plus reference-less lookup by amount."""
+
+    def __init__(self, queryset=None):
+        queryset = queryset if queryset is not None else Donation.objects.all()
+        self.by_reference = {}
+        self.by_amount = defaultdict(list)
+        rows = queryset.filter(payment_method='transfer', status__in=OPEN_STATUSES)
+        for donation in rows.iterator(chunk_size=2000):
+            self.by_reference[donation.reference.upper()] = donation
+            self.by_amount[donation.amount].append(donation)
+
+    def find(self, narrative):
+        for token in _TOKEN.findall(narrative.upper()):
+            # Banks glue names onto references ("DON-1A2B3C-FATIMA"): try each prefix
+            parts = token.split('-')
+            for end in range(len(parts), 0, -1):
+                donation = self.by_reference.get('-'.join(parts[:end]))
+                if donation is not None:
+                    return donation
+        return None
+
+
+def match_statement(credits, index, report=None):
+    """
+    One pass over `credits`. Returns {donation pk: (donation, credit)} for the
+    matches; every other credit goes to `report(row)` (REPORT_FIELDS).
+    """
+    matched = {}
+
+    def flag(credit, result, donation=None):
+        if report:
+            report({
+                'line': credit.line, 'date': credit.date, 'amount': credit.amount,
+                'narrative': credit.narrative, 'result': result,
+                'reference': donation.reference if donation else '',
+                'donation_amount': donation.amount if donation else '',
+            })
+
+    for credit in credits:
+        donation = index.find(credit.narrative)
+        if donation is None:
+            candidates = [d for d in index.by_amount.get(credit.amount, []) if d.pk not in matched]
+            flag(credit, 'unmatched', candidates[0] if len(candidates) == 1 else None)
+        elif donation.pk in matched:
+            flag(credit, 'duplicate', donation)
+        elif donation.amount != credit.amount:
+            flag(credit, 'amount mismatch', donation)
+        else:
+            matched[donation.pk] = (donation, credit)
+    return matched
+
+
+def complete_matches(matched, batch_size=500):
+    """
+    Completes the matched donations in bulk, recording the bank's reference.
+    Donations settled (or cancelled) since the index was read are left
+    alone; returns how many were completed.
+    """
+    items = list(matched.values())
+    now = timezone.now()
+    completed = 0
+    for start in range(0, len(items), batch_size):
+        batch = items[start:start + batch_size]
+        with transaction.atomic():
+            donations = [donation for donation, _ in batch]
+            changed = {d.pk for d in complete_donations(donations, now, only_from=OPEN_STATUSES)}
+            completed += len(changed)
+            referenced = []
+            for donation, credit in batch:
+                if donation.pk in changed and credit.bank_reference:
+                    donation.transfer_reference = credit.bank_reference[:100]
+                    referenced.append(donation)
+            if referenced:
+                Donation.objects.bulk_update(referenced, ['transfer_reference'])
+    return completed
@@ -0,0 +1,119 @@
+"""
+Donation status for donors waiting on a payment.
+
+payment_status and payment_status_wait read through a short-TTL cache entry
+per reference, so however many browsers wait on a campaign the database sees
+at most one read per reference every DONATION_STATUS_TTL seconds.
+
+payment_status_wait long-polls only where DONATION_STATUS_LONG_POLL is on
+(an async or threaded server with spare workers); on WSGI every waiter
+would hold a worker, so by default it answers at once with `retry_after`,
+the seconds the page should wait before asking again. Long-polling is also
+skipped for bank transfers awaiting confirmation, which take hours, and
+once DONATION_STATUS_MAX_WAITERS requests are already waiting in the process.
+
+publish() refreshes the entry when a donation changes and wakes the requests
+waiting in this process only. A change made in another process (such as the
+process_paystack_events worker) reaches a waiter when its cache entry
+expires and is re-read, at most DONATION_STATUS_TTL seconds later, unless
+the cache is shared between processes.
+"""
+import threading
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+
+from .models import Donation
+
+POLL_STEP = 1.0
+MAX_WAIT = 30
+
+_changed = threading.Condition()
+_waiters_lock = threading.Lock()
+_waiters = 0
+
+
+def _key(reference):
+    return f"donation-status:{reference}"
+
+
+def _ttl():
+    return getattr(settings, 'DONATION_STATUS_TTL', 5)
+
+
+def snapshot(donation):
+    return {
+        'status': donation.status, 'amount': str(donation.amount), 'reference': donation.reference,
+        'payment_method': donation.payment_method,
+    }
+
+
+def get_status(reference):
+    """The status payload for `reference`, or None if there is no such donation."""
+    payload = cache.get(_key(reference))
+    if payload is None:
+        donation = Donation.objects.only('status', 'amount', 'reference', 'payment_method').filter(reference=reference).first()
+        if donation is None:
+            return None
+        payload = snapshot(donation)
+        cache.set(_key(reference), payload, _ttl())
+    return payload
+
+
+def publish(donation):
+    """Stores the donation's new status and wakes the waiters in this process."""
+    cache.set(_key(donation.reference), snapshot(donation), _ttl())
+    with _changed:
+        _changed.notify_all()
+
+
+def poll_interval():
+    """Seconds a page that was not long-polled waits before asking again."""
+    return getattr(settings, 'DONATION_STATUS_POLL_INTERVAL', 30)
+
+
+def should_wait(payload):
+    """Whether a request for `payload` may be held open until it changes."""
+    if not getattr(settings, 'DONATION_STATUS_LONG_POLL', False):
+        return False
+    # Bank transfers wait on a manual confirmation for hours
+    return not (payload['payment_method'] == 'transfer' and payload['status'] == 'processing')
+
+
+def _claim_waiter():
+    global _waiters
+    with _waiters_lock:
+        if _waiters >= getattr(settings, 'DONATION_STATUS_MAX_WAITERS', 4):
+            return False
+        _waiters += 1
+        return True
+
+
+def _release_waiter():
+    global _waiters
+    with _waiters_lock:
+        _waiters -= 1
+
+
+def wait_for_change(reference, since, timeout):
+    """
+    Blocks until the status of `reference` differs from `since` or `timeout`
+    seconds pass, and returns the latest payload (None for unknown references).
+    Returns at once when DONATION_STATUS_MAX_WAITERS requests are already waiting.
+    """
+    deadline = time.monotonic() + min(timeout, MAX_WAIT)
+    payload = get_status(reference)
+    if payload is None or payload['status'] != since or not _claim_waiter():
+        return payload
+    try:
+        while payload is not None and payload['status'] == since:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            with _changed:
+                _changed.wait(min(POLL_STEP, remaining))
+            payload = get_status(reference)
+    finally:
+        _release_waiter()
+    return payload
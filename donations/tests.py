@@ -1,3 +1,561 @@
-from django.test import TestCase
+import hashlib
+import hmac
+import json
+import os
+import tempfile
+import threading
+import time
+from decimal import Decimal
+from io import StringIO
+from unittest import mock
 
-# Create your tests here.
+from django.contrib.auth.models import Permission
+from django.core import mail
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from accounts.models import Disbursement, PayrollRecord, User
+from accounts.utils import initiate_paystack_transfer, verify_bank_account
+from accounts.views import get_paystack_balance
+from izalams import outbound
+from izalams.references import new_references, reference_time
+from .events import process_events
+from .fakepaystack import FakePaystackServer
+from .gateways import active_gateways, get_gateway, invalidate
+from .models import Donation, DonationDailyRollup, PaymentGateway, PaystackEvent
+from .reconcile import FakePaystackAdapter, make_session, reconcile
+from .rollups import rebuild
+from .statements import OpenDonationIndex, StatementError, complete_matches, match_statement, read_statement
+from .status import get_status, publish, wait_for_change
+
+SECRET = 'test-secret'
+
+
+@override_settings(PAYSTACK_SECRET_KEY=SECRET, EMAIL_BACKEND='django.core.mail.backends.locmem.EmailBackend')
+class PaystackWebhookTests(TestCase):
+    def setUp(self):
+        self.donation = Donation.objects.create(
+            donor_name='Aisha', donor_email='aisha@example.org', donor_phone='0800',
+            amount=Decimal('5000'), payment_method='card',
+        )
+
+    def deliver(self, payload):
+        body = json.dumps(payload).encode()
+        signature = hmac.new(SECRET.encode(), body, hashlib.sha512).hexdigest()
+        return self.client.post(
+            reverse('paystack_webhook'), body, content_type='application/json', HTTP_X_PAYSTACK_SIGNATURE=signature
+        )
+
+    def charge(self):
+        return {'event': 'charge.success', 'data': {
+            'reference': self.donation.reference, 'authorization': {'authorization_code': 'AUTH_1'},
+        }}
+
+    def test_webhook_only_stores_the_event(self):
+        with self.assertNumQueries(1):
+            response = self.deliver(self.charge())
+        self.assertEqual(response.status_code, 200)
+        self.deliver(self.charge())  # Paystack retry
+
+        self.assertEqual(PaystackEvent.objects.count(), 1)
+        self.donation.refresh_from_db()
+        self.assertEqual(self.donation.status, 'pending')
+
+    def test_events_without_a_reference_are_kept_apart(self):
+        self.deliver({'event': 'customeridentification.success', 'data': {'customer_code': 'CUS_1'}})
+        self.deliver({'event': 'customeridentification.success', 'data': {'customer_code': 'CUS_2'}})
+        self.deliver({'event': 'customeridentification.success', 'data': {'customer_code': 'CUS_2'}})  # retry
+        references = list(PaystackEvent.objects.values_list('reference', flat=True))
+        self.assertEqual(len(references), 2)
+        self.assertTrue(all(reference.startswith('sha256:') for reference in references))
+
+    def test_bad_signature_is_rejected(self):
+        response = self.client.post(
+            reverse('paystack_webhook'), json.dumps(self.charge()), content_type='application/json',
+            HTTP_X_PAYSTACK_SIGNATURE='forged',
+        )
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(PaystackEvent.objects.exists())
+
+    def test_processing_is_idempotent(self):
+        self.deliver(self.charge())
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertEqual(process_events(), (1, 0))
+        self.donation.refresh_from_db()
+        self.assertEqual((self.donation.status, self.donation.authorization_code), ('completed', 'AUTH_1'))
+        self.assertEqual(len(mail.outbox), 1)
+
+        # Re-queueing the same event neither re-saves nor re-emails
+        PaystackEvent.objects.update(status='pending')
+        with self.captureOnCommitCallbacks(execute=True):
+            process_events()
+        self.assertEqual(len(mail.outbox), 1)
+
+    def test_transfer_events_update_disbursements(self):
+        leader = User.objects.create_user('treasurer', is_staff=True)
+        member = User.objects.create_user('member')
+        paid = Disbursement.objects.create(
+            authorized_by=leader, recipient=member, amount=Decimal('100'), status='PROCESSING', transaction_reference='TRF_1'
+        )
+        bounced = Disbursement.objects.create(
+            authorized_by=leader, recipient=member, amount=Decimal('100'), status='PROCESSING', transaction_reference='TRF_2'
+        )
+        self.deliver({'event': 'transfer.success', 'data': {'reference': 'TRF_1'}})
+        self.deliver({'event': 'transfer.failed', 'data': {'reference': 'TRF_2'}})
+        self.deliver({'event': 'subscription.create', 'data': {'id': 9}})
+
+        self.assertEqual(process_events(), (3, 0))
+        paid.refresh_from_db()
+        bounced.refresh_from_db()
+        self.assertEqual((paid.status, bounced.status), ('SUCCESS', 'FAILED'))
+        self.assertEqual(PaystackEvent.objects.get(event='subscription.create').status, 'ignored')
+
+    def test_a_bad_event_does_not_block_the_batch(self):
+        self.deliver(self.charge())
+        self.deliver({'event': 'transfer.success', 'data': {'reference': 'TRF_X'}})
+        with self.captureOnCommitCallbacks(execute=True), \
+                mock.patch('donations.events._apply_transfers', side_effect=RuntimeError('boom')):
+            self.assertEqual(process_events(), (1, 1))
+        self.donation.refresh_from_db()
+        self.assertEqual(self.donation.status, 'completed')
+        failed = PaystackEvent.objects.get(event='transfer.success')
+        self.assertEqual((failed.status, failed.attempts), ('pending', 1))
+
+
+class PaymentStatusTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.donation = Donation.objects.create(
+            donor_name='Musa', donor_phone='0800', amount=Decimal('2500'), payment_method='transfer', status='processing',
+        )
+
+    def test_status_is_served_from_cache(self):
+        url = reverse('payment_status', args=[self.donation.reference])
+        self.assertEqual(self.client.get(url).json()['status'], 'processing')
+        with self.assertNumQueries(0):
+            self.client.get(url)
+        self.assertEqual(self.client.get(reverse('payment_status', args=['DON-NOPE'])).status_code, 404)
+
+    def test_wait_returns_when_the_status_is_published(self):
+        get_status(self.donation.reference)
+        completed = Donation(reference=self.donation.reference, amount=self.donation.amount, status='completed')
+        timer = threading.Timer(0.2, publish, [completed])
+        timer.start()
+        started = time.monotonic()
+        payload = wait_for_change(self.donation.reference, 'processing', timeout=10)
+        timer.join()
+        self.assertEqual(payload['status'], 'completed')
+        self.assertLess(time.monotonic() - started, 5)
+
+    @override_settings(DONATION_STATUS_LONG_POLL=True)
+    def test_wait_times_out_with_the_unchanged_status(self):
+        card = Donation.objects.create(
+            donor_name='Musa', donor_phone='0800', amount=Decimal('2500'), payment_method='card', status='pending',
+        )
+        response = self.client.get(reverse('payment_status_wait', args=[card.reference]), {'since': 'pending', 'timeout': 0})
+        self.assertEqual(response.json(), {
+            'status': 'pending', 'amount': '2500.00', 'reference': card.reference, 'payment_method': 'card',
+            'changed': False, 'retry_after': 0,
+        })
+
+    def test_without_long_polling_the_page_is_told_when_to_retry(self):
+        started = time.monotonic()
+        response = self.client.get(
+            reverse('payment_status_wait', args=[self.donation.reference]), {'since': 'processing', 'timeout': 25}
+        )
+        self.assertLess(time.monotonic() - started, 1)
+        self.assertEqual((response.json()['changed'], response.json()['retry_after']), (False, 30))
+
+    @override_settings(DONATION_STATUS_LONG_POLL=True)
+    def test_bank_transfers_awaiting_confirmation_are_not_held(self):
+        started = time.monotonic()
+        response = self.client.get(
+            reverse('payment_status_wait', args=[self.donation.reference]), {'since': 'processing', 'timeout': 25}
+        )
+        self.assertLess(time.monotonic() - started, 1)
+        self.assertEqual(response.json()['retry_after'], 30)
+
+    @override_settings(DONATION_STATUS_MAX_WAITERS=0)
+    def test_waiters_are_capped(self):
+        started = time.monotonic()
+        payload = wait_for_change(self.donation.reference, 'processing', timeout=10)
+        self.assertEqual(payload['status'], 'processing')
+        self.assertLess(time.monotonic() - started, 1)
+
+    def test_saving_a_donation_refreshes_the_cache(self):
+        get_status(self.donation.reference)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.donation.mark_completed()
+        with self.assertNumQueries(0):
+            self.assertEqual(get_status(self.donation.reference)['status'], 'completed')
+
+
+class DonationRollupTests(TestCase):
+    def snapshot(self):
+        return set(DonationDailyRollup.objects.filter(count__gt=0).values_list(
+            'date', 'purpose', 'payment_method', 'status', 'count', 'amount'
+        ))
+
+    def make(self, amount, method='transfer', status='pending'):
+        return Donation.objects.create(
+            donor_name='Donor', donor_phone='0800', amount=Decimal(amount), payment_method=method, status=status,
+        )
+
+    def test_signals_and_transitions_match_a_rebuild(self):
+        first = self.make('1000')
+        second = self.make('250.50', method='card')
+        third = self.make('300')
+        first.mark_completed()
+        second.purpose = 'Sadaqah'
+        second.save()
+        Donation.objects.filter(pk__in=[second.pk, third.pk]).transition('failed')
+        self.make('75').delete()
+
+        incremental = self.snapshot()
+        rebuild()
+        self.assertEqual(self.snapshot(), incremental)
+        self.assertIn((timezone.localdate(), 'Zakka', 'transfer', 'failed', 1, Decimal('300')), incremental)
+
+    def test_admin_action_stamps_completed_at(self):
+        donation = self.make('500', status='processing')
+        admin = User.objects.create_superuser('root', 'root@example.org', 'pw')
+        self.client.force_login(admin)
+        self.client.post(reverse('admin:donations_donation_changelist'), {
+            'action': 'mark_as_completed', '_selected_action': [donation.pk],
+        })
+        donation.refresh_from_db()
+        self.assertEqual(donation.status, 'completed')
+        self.assertIsNotNone(donation.completed_at)
+        self.assertEqual(DonationDailyRollup.objects.get(status='completed').count, 1)
+
+    def test_analytics_page_reads_rollups(self):
+        self.make('1000').mark_completed()
+        self.make('400')
+        admin = User.objects.create_superuser('root', 'root@example.org', 'pw')
+        self.client.force_login(admin)
+        response = self.client.get(reverse('admin:donations_donationanalytics_changelist'))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.context['donation_count'], 2)
+        self.assertEqual(response.context['completed_donations'], Decimal('1000'))
+
+    def test_analytics_page_needs_the_view_permission(self):
+        leader = User.objects.create_user('leader', password='pw', is_staff=True)
+        self.client.force_login(leader)
+        url = reverse('admin:donations_donationanalytics_changelist')
+        self.assertEqual(self.client.get(url).status_code, 403)
+
+        leader.user_permissions.add(Permission.objects.get(codename='view_donationanalytics'))
+        self.client.force_login(User.objects.get(pk=leader.pk))
+        self.assertEqual(self.client.get(url).status_code, 200)
+
+    @override_settings(QUERY_BUDGET_MODE='raise', EMAIL_BACKEND='django.core.mail.backends.locmem.EmailBackend')
+    def test_bank_transfer_flow_stays_within_budget(self):
+        self.client.post(reverse('donation'), {
+            'donor_name': 'Fatima', 'donor_email': 'fatima@example.org', 'donor_phone': '0800',
+            'amount': '5000', 'purpose': 'Zakka', 'payment_method': 'transfer',
+        })
+        donation = Donation.objects.get()
+        self.client.post(reverse('bank_transfer_details', args=[donation.reference]))
+
+        staff = User.objects.create_user('treasurer', is_staff=True)
+        self.client.force_login(staff)
+        self.client.get(reverse('confirm_bank_transfer', args=[donation.reference]))
+        self.assertEqual(
+            list(DonationDailyRollup.objects.filter(count__gt=0).values_list('status', 'count')), [('completed', 1)]
+        )
+
+
+@override_settings(EMAIL_BACKEND='django.core.mail.backends.locmem.EmailBackend')
+class ReconcileTests(TestCase):
+    def make(self, reference, amount='1000', status='pending'):
+        return Donation.objects.create(
+            donor_name='Donor', donor_email='donor@example.org', donor_phone='0800',
+            amount=Decimal(amount), payment_method='card', status=status, reference=reference,
+        )
+
+    def test_settled_donations_are_resolved_and_the_rest_reported(self):
+        paid = self.make('DON-PAID')
+        short = self.make('DON-SHORT')
+        declined = self.make('DON-DECLINED', status='processing')
+        missing = self.make('DON-MISSING')
+        done = self.make('DON-DONE', status='completed')
+        session = make_session(4, FakePaystackAdapter({
+            'DON-PAID': {'status': 'success', 'amount': 100000},
+            'DON-SHORT': {'status': 'success', 'amount': 50000},
+            'DON-DECLINED': {'status': 'failed', 'amount': 100000},
+        }))
+
+        report = []
+        with self.captureOnCommitCallbacks(execute=True):
+            summary = reconcile(session, concurrency=4, page_size=2, report=report.append)
+
+        self.assertEqual(summary, {'checked': 4, 'completed': 1, 'failed': 1, 'mismatches': 2})
+        statuses = dict(Donation.objects.values_list('reference', 'status'))
+        self.assertEqual(statuses, {
+            paid.reference: 'completed', short.reference: 'pending', declined.reference: 'failed',
+            missing.reference: 'pending', done.reference: 'completed',
+        })
+        self.assertIsNotNone(Donation.objects.get(pk=paid.pk).completed_at)
+        self.assertEqual(
+            {(row['reference'], row['problem']) for row in report},
+            {('DON-SHORT', 'amount differs'), ('DON-MISSING', 'not found on Paystack')},
+        )
+        self.assertEqual(len(mail.outbox), 1)
+
+    def test_rows_settled_meanwhile_are_neither_receipted_nor_overwritten(self):
+        paid = self.make('DON-PAID')
+        declined = self.make('DON-DECLINED')
+        session = make_session(2, FakePaystackAdapter({
+            'DON-PAID': {'status': 'success', 'amount': 100000},
+            'DON-DECLINED': {'status': 'failed', 'amount': 100000},
+        }))
+
+        from . import reconcile as module
+        classify = module._classify
+
+        def webhook_wins(donation, result):
+            # The webhook worker completes both while Paystack is being asked
+            Donation.objects.filter(pk=donation.pk).update(status='completed')
+            return classify(donation, result)
+
+        with mock.patch.object(module, '_classify', side_effect=webhook_wins):
+            with self.captureOnCommitCallbacks(execute=True):
+                summary = reconcile(session, concurrency=2)
+
+        self.assertEqual((summary['completed'], summary['failed']), (0, 0))
+        self.assertEqual(set(Donation.objects.values_list('status', flat=True)), {'completed'})
+        self.assertEqual(len(mail.outbox), 0)
+
+    def test_dry_run_changes_nothing(self):
+        self.make('DON-PAID')
+        session = make_session(2, FakePaystackAdapter({'DON-PAID': {'status': 'success', 'amount': 100000}}))
+        summary = reconcile(session, dry_run=True)
+        self.assertEqual(summary['completed'], 1)
+        self.assertEqual(Donation.objects.get().status, 'pending')
+
+    def test_command_runs_offline(self):
+        for i in range(30):
+            self.make(f'DON-{i:04d}')
+        out = StringIO()
+        call_command('reconcile_paystack', '--fake', '--page-size', '7', '--report', os.devnull, stdout=out)
+        self.assertIn('Checked 30 donation(s)', out.getvalue())
+        self.assertLess(Donation.objects.filter(status='pending').count(), 30)
+
+
+@override_settings(EMAIL_BACKEND='django.core.mail.backends.locmem.EmailBackend')
+class BankStatementTests(TestCase):
+    def setUp(self):
+        self.donations = {
+            ref: Donation.objects.create(
+                donor_name='Donor', donor_phone='0800', amount=Decimal(amount),
+                payment_method='transfer', status='processing', reference=ref,
+            )
+            for ref, amount in [('DON-AAA111', '5000'), ('DON-BBB222', '2500'), ('DON-CCC333', '1200'), ('DON-DDD444', '750')]
+        }
+
+    def import_rows(self, text, fmt='auto'):
+        report = []
+        matched = match_statement(read_statement(StringIO(text), fmt), OpenDonationIndex(), report.append)
+        with self.captureOnCommitCallbacks(execute=True):
+            complete_matches(matched)
+        return {row['line']: row['result'] for row in report}
+
+    def status(self, reference):
+        return Donation.objects.get(reference=reference).status
+
+    def test_csv_credits_are_matched_by_reference_and_amount(self):
+        report = self.import_rows(
+            "Trans Date,Narration,Reference,Debit,Credit,Balance\n"
+            "01/03/2025,TRF FROM AISHA DON-AAA111-AISHA,FT001,,\"5,000.00\",5000\n"
+            "01/03/2025,BANK CHARGES,FT002,50.00,,4950\n"
+            "02/03/2025,NIP/DON-BBB222/MUSA,FT003,,2000.00,6950\n"
+            "02/03/2025,NIP/DON-AAA111 again,FT004,,5000.00,11950\n"
+            "03/03/2025,CASH DEPOSIT,FT005,,750.00,12700\n"
+        )
+        self.assertEqual(self.status('DON-AAA111'), 'completed')
+        self.assertEqual(Donation.objects.get(reference='DON-AAA111').transfer_reference, 'FT001')
+        self.assertEqual(self.status('DON-BBB222'), 'processing')
+        self.assertEqual(report, {4: 'amount mismatch', 5: 'duplicate', 6: 'unmatched'})
+        self.assertEqual(len(mail.outbox), 0)  # no donor emails on these rows
+
+    def test_mt940_statement(self):
+        self.import_rows(
+            ":20:STATEMENT\n"
+            ":25:1234567890\n"
+            ":60F:C250301NGN0,00\n"
+            ":61:2503010301C1200,00NTRFNONREF//BANKREF9\n"
+            ":86:TRANSFER FROM IBRAHIM\n"
+            "DON-CCC333 ZAKKA\n"
+            ":61:2503010301D50,00NCHGNONREF\n"
+            ":86:CHARGES DON-DDD444\n"
+            ":62F:C250301NGN1150,00\n"
+            "-\n"
+        )
+        self.assertEqual(self.status('DON-CCC333'), 'completed')
+        self.assertEqual(Donation.objects.get(reference='DON-CCC333').transfer_reference, 'BANKREF9')
+        self.assertEqual(self.status('DON-DDD444'), 'processing')
+
+    def test_donations_settled_after_matching_are_left_alone(self):
+        Donation.objects.filter(reference='DON-AAA111').update(donor_email='aisha@example.com')
+        report = []
+        matched = match_statement(
+            read_statement(StringIO("Date,Description,Reference,Credit\n2025-03-01,DON-AAA111,FT001,5000\n")),
+            OpenDonationIndex(), report.append,
+        )
+        # The Paystack webhook settles it between the read and the write
+        Donation.objects.filter(reference='DON-AAA111').update(status='completed')
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertEqual(complete_matches(matched), 0)
+        self.assertFalse(Donation.objects.get(reference='DON-AAA111').transfer_reference)
+        self.assertEqual(len(mail.outbox), 0)
+
+    def test_unreadable_statement_is_rejected(self):
+        with self.assertRaises(StatementError):
+            list(read_statement(StringIO("Foo,Bar\n1,2\n")))
+
+    def test_command_dry_run_changes_nothing(self):
+        path = os.path.join(self.tmpdir(), 'statement.csv')
+        with open(path, 'w', encoding='utf-8') as handle:
+            handle.write("Date,Description,Credit\n2025-03-01,DON-AAA111,5000\n2025-03-01,DON-BBB222,1\n")
+        out = StringIO()
+        call_command('import_bank_statement', path, '--dry-run', '--report', os.devnull, stdout=out)
+        self.assertIn('Would complete 1 donation(s); 1 credit(s) need review.', out.getvalue())
+        self.assertEqual(self.status('DON-AAA111'), 'processing')
+
+        call_command('import_bank_statement', path, '--report', os.devnull, stdout=out)
+        self.assertEqual(self.status('DON-AAA111'), 'completed')
+
+    def tmpdir(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        return directory.name
+
+
+class ReferenceTests(TestCase):
+    def test_references_are_unique_and_time_ordered(self):
+        references = new_references('DON', 5000)
+        self.assertEqual(len(set(references)), 5000)
+        self.assertEqual(references, sorted(references))
+        self.assertLess(abs((reference_time(references[0]) - timezone.now()).total_seconds()), 5)
+        self.assertIsNone(reference_time('DON-ABC123'))
+
+    def test_models_get_prefixed_references(self):
+        user = User.objects.create_user(username='payee', password='x')
+        first = Donation.objects.create(donor_name='A', donor_phone='1', amount=Decimal('10'))
+        second = Donation.objects.create(donor_name='B', donor_phone='2', amount=Decimal('10'))
+        payroll = PayrollRecord.objects.create(member=user, amount=Decimal('10'))
+        self.assertRegex(first.reference, r'^DON-[0-9A-Z]{26}$')
+        self.assertRegex(payroll.reference, r'^pay-[0-9a-z]{26}$')
+        self.assertLess(first.reference, second.reference)
+
+        # Bank statement matching still finds the new form inside a narration
+        Donation.objects.filter(pk=first.pk).update(payment_method='transfer', status='processing')
+        self.assertEqual(OpenDonationIndex().find(f"NIP/{first.reference.lower()}-AISHA").pk, first.pk)
+
+
+class GatewayRegistryTests(TestCase):
+    def setUp(self):
+        invalidate()
+        self.addCleanup(invalidate)  # the rows below are rolled back without signals
+
+    @override_settings(PAYSTACK_SECRET_KEY='sk_env', PAYSTACK_PUBLIC_KEY='pk_env')
+    def test_paystack_falls_back_to_settings(self):
+        paystack = get_gateway('paystack')
+        self.assertEqual((paystack.secret_key, paystack.public_key), ('sk_env', 'pk_env'))
+        with self.assertRaises(LookupError):
+            get_gateway('stripe')
+
+    def test_rows_are_cached_until_a_gateway_is_saved(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            row = PaymentGateway.objects.create(name='paystack', public_key='pk_db', secret_key='sk_db')
+        self.assertEqual(get_gateway('paystack').secret_key, 'sk_db')
+        with self.assertNumQueries(0):
+            self.assertEqual([g.name for g in active_gateways()], ['paystack'])
+            session = get_gateway('paystack').session
+        self.assertIs(get_gateway('paystack').session, session)
+        self.assertEqual(session.headers['Authorization'], 'Bearer sk_db')
+
+        row.secret_key = 'sk_rotated'
+        with self.captureOnCommitCallbacks(execute=True):
+            row.save()
+        self.assertEqual(get_gateway('paystack').secret_key, 'sk_rotated')
+        self.assertIsNot(get_gateway('paystack').session, session)
+
+
+@override_settings(PAYSTACK_SECRET_KEY='sk_fake', OUTBOUND_RETRY_BACKOFF=0, OUTBOUND_BREAKER_THRESHOLD=3)
+class OutboundClientTests(TestCase):
+    def setUp(self):
+        self.server = FakePaystackServer(secret_key='sk_fake').start()
+        self.addCleanup(self.server.stop)
+        self.client_ = outbound.Client('paystack', self.server.base_url, headers={'Authorization': 'Bearer sk_fake'})
+        self.addCleanup(self.client_.close)
+        outbound.reset()
+        self.addCleanup(outbound.reset)
+
+    def test_calls_reuse_one_keep_alive_connection(self):
+        for _ in range(3):
+            self.assertEqual(self.client_.get('/balance').status_code, 200)
+        self.assertEqual(self.server.connections, 1)
+        self.assertEqual(outbound._latency['paystack', 'GET /balance'].count, 3)
+
+    def test_idempotent_calls_are_retried_and_posts_are_not(self):
+        self.server.fail_next(2, status=503)
+        self.assertEqual(self.client_.get('/transaction/verify/DON-X').status_code, 404)
+        self.assertEqual(len(self.server.requests), 3)
+
+        self.server.fail_next(1, status=502)
+        self.assertEqual(self.client_.post('/transfer', json={'amount': 100}).status_code, 502)
+        self.assertEqual(len(self.server.requests), 4)
+        self.assertEqual(outbound._errors['paystack', 'GET /transaction/verify', 'status_503'], 2)
+
+    @override_settings(OUTBOUND_RETRIES=0, OUTBOUND_BREAKER_COOLDOWN=0.05)
+    def test_circuit_breaker_fails_fast_then_recovers(self):
+        self.server.fail_next(3, status=500)
+        for _ in range(3):
+            self.client_.get('/balance')
+        with self.assertRaises(outbound.CircuitOpenError):
+            self.client_.get('/balance')
+        self.assertEqual(len(self.server.requests), 3)
+
+        time.sleep(0.06)
+        self.assertEqual(self.client_.get('/balance').status_code, 200)  # half-open trial closes it
+        self.assertEqual(self.client_.get('/balance').status_code, 200)
+        self.assertIn('outbound_circuit_open{service="paystack"} 0', outbound.render_metrics())
+
+    @override_settings(OUTBOUND_RETRIES=2)
+    def test_retries_count_once_towards_the_breaker(self):
+        self.server.fail_next(6, status=503)
+        for _ in range(2):
+            self.assertEqual(self.client_.get('/balance').status_code, 503)
+        self.assertEqual(len(self.server.requests), 6)
+        self.assertFalse(outbound._breakers['paystack'].is_open())  # 2 failed calls, threshold 3
+
+        self.server.fail_next(3, status=503)
+        self.client_.get('/balance')
+        self.assertTrue(outbound._breakers['paystack'].is_open())
+
+    def test_paystack_helpers_run_against_the_fake(self):
+        invalidate()
+        with self.settings(PAYSTACK_BASE_URL=self.server.base_url):
+            self.assertEqual(get_paystack_balance(), 50000)
+            self.assertEqual(verify_bank_account('0123456789', '058'), 'FAKE ACCOUNT 6789')
+            member = User(first_name='Aisha', account_number='0123456789', bank_code='058')
+            self.assertEqual(initiate_paystack_transfer(member, '1500')['data']['amount'], 150000)
+            self.assertEqual(get_paystack_balance(), 48500)
+
+    @override_settings(OUTBOUND_METRICS_TOKEN='scrape-me')
+    def test_metrics_endpoint(self):
+        self.client_.get('/balance')
+        self.assertEqual(self.client.get('/metrics/outbound/').status_code, 403)
+        self.client.force_login(User.objects.create_user('leader', is_staff=True))
+        self.assertEqual(self.client.get('/metrics/outbound/').status_code, 403)
+        self.client.force_login(User.objects.create_superuser('admin'))
+        self.assertEqual(self.client.get('/metrics/outbound/').status_code, 200)
+        self.client.logout()
+        response = self.client.get('/metrics/outbound/', HTTP_AUTHORIZATION='Bearer scrape-me')
+        self.assertContains(
+            response, 'outbound_request_duration_seconds_count{service="paystack",endpoint="GET /balance"} 1'
+        )
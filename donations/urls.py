@@ -11,6 +11,7 @@ urlpatterns = [
     path('success/<str:reference>/', views.payment_success, name='payment_success'),
     path('pending/<str:reference>/', views.payment_pending, name='payment_pending'),
     path('status/<str:reference>/', views.payment_status, name='payment_status'),
+    path('status/<str:reference>/wait/', views.payment_status_wait, name='payment_status_wait'),
     path('webhook/paystack/', views.paystack_webhook, name='paystack_webhook'),
     path('admin/confirm-transfer/<str:reference>/', views.confirm_bank_transfer, name='confirm_bank_transfer'),
 ]
\ No newline at end of file
@@ -1,15 +1,17 @@
 from django.shortcuts import render, redirect, get_object_or_404
-from django.http import JsonResponse, HttpResponse
+from django.http import Http404, JsonResponse, HttpResponse
 from django.views.decorators.csrf import csrf_exempt
 from django.views.decorators.http import require_http_methods
-from django.conf import settings
 from django.contrib import messages
 import json
-import requests
 import hashlib
 import hmac
 
-from .models import Donation, PaymentGateway
+from .emails import send_confirmation_email
+from .events import record_event
+from .gateways import active_gateways, get_gateway
+from .models import Donation
+from .status import MAX_WAIT, get_status, poll_interval, should_wait, wait_for_change
 from .forms import DonationForm, CardPaymentForm
 
 def donation_view(request):
@@ -29,7 +31,7 @@ def donation_view(request):
     else:
         form = DonationForm()
 
-    gateways = PaymentGateway.objects.filter(is_active=True)
+    gateways = active_gateways()
     return render(request, 'donations/donation_form.html', {
         'form': form,
         'gateways': gateways
@@ -68,7 +70,7 @@ def process_card_payment(request, reference):
     return render(request, 'donations/card_payment.html', {
         'donation': donation,
         'card_form': card_form,
-        'paystack_public_key': getattr(settings, 'PAYSTACK_PUBLIC_KEY', '')
+        'paystack_public_key': get_gateway('paystack').public_key
     })
 
 def bank_transfer_details(request, reference):
@@ -103,18 +105,34 @@ def payment_pending(request, reference):
     return render(request, 'donations/payment_pending.html', {'donation': donation})
 
 def payment_status(request, reference):
-    donation = get_object_or_404(Donation, reference=reference)
-    return JsonResponse({
-        'status': donation.status,
-        'amount': str(donation.amount),
-        'reference': donation.reference
-    })
+    payload = get_status(reference)
+    if payload is None:
+        raise Http404("Donation not found")
+    return JsonResponse(payload)
+
+def payment_status_wait(request, reference):
+    """
+    Long-poll: answers once the status differs from ?since= or after ?timeout=
+    seconds. Where long-polling is off or not worth it (donations/status.py)
+    it answers at once, with `retry_after` seconds for the next check.
+    """
+    since = request.GET.get('since')
+    try:
+        timeout = max(0.0, min(float(request.GET.get('timeout', 25)), MAX_WAIT))
+    except ValueError:
+        timeout = 25
+    payload = get_status(reference)
+    if payload is None:
+        raise Http404("Donation not found")
+    retry_after = poll_interval()
+    if since and payload['status'] == since and should_wait(payload):
+        payload = wait_for_change(reference, since, timeout) or payload
+        retry_after = 0
+    return JsonResponse(dict(payload, changed=payload['status'] != since, retry_after=retry_after))
 
 # Payment Gateway Integration
 def process_paystack_payment(donation, card_data):
     """Process payment using Paystack"""
-    paystack_secret = getattr(settings, 'PAYSTACK_SECRET_KEY', '')
-
     # Prepare payment data
     payment_data = {
         'email': donation.donor_email or 'donor@example.com',
@@ -129,18 +147,9 @@ def process_paystack_payment(donation, card_data):
 
     # In a real implementation, you would use Paystack's charge endpoint
     # For security, card details should be handled via Paystack.js on frontend
-    headers = {
-        'Authorization': f'Bearer {paystack_secret}',
-        'Content-Type': 'application/json'
-    }
-
     try:
         # This is a simplified version - in production, use proper card tokenization
-        response = requests.post(
-            'https://api.paystack.co/transaction/initialize',
-            json=payment_data,
-            headers=headers
-        )
+        response = get_gateway('paystack').post('/transaction/initialize', json=payment_data)
 
         if response.status_code == 200:
             data = response.json()
@@ -183,7 +192,7 @@ def detect_card_type(card_number):
 @require_http_methods(["POST"])
 def paystack_webhook(request):
     """Handle Paystack webhook for payment verification"""
-    paystack_secret = getattr(settings, 'PAYSTACK_SECRET_KEY', '')
+    paystack_secret = get_gateway('paystack').signing_secret
 
     # Verify webhook signature
     signature = request.headers.get('x-paystack-signature')
@@ -201,36 +210,16 @@ def paystack_webhook(request):
     if not hmac.compare_digest(computed_signature, signature):
         return HttpResponse(status=400)
 
-    # Process the webhook
+    # Store the event and acknowledge; donations/events.py applies it later
     try:
         data = json.loads(body)
-        event = data.get('event')
-
-        if event == 'charge.success':
-            reference = data.get('data', {}).get('reference')
-
-            try:
-                donation = Donation.objects.get(reference=reference)
-                donation.status = 'completed'
-                donation.authorization_code = data.get('data', {}).get('authorization', {}).get('authorization_code')
-                donation.save()
-
-                # Send confirmation email (implement email sending logic)
-                send_confirmation_email(donation)
-
-            except Donation.DoesNotExist:
-                pass
-
-        return JsonResponse({'status': 'success'})
-
     except json.JSONDecodeError:
         return HttpResponse(status=400)
+    if not isinstance(data, dict):
+        return HttpResponse(status=400)
 
-def send_confirmation_email(donation):
-    """Send confirmation email to donor"""
-    # Implement email sending logic here
-    # You can use Django's send_mail function
-    pass
+    record_event(data)
+    return JsonResponse({'status': 'success'})
 
 # Admin function to confirm bank transfers
 def confirm_bank_transfer(request, reference):
@@ -241,6 +230,7 @@ def confirm_bank_transfer(request, reference):
 
     if donation.payment_method == 'transfer' and donation.status == 'processing':
         donation.mark_completed()
+        send_confirmation_email(donation)
         messages.success(request, f'Bank transfer confirmed for {donation.donor_name}')
 
     return redirect('admin:donations_donation_changelist')
\ No newline at end of file
@@ -0,0 +1,156 @@
+import mimetypes
+import os
+import re
+
+from django.conf import settings
+from django.core.exceptions import SuspiciousFileOperation
+from django.http import FileResponse, Http404, HttpResponse
+from django.utils._os import safe_join
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date, parse_http_date_safe, quote_etag
+from django.views.decorators.http import require_safe
+
+RANGE_RE = re.compile(r'^bytes=(\d*)-(\d*)$')
+
+
+class RangeFileWrapper:
+    """
+    Read-only view over a slice of an open file.
+    FileResponse streams it block by block and stops after `length` bytes.
+    """
+
+    def __init__(self, filelike, start, length):
+        self.filelike = filelike
+        self.remaining = length
+        filelike.seek(start)
+
+    def read(self, size=-1):
+        if self.remaining <= 0:
+            return b''
+        if size < 0 or size > self.remaining:
+            size = self.remaining
+        data = self.filelike.read(size)
+        self.remaining -= len(data)
+        return data
+
+    def close(self):
+        self.filelike.close()
+
+
+def parse_range_header(header, size):
+    """
+    Returns (start, end) for a single satisfiable byte range, None when the
+    header should be ignored (missing or multi-range), or False when the
+    range cannot be satisfied.
+    """
+    if not header or ',' in header:
+        return None
+    match = RANGE_RE.match(header.strip())
+    if not match:
+        return None
+
+    first, last = match.groups()
+    if not first and not last:
+        return None
+
+    if not first:
+        # Suffix range: the last N bytes of the file
+        length = int(last)
+        if length == 0:
+            return False
+        return max(size - length, 0), size - 1
+
+    start = int(first)
+    end = int(last) if last else size - 1
+    if start >= size or end < start:
+        return False
+    return start, min(end, size - 1)
+
+
+def file_etag(stat):
+    return quote_etag(f"{int(stat.st_mtime):x}-{stat.st_size:x}")
+
+
+def sendfile_response(relative_path, full_path, content_type):
+    """Hands the transfer over to the front proxy (nginx or Apache)."""
+    response = HttpResponse(content_type=content_type)
+    backend = settings.MEDIA_SENDFILE_BACKEND
+    if backend == 'nginx':
+        prefix = settings.MEDIA_SENDFILE_PREFIX.rstrip('/')
+        response['X-Accel-Redirect'] = f"{prefix}/{relative_path}"
+    elif backend == 'apache':
+        response['X-Sendfile'] = full_path
+    else:
+        raise ValueError(f"Unknown MEDIA_SENDFILE_BACKEND: {backend}")
+    return response
+
+
+@require_safe
+def serve_media(request, path):
+    """
+    Serves uploaded files from MEDIA_ROOT with byte-range support so the
+    browser can seek inside videos without downloading them from the start.
+    """
+    try:
+        full_path = safe_join(settings.MEDIA_ROOT, path)
+    except SuspiciousFileOperation:
+        raise Http404("Invalid media path")
+
+    try:
+        stat = os.stat(full_path)
+    except OSError:
+        raise Http404("Media file not found")
+    if not os.path.isfile(full_path):
+        raise Http404("Media file not found")
+
+    etag = file_etag(stat)
+    last_modified = int(stat.st_mtime)
+
+    # 1. Conditional GET (If-None-Match / If-Modified-Since)
+    conditional = get_conditional_response(request, etag=etag, last_modified=last_modified)
+    if conditional is not None:
+        conditional['ETag'] = etag
+        return conditional
+
+    content_type, _ = mimetypes.guess_type(full_path)
+    content_type = content_type or 'application/octet-stream'
+
+    # 2. Let the front proxy stream the bytes (it also handles ranges itself)
+    if settings.MEDIA_SENDFILE_BACKEND:
+        response = sendfile_response(path.replace(os.sep, '/'), full_path, content_type)
+    else:
+        size = stat.st_size
+        byte_range = parse_range_header(request.META.get('HTTP_RANGE'), size)
+
+        # If-Range: only honour the range when the client's copy is current
+        if_range = request.META.get('HTTP_IF_RANGE')
+        if byte_range and if_range:
+            if_range_date = parse_http_date_safe(if_range)
+            if if_range != etag and (if_range_date is None or if_range_date < last_modified):
+                byte_range = None
+
+        if byte_range is False:
+            response = HttpResponse(status=416)
+            response['Content-Range'] = f"bytes */{size}"
+            response['Accept-Ranges'] = 'bytes'
+            return response
+
+        if byte_range:
+            start, end = byte_range
+            length = end - start + 1
+            response = FileResponse(
+                RangeFileWrapper(open(full_path, 'rb'), start, length),
+                content_type=content_type,
+                status=206,
+            )
+            response['Content-Length'] = str(length)
+            response['Content-Range'] = f"bytes {start}-{end}/{size}"
+        else:
+            # Full file: WSGI servers use os.sendfile via wsgi.file_wrapper
+            response = FileResponse(open(full_path, 'rb'), content_type=content_type)
+
+    response['Accept-Ranges'] = 'bytes'
+    response['ETag'] = etag
+    response['Last-Modified'] = http_date(last_modified)
+    patch_cache_control(response, public=True, max_age=settings.MEDIA_CACHE_MAX_AGE)
+    return response
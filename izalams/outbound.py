@@ -0,0 +1,258 @@
+"""
+Shared client for outbound HTTP calls (Paystack and friends).
+
+One Client per service keeps a keep-alive requests.Session pool and adds,
+around every call:
+
+- per-endpoint timeouts (OUTBOUND_TIMEOUTS, falling back to DEFAULT_TIMEOUTS
+  and then DEFAULT_TIMEOUT), unless the caller passes `timeout=`;
+- retries with full-jitter exponential backoff for idempotent methods on
+  connection errors, timeouts, 429 and 5xx; POSTs are never retried unless
+  the caller says `idempotent=True`, so a transfer is not sent twice;
+- a per-service circuit breaker: OUTBOUND_BREAKER_THRESHOLD consecutive
+  failed calls (a call and its retries count once) open it for
+  OUTBOUND_BREAKER_COOLDOWN seconds, during which calls fail fast with
+  CircuitOpenError (a requests.ConnectionError, so existing handlers keep
+  working); one trial call is let through after the cooldown;
+- latency histograms and error counters per (service, endpoint), served in
+  Prometheus text format by metrics_view at /metrics/outbound/.
+
+An endpoint is named after the method and the first two path segments,
+e.g. "GET /transaction/verify", so references in the URL do not explode
+the metric labels. Metrics live in process memory: scrape every worker.
+"""
+import random
+import threading
+import time
+from collections import defaultdict
+from urllib.parse import urlsplit
+
+import requests
+from django.conf import settings
+from django.http import HttpResponse, HttpResponseForbidden
+from requests.adapters import HTTPAdapter
+
+DEFAULT_TIMEOUT = (5, 20)  # (connect, read) seconds
+
+DEFAULT_TIMEOUTS = {
+    'paystack': {
+        'GET /balance': (3, 5),
+        'GET /bank/resolve': (3, 10),
+        'GET /transaction/verify': (3, 15),
+        'POST /transaction/initialize': (5, 20),
+        'POST /transferrecipient': (5, 20),
+        'POST /transfer': (5, 30),
+    },
+}
+
+IDEMPOTENT_METHODS = frozenset(['GET', 'HEAD', 'OPTIONS', 'PUT', 'DELETE'])
+RETRY_STATUSES = frozenset([429, 500, 502, 503, 504])
+
+BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, float('inf'))
+
+
+class CircuitOpenError(requests.ConnectionError):
+    pass
+
+
+def _setting(name, default):
+    return getattr(settings, name, default)
+
+
+def endpoint_name(method, path):
+    segments = [segment for segment in urlsplit(path).path.split('/') if segment]
+    return f"{method.upper()} /{'/'.join(segments[:2])}"
+
+
+# --- Metrics ---
+
+class _Histogram:
+    __slots__ = ('counts', 'total', 'count')
+
+    def __init__(self):
+        self.counts = [0] * len(BUCKETS)
+        self.total = 0.0
+        self.count = 0
+
+    def observe(self, seconds):
+        self.count += 1
+        self.total += seconds
+        for i, bound in enumerate(BUCKETS):
+            if seconds <= bound:
+                self.counts[i] += 1
+                break
+
+
+_metrics_lock = threading.Lock()
+_latency = defaultdict(_Histogram)
+_errors = defaultdict(int)
+
+
+def _observe(service, endpoint, seconds=None, error=None):
+    with _metrics_lock:
+        if seconds is not None:
+            _latency[service, endpoint].observe(seconds)
+        if error:
+            _errors[service, endpoint, error] += 1
+
+
+def _label(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"')
+
+
+def render_metrics():
+    lines = [
+        '# HELP outbound_request_duration_seconds Outbound HTTP call latency.',
+        '# TYPE outbound_request_duration_seconds histogram',
+    ]
+    with _metrics_lock:
+        latency = {key: (list(h.counts), h.total, h.count) for key, h in _latency.items()}
+        errors = dict(_errors)
+    for (service, endpoint), (counts, total, count) in sorted(latency.items()):
+        labels = f'service="{_label(service)}",endpoint="{_label(endpoint)}"'
+        cumulative = 0
+        for bound, bucket in zip(BUCKETS, counts):
+            cumulative += bucket
+            le = '+Inf' if bound == float('inf') else repr(bound)
+            lines.append(f'outbound_request_duration_seconds_bucket{{{labels},le="{le}"}} {cumulative}')
+        lines.append(f'outbound_request_duration_seconds_sum{{{labels}}} {total:.6f}')
+        lines.append(f'outbound_request_duration_seconds_count{{{labels}}} {count}')
+
+    lines += [
+        '# HELP outbound_request_errors_total Outbound HTTP failures by kind.',
+        '# TYPE outbound_request_errors_total counter',
+    ]
+    for (service, endpoint, kind), count in sorted(errors.items()):
+        lines.append(
+            f'outbound_request_errors_total{{service="{_label(service)}",endpoint="{_label(endpoint)}",'
+            f'kind="{_label(kind)}"}} {count}'
+        )
+
+    lines += [
+        '# HELP outbound_circuit_open 1 while the service circuit breaker is open.',
+        '# TYPE outbound_circuit_open gauge',
+    ]
+    for service, breaker in sorted(_breakers.items()):
+        lines.append(f'outbound_circuit_open{{service="{_label(service)}"}} {int(breaker.is_open())}')
+    return '\n'.join(lines) + '\n'
+
+
+# --- Circuit breaker ---
+
+class CircuitBreaker:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.failures = 0
+        self.opened_at = None
+        self.trial = False
+
+    def is_open(self):
+        return self.opened_at is not None
+
+    def allow(self):
+        with self.lock:
+            if self.opened_at is None:
+                return True
+            cooldown = _setting('OUTBOUND_BREAKER_COOLDOWN', 30)
+            if not self.trial and time.monotonic() - self.opened_at >= cooldown:
+                self.trial = True  # half-open: let one call through
+                return True
+            return False
+
+    def record(self, ok):
+        with self.lock:
+            if ok:
+                self.failures, self.opened_at, self.trial = 0, None, False
+                return
+            self.failures += 1
+            if self.trial or self.failures >= _setting('OUTBOUND_BREAKER_THRESHOLD', 5):
+                self.opened_at, self.trial = time.monotonic(), False
+
+
+_breakers = defaultdict(CircuitBreaker)
+
+
+def reset():
+    """Forgets metrics and breaker state (tests)."""
+    with _metrics_lock:
+        _latency.clear()
+        _errors.clear()
+    _breakers.clear()
+
+
+# --- Client ---
+
+class Client:
+    """
+    Outbound calls to one service. `base_url` is prefixed to relative paths;
+    `adapter` replaces the pooled HTTPAdapter (offline fakes).
+    """
+
+    def __init__(self, service, base_url, headers=None, pool_size=10, adapter=None):
+        self.service = service
+        self.base_url = base_url.rstrip('/')
+        self.session = requests.Session()
+        self.session.headers.update(headers or {})
+        self.session.mount(self.base_url or 'https://', adapter or HTTPAdapter(pool_connections=1, pool_maxsize=pool_size))
+
+    def timeout_for(self, endpoint):
+        configured = _setting('OUTBOUND_TIMEOUTS', {}).get(self.service, {})
+        return configured.get(endpoint) or DEFAULT_TIMEOUTS.get(self.service, {}).get(endpoint) or DEFAULT_TIMEOUT
+
+    def request(self, method, path, endpoint=None, idempotent=None, **kwargs):
+        method = method.upper()
+        endpoint = endpoint or endpoint_name(method, path)
+        url = path if '://' in path else f"{self.base_url}/{path.lstrip('/')}"
+        if kwargs.get('timeout') is None:
+            kwargs['timeout'] = self.timeout_for(endpoint)
+        if idempotent is None:
+            idempotent = method in IDEMPOTENT_METHODS
+        retries = _setting('OUTBOUND_RETRIES', 2) if idempotent else 0
+        breaker = _breakers[self.service]
+
+        if not breaker.allow():
+            _observe(self.service, endpoint, error='circuit_open')
+            raise CircuitOpenError(f"{self.service} circuit open; not calling {endpoint}")
+
+        # The breaker hears the outcome of the whole call once, after its retries
+        attempt = 0
+        while True:
+            started = time.monotonic()
+            try:
+                response = self.session.request(method, url, **kwargs)
+            except requests.RequestException as exc:
+                kind = 'timeout' if isinstance(exc, requests.Timeout) else 'connection'
+                _observe(self.service, endpoint, time.monotonic() - started, kind)
+                if attempt >= retries:
+                    breaker.record(ok=False)
+                    raise
+            else:
+                status = response.status_code
+                _observe(self.service, endpoint, time.monotonic() - started,
+                         f'status_{status}' if status in RETRY_STATUSES else None)
+                if status not in RETRY_STATUSES or attempt >= retries:
+                    breaker.record(ok=status < 500)
+                    return response
+                response.close()
+
+            attempt += 1
+            base = _setting('OUTBOUND_RETRY_BACKOFF', 0.25)
+            time.sleep(random.uniform(0, base * (2 ** attempt)))
+
+    def get(self, path, **kwargs):
+        return self.request('GET', path, **kwargs)
+
+    def post(self, path, **kwargs):
+        return self.request('POST', path, **kwargs)
+
+    def close(self):
+        self.session.close()
+
+
+def metrics_view(request):
+    """Prometheus scrape target: superusers, or `Authorization: Bearer <OUTBOUND_METRICS_TOKEN>`."""
+    token = _setting('OUTBOUND_METRICS_TOKEN', '')
+    authorized = bool(token) and request.headers.get('Authorization') == f'Bearer {token}'
+    if not authorized and not request.user.is_superuser:
+        return HttpResponseForbidden()
+    return HttpResponse(render_metrics(), content_type='text/plain; version=0.0.4; charset=utf-8')
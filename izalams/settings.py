@@ -62,8 +62,11 @@ AXES_IP_LOOKUP_PARAMETERS = ['HTTP_X_FORWARDED_FOR']
 AXES_LOCKOUT_PARAMETERS = ['username', 'ip_address']
 
 MIDDLEWARE = [
+    # First, so the session, auth and axes queries are profiled too
+    'accounts.middleware.QueryProfilerMiddleware',  # no-op unless QUERY_PROFILER=True
     'django.middleware.security.SecurityMiddleware',
     'whitenoise.middleware.WhiteNoiseMiddleware', # For static files on Hostinger
+    'accounts.middleware.QueryBudgetMiddleware',  # see accounts/budgets.py
     'django.contrib.sessions.middleware.SessionMiddleware', # REQUIRED for Admin/Login
     'django.middleware.locale.LocaleMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -71,7 +74,7 @@ MIDDLEWARE = [
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
-    'axes.middleware.AxesMiddleware'
+    'axes.middleware.AxesMiddleware',
 ]
 
 ROOT_URLCONF = 'izalams.urls'
@@ -102,6 +105,42 @@ DATABASES = {
     }
 }
 
+# --- CACHE ---
+# LocMem is per process; point CACHE_BACKEND at a shared backend (e.g.
+# django.core.cache.backends.filebased.FileBasedCache or Redis) when running
+# several workers so cache invalidation reaches all of them.
+CACHES = {
+    'default': {
+        'BACKEND': os.getenv('CACHE_BACKEND', 'django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': os.getenv('CACHE_LOCATION', 'izalams'),
+    }
+}
+PAGE_CACHE_TIMEOUT = 60 * 15
+
+# Seconds a donation's status is served from cache to donors waiting on it
+DONATION_STATUS_TTL = 5
+# Hold status requests open until the donation changes. Leave off under WSGI
+# (PythonAnywhere): each waiting donor would tie up a worker. Pages then
+# re-check every DONATION_STATUS_POLL_INTERVAL seconds instead.
+DONATION_STATUS_LONG_POLL = os.getenv('DONATION_STATUS_LONG_POLL') == 'True'
+DONATION_STATUS_MAX_WAITERS = 4  # per process
+DONATION_STATUS_POLL_INTERVAL = 30
+
+# Newest N announcements shown in each unit's dashboard feed
+ANNOUNCEMENT_FEED_LIMIT = 20
+
+# --- QUERY PROFILER ---
+# Per-request SQL capture with N+1 detection (accounts/middleware.py).
+# Off by default; slow or N+1 requests are appended to QUERY_PROFILER_LOG.
+QUERY_PROFILER = os.getenv('QUERY_PROFILER') == 'True'
+QUERY_PROFILER_N_PLUS_ONE = 5  # same fingerprint this many times => flagged
+QUERY_PROFILER_SLOW_MS = 500
+QUERY_PROFILER_LOG = BASE_DIR / 'logs' / 'slow_requests.jsonl'
+QUERY_PROFILER_LOG_MAX_BYTES = 5 * 1024 * 1024
+
+# Per-view query budgets (accounts/budgets.py): 'off', 'warn' or 'raise'
+QUERY_BUDGET_MODE = os.getenv('QUERY_BUDGET_MODE', 'off')
+
 # --- AUTHENTICATION & REDIRECTS ---
 # This fixes your redirection issues
 LOGIN_REDIRECT_URL = 'dashboard'
@@ -143,8 +182,28 @@ AUTH_USER_MODEL = 'accounts.User'
 STATIC_ROOT = os.path.join(BASE_DIR, 'staticfiles')
 MEDIA_ROOT = BASE_DIR / 'media'
 
+# Media serving (videos/gallery). Django serves /media/ itself with byte-range
+# support when SERVE_MEDIA is on; set MEDIA_SENDFILE_BACKEND to 'nginx'
+# (X-Accel-Redirect) or 'apache' (X-Sendfile) to let the front proxy stream files.
+SERVE_MEDIA = DEBUG or os.getenv('SERVE_MEDIA') == 'True'
+MEDIA_SENDFILE_BACKEND = os.getenv('MEDIA_SENDFILE_BACKEND') or None
+MEDIA_SENDFILE_PREFIX = os.getenv('MEDIA_SENDFILE_PREFIX', '/protected-media/')
+MEDIA_CACHE_MAX_AGE = 60 * 60 * 24 * 7
+
+# Responsive image derivatives (see accounts/images.py): widths rendered
+# as WebP + JPEG under MEDIA_ROOT/derivatives/ and emitted as srcset.
+IMAGE_DERIVATIVE_PRESETS = {
+    'gallery': (480, 960, 1440),
+    'avatar': (96, 200),
+}
+
 # Email Settings
-EMAIL_BACKEND = 'django.core.mail.backends.smtp.EmailBackend'
+# Mail is queued in the OutboundEmail table (accounts/mail.py) and delivered
+# by `manage.py send_queued_mail` through EMAIL_DELIVERY_BACKEND.
+EMAIL_BACKEND = 'accounts.mail.QueuedEmailBackend'
+EMAIL_DELIVERY_BACKEND = 'django.core.mail.backends.smtp.EmailBackend'
+EMAIL_OUTBOX_MAX_ATTEMPTS = 6
+EMAIL_OUTBOX_RETRY_BASE = 60  # seconds; doubles after every failed attempt
 EMAIL_HOST = 'smtp.gmail.com'
 EMAIL_PORT = 587
 EMAIL_USE_TLS = True
@@ -158,5 +217,14 @@ DEFAULT_FROM_EMAIL = EMAIL_HOST_USER
 # Paystack
 PAYSTACK_SECRET_KEY = os.getenv('PAYSTACK_SECRET_KEY')
 PAYSTACK_PUBLIC_KEY = os.getenv('PAYSTACK_PUBLIC_KEY')
+PAYSTACK_BASE_URL = os.getenv('PAYSTACK_BASE_URL', 'https://api.paystack.co')
+
+# Outbound HTTP client (izalams/outbound.py)
+OUTBOUND_RETRIES = int(os.getenv('OUTBOUND_RETRIES', 2))  # idempotent calls only
+OUTBOUND_RETRY_BACKOFF = float(os.getenv('OUTBOUND_RETRY_BACKOFF', 0.25))
+OUTBOUND_BREAKER_THRESHOLD = int(os.getenv('OUTBOUND_BREAKER_THRESHOLD', 5))
+OUTBOUND_BREAKER_COOLDOWN = float(os.getenv('OUTBOUND_BREAKER_COOLDOWN', 30))
+OUTBOUND_TIMEOUTS = {}  # {'paystack': {'POST /transfer': (5, 30)}} overrides the defaults
+OUTBOUND_METRICS_TOKEN = os.getenv('OUTBOUND_METRICS_TOKEN', '')
 
 # Email
@@ -0,0 +1,118 @@
+import os
+import tempfile
+
+from django.http import Http404
+from django.test import RequestFactory, SimpleTestCase, override_settings
+from django.utils.http import http_date
+
+from .media import parse_range_header, serve_media
+
+CONTENT = bytes(range(256)) * 4  # 1024 bytes
+
+
+class RangeHeaderTests(SimpleTestCase):
+    def test_single_ranges(self):
+        self.assertEqual(parse_range_header('bytes=0-99', 1024), (0, 99))
+        self.assertEqual(parse_range_header('bytes=1000-', 1024), (1000, 1023))
+        self.assertEqual(parse_range_header('bytes=1000-5000', 1024), (1000, 1023))  # clamped to the file
+
+    def test_suffix_ranges(self):
+        self.assertEqual(parse_range_header('bytes=-24', 1024), (1000, 1023))
+        self.assertEqual(parse_range_header('bytes=-5000', 1024), (0, 1023))
+        self.assertIs(parse_range_header('bytes=-0', 1024), False)
+
+    def test_unsatisfiable_ranges(self):
+        self.assertIs(parse_range_header('bytes=1024-', 1024), False)
+        self.assertIs(parse_range_header('bytes=50-10', 1024), False)
+
+    def test_malformed_and_multi_range_headers_are_ignored(self):
+        for header in (None, '', 'bytes=-', 'bytes=a-b', 'items=0-10', 'bytes 0-10', 'bytes=0-10,20-30'):
+            with self.subTest(header=header):
+                self.assertIsNone(parse_range_header(header, 1024))
+
+
+class ServeMediaTests(SimpleTestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        os.makedirs(os.path.join(directory.name, 'videos'))
+        self.path = os.path.join(directory.name, 'videos', 'khutbah.mp4')
+        with open(self.path, 'wb') as handle:
+            handle.write(CONTENT)
+        settings = override_settings(MEDIA_ROOT=directory.name, MEDIA_SENDFILE_BACKEND=None)
+        settings.enable()
+        self.addCleanup(settings.disable)
+        self.factory = RequestFactory()
+
+    def get(self, path='videos/khutbah.mp4', **headers):
+        response = serve_media(self.factory.get(f'/media/{path}', headers=headers), path)
+        self.addCleanup(response.close)
+        return response
+
+    def body(self, response):
+        return b''.join(response.streaming_content)
+
+    def test_full_file(self):
+        response = self.get()
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], 'video/mp4')
+        self.assertEqual(response['Accept-Ranges'], 'bytes')
+        self.assertEqual(self.body(response), CONTENT)
+
+    def test_range_request_returns_partial_content(self):
+        response = self.get(Range='bytes=100-199')
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(response['Content-Range'], 'bytes 100-199/1024')
+        self.assertEqual(response['Content-Length'], '100')
+        self.assertEqual(self.body(response), CONTENT[100:200])
+
+    def test_suffix_range(self):
+        response = self.get(Range='bytes=-24')
+        self.assertEqual(response['Content-Range'], 'bytes 1000-1023/1024')
+        self.assertEqual(self.body(response), CONTENT[-24:])
+
+    def test_unsatisfiable_range(self):
+        response = self.get(Range='bytes=2048-')
+        self.assertEqual(response.status_code, 416)
+        self.assertEqual(response['Content-Range'], 'bytes */1024')
+
+    def test_malformed_and_multi_range_headers_get_the_whole_file(self):
+        for header in ('bytes=abc', 'bytes=0-10,20-30'):
+            with self.subTest(header=header):
+                response = self.get(Range=header)
+                self.assertEqual(response.status_code, 200)
+                self.assertEqual(self.body(response), CONTENT)
+
+    def test_if_range(self):
+        etag = self.get()['ETag']
+        self.assertEqual(self.get(Range='bytes=0-9', If_Range=etag).status_code, 206)
+        self.assertEqual(self.get(Range='bytes=0-9', If_Range=http_date(os.stat(self.path).st_mtime)).status_code, 206)
+        # The client's copy is stale: send the whole file instead
+        self.assertEqual(self.get(Range='bytes=0-9', If_Range='"stale"').status_code, 200)
+        self.assertEqual(self.get(Range='bytes=0-9', If_Range=http_date(0)).status_code, 200)
+
+    def test_conditional_get(self):
+        first = self.get()
+        response = self.get(If_None_Match=first['ETag'])
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response['ETag'], first['ETag'])
+        self.assertEqual(self.get(If_Modified_Since=first['Last-Modified']).status_code, 304)
+        self.assertEqual(self.get(If_None_Match='"other"').status_code, 200)
+
+    def test_missing_and_escaping_paths(self):
+        for path in ('videos/missing.mp4', 'videos', '../settings.py'):
+            with self.subTest(path=path), self.assertRaises(Http404):
+                self.get(path)
+
+    @override_settings(MEDIA_SENDFILE_BACKEND='nginx', MEDIA_SENDFILE_PREFIX='/protected-media/')
+    def test_nginx_accel_redirect(self):
+        response = self.get(Range='bytes=0-9')
+        self.assertEqual(response.status_code, 200)  # nginx applies the range itself
+        self.assertEqual(response['X-Accel-Redirect'], '/protected-media/videos/khutbah.mp4')
+        self.assertEqual(response.content, b'')
+
+    @override_settings(MEDIA_SENDFILE_BACKEND='apache')
+    def test_apache_sendfile(self):
+        response = self.get()
+        self.assertEqual(response['X-Sendfile'], self.path)
+        self.assertIn('ETag', response)
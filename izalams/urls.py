@@ -1,14 +1,20 @@
 from django.conf import settings
 from django.contrib import admin
-from django.urls import include, path
-from django.conf.urls.static import static
+from django.urls import include, path, re_path
+
+from .media import serve_media
+from .outbound import metrics_view as outbound_metrics
 
 urlpatterns = [
     path('admin/', admin.site.urls),
     path('', include('accounts.urls')),
     path('donations/', include('donations.urls')),
     path('i18n/', include('django.conf.urls.i18n')),
+    path('metrics/outbound/', outbound_metrics, name='outbound_metrics'),
 ]
 
-if settings.DEBUG:
-    urlpatterns += static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
\ No newline at end of file
+if settings.SERVE_MEDIA:
+    # Range-aware media serving (seeking in videos, ETag/304 for gallery images)
+    urlpatterns += [
+        re_path(r'^%s(?P<path>.*)$' % settings.MEDIA_URL.lstrip('/'), serve_media, name='media'),
+    ]